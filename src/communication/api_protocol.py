@@ -0,0 +1,101 @@
+# messages of the API command server, in the protocol's own binary form instead of pickled objects
+# - a request is a header (request id, when to reply, number of commands) followed by the commands, each a
+#   command type byte and a frame of the binary wire format; controller commands (CommandType.CONTROLLER)
+#   are not part of the protocol tree and use the codes in CONTROLLER_OPERATIONS
+# - the reply carries the request id and one status per command, in the order of the request,
+#   or REPLY_MALFORMED in place of the number of statuses when the request could not be read at all
+# - args are 16 bit signed integers, like on the serial line
+
+import struct
+from utils.commandtype_enum import CommandType
+from communication.protocol import NovaProtocolCommandReader, NovaCommand, COMMANDS
+from communication.wire_format import BinaryWireFormat
+
+REQUEST_HEADER = struct.Struct("<IBB") # request id, reply on, number of commands (up to MAX_COMMANDS)
+REQUEST_ID = struct.Struct("<I")
+REPLY_HEADER = struct.Struct("<IB") # request id, number of statuses
+MAX_COMMANDS = 254
+REPLY_MALFORMED = 0xFF # none of the commands were taken; the request id is 0 if the request was too short to carry one
+
+# when the server replies
+REPLY_ON_QUEUED = 0 # all commands were handed to the serial communication for Nova
+REPLY_ON_ACK = 1 # Nova acked the commands it acknowledges (see ACKNOWLEDGED_OPERATIONS), the others are queued
+
+# status per command
+STATUS_QUEUED = 0
+STATUS_ACKED = 1
+STATUS_DONE = 2 # a controller command, handled without Nova
+STATUS_REJECTED = 3 # not a command of the protocol
+STATUS_DROPPED = 4 # Nova has too many of its kind waiting for an ack
+STATUS_TIMEOUT = 5 # not queued or acked in time, e.g. replaced by a newer command of the same kind
+
+CONTROLLER_OPERATIONS = { "quit" : 1 }
+CONTROLLER_OPERATIONS_BY_CODE = { str(code) : operation for operation, code in CONTROLLER_OPERATIONS.items() }
+
+WIRE_FORMAT = BinaryWireFormat()
+READER = NovaProtocolCommandReader()
+
+def encodeCommand(cmd):
+    if cmd.type == CommandType.CONTROLLER:
+        frame = WIRE_FORMAT.encode([0, 0, CONTROLLER_OPERATIONS[cmd.operation], len(cmd.args)] + list(cmd.args))
+    else:
+        frame = WIRE_FORMAT.encodeCompiled(COMMANDS[cmd.path], cmd.args)
+    return bytes([cmd.type.value]) + frame
+
+def encodeRequest(request_id, commands, reply_on=REPLY_ON_QUEUED):
+    if len(commands) > MAX_COMMANDS:
+        raise ValueError(f"a request carries up to {MAX_COMMANDS} commands")
+    return REQUEST_HEADER.pack(request_id, reply_on, len(commands)) + b''.join([encodeCommand(cmd) for cmd in commands])
+
+# returns (request id, reply on, commands), where a command unknown to the protocol is None;
+# raises ValueError when the message is not a request
+def decodeRequest(payload):
+    if len(payload) < REQUEST_HEADER.size:
+        raise ValueError("request too short")
+
+    request_id, reply_on, count = REQUEST_HEADER.unpack_from(payload)
+    if count > MAX_COMMANDS:
+        raise ValueError(f"more than {MAX_COMMANDS} commands")
+    commands = []
+    pos = REQUEST_HEADER.size
+    for i in range(count):
+        if pos >= len(payload):
+            raise ValueError("request ends before its last command")
+        fields, end = WIRE_FORMAT.nextFrame(payload, pos + 1)
+        if fields is None or end != pos + 1 + WIRE_FORMAT.HEADER.size + WIRE_FORMAT.ARG_SIZE * int(fields[3]) + 1:
+            raise ValueError(f"malformed command {i}")
+
+        commands.append(decodeCommand(payload[pos], fields))
+        pos = end
+
+    return (request_id, reply_on, commands)
+
+# args stay the integers the client sent, unlike the string fields of commands from Nova
+def decodeCommand(type_value, fields):
+    fields = fields[:4] + [int(arg) for arg in fields[4:]]
+    try:
+        cmd_type = CommandType(type_value)
+        if cmd_type == CommandType.NOVA:
+            return None # only Nova itself sends these
+        if cmd_type == CommandType.CONTROLLER:
+            return NovaCommand(cmd_type, "controller", "module", CONTROLLER_OPERATIONS_BY_CODE[fields[2]], tuple(fields[4:]))
+        return READER.readCommand(fields, cmd_type)
+    except (KeyError, ValueError):
+        return None
+
+# the request id, as far as a request that could not be decoded tells
+def requestIdOf(payload):
+    return REQUEST_ID.unpack_from(payload)[0] if len(payload) >= REQUEST_ID.size else 0
+
+def encodeReply(request_id, statuses):
+    return REPLY_HEADER.pack(request_id, len(statuses)) + bytes(statuses)
+
+def encodeMalformedReply(request_id):
+    return REPLY_HEADER.pack(request_id, REPLY_MALFORMED)
+
+# returns (request id, statuses), where statuses is None for a malformed request
+def decodeReply(payload):
+    request_id, count = REPLY_HEADER.unpack_from(payload)
+    if count == REPLY_MALFORMED:
+        return (request_id, None)
+    return (request_id, list(payload[REPLY_HEADER.size:REPLY_HEADER.size + count]))
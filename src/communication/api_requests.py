@@ -0,0 +1,111 @@
+# follows the API requests until every command in them has a status, then hands out their replies
+# 1. a command for Nova carries a ticket in its args, the same way the latency trace travels (see utils.latency_trace);
+#    the serial communication stamps it when the command is queued, dropped and acked
+# 2. stamps may come from the serial reader thread, so finished tickets only go into a deque; replies() applies them
+# 3. commands without a status after the timeout are answered with STATUS_TIMEOUT
+# 4. a request that cannot be decoded is answered right away with REPLY_MALFORMED
+
+import time
+from collections import deque
+from config.config import NovaConfig
+from utils.commandtype_enum import CommandType
+from utils.latency_trace import TracedArgs
+from communication.protocol import ACKNOWLEDGED_OPERATIONS
+from communication.api_protocol import *
+
+class APIRequest:
+    def __init__(self, envelope, request_id, count, deadline):
+        self.envelope = envelope
+        self.request_id = request_id
+        self.statuses = [None] * count
+        self.missing = count
+        self.deadline = deadline
+
+    def setStatus(self, index, status):
+        if self.statuses[index] is None:
+            self.statuses[index] = status
+            self.missing -= 1
+
+class APICommandTicket:
+    def __init__(self, request, index, wait_for_ack, finished, on_finished):
+        self.request = request
+        self.index = index
+        self.wait_for_ack = wait_for_ack
+        self.finished = finished
+        self.on_finished = on_finished
+
+    def stamp(self, name, at=None):
+        if name == "queued" and not self.wait_for_ack:
+            self.__finish(STATUS_QUEUED)
+        elif name == "ack":
+            self.__finish(STATUS_ACKED)
+        elif name == "dropped":
+            self.__finish(STATUS_DROPPED)
+
+    def __finish(self, status):
+        self.finished.append((self.request, self.index, status))
+        if self.on_finished is not None:
+            self.on_finished()
+
+class APIRequestTracker:
+    # on_finished, if given, is called whenever a command got its status, on the thread that stamped it
+    def __init__(self, timeout_ms=NovaConfig.COMPCOMM_COMMAND_REPLY_TIMEOUT_MS, on_finished=None, clock=time.monotonic):
+        self.timeout = timeout_ms / 1000
+        self.on_finished = on_finished
+        self.clock = clock
+        self.pending = deque() # in order of arrival, so of their deadlines
+        self.finished = deque()
+        self.malformed = [] # replies to requests that could not be decoded
+        self.acked_operations = set(ACKNOWLEDGED_OPERATIONS)
+
+    # returns the commands of the request for the control loops
+    def receive(self, envelope, payload):
+        try:
+            request_id, reply_on, commands = decodeRequest(payload)
+        except ValueError as error:
+            print(f"[ctrl] Dropped malformed api-request: {error}")
+            self.malformed.append((envelope, encodeMalformedReply(requestIdOf(payload))))
+            return []
+
+        request = APIRequest(envelope, request_id, len(commands), self.clock() + self.timeout)
+        self.pending.append(request)
+
+        accepted = []
+        for index, cmd in enumerate(commands):
+            if cmd is None:
+                request.setStatus(index, STATUS_REJECTED)
+            elif cmd.type == CommandType.CONTROLLER:
+                request.setStatus(index, STATUS_DONE)
+                accepted.append(cmd)
+            else:
+                wait_for_ack = reply_on == REPLY_ON_ACK and (cmd.module, cmd.operation) in self.acked_operations
+                ticket = APICommandTicket(request, index, wait_for_ack, self.finished, self.on_finished)
+                accepted.append(cmd._replace(args=TracedArgs(cmd.args, ticket)))
+
+        return accepted
+
+    # returns (envelope, reply) of every request that is complete, timed out or malformed
+    def replies(self):
+        while len(self.finished) > 0:
+            request, index, status = self.finished.popleft()
+            request.setStatus(index, status)
+
+        now = self.clock()
+        replies, self.malformed = self.malformed, []
+        still_pending = deque()
+        for request in self.pending:
+            if request.missing > 0 and request.deadline > now:
+                still_pending.append(request)
+                continue
+
+            statuses = [status if status is not None else STATUS_TIMEOUT for status in request.statuses]
+            replies.append((request.envelope, encodeReply(request.request_id, statuses)))
+        self.pending = still_pending
+
+        return replies
+
+    # seconds until the oldest pending request times out, None without pending requests
+    def nextTimeout(self):
+        if len(self.pending) == 0:
+            return None
+        return max(0, self.pending[0].deadline - self.clock())
@@ -0,0 +1,78 @@
+# merges the commands written during one tick into the smallest equivalent batch, keeping the order they were written in:
+# - consecutive step moves of a servo are summed, until another command for that servo comes in between
+# - only the latest tracking coordinates are kept, a mode change directly followed by another is replaced by it
+# - a mode change applies to everything after it, so nothing before it is merged with anything after it
+# - everything else is passed on as written
+# commands are (compiled command, args) pairs, see communication.protocol.COMMANDS;
+# stamp, if given, is called as stamp(args, "queued") for every command whose effect goes out with drain(),
+# merged step moves included, and as stamp(args, "dropped") for a command replaced by a newer one
+class CommandCoalescer:
+    SET_MODE_PATH = ("nova", "module", "set_mode")
+    LATEST_WINS_PATHS = { ("track_object", "module", "set_coordinates") }
+    STEP_OPERATION = "set_degree_steps"
+
+    def __init__(self, stamp=None):
+        self.stamp = stamp
+        self.__reset()
+
+    def __reset(self):
+        self.batch = [] # [compiled, args, merged args of a step move] in the order written, None where replaced
+        self.latest = {} # path : index of the command a newer one of the same path replaces
+        self.open_steps = {} # servo : index of the step move that further steps of the servo are added to
+
+    def add(self, compiled, args):
+        path = compiled.path
+
+        if path == self.SET_MODE_PATH:
+            if len(self.batch) > 0 and self.batch[-1] is not None and self.batch[-1][0].path == self.SET_MODE_PATH:
+                self.__replace(len(self.batch) - 1)
+            self.latest = {}
+            self.open_steps = {}
+            self.batch.append([compiled, args, None])
+        elif path in self.LATEST_WINS_PATHS:
+            if path in self.latest:
+                self.__replace(self.latest[path])
+            self.latest[path] = len(self.batch)
+            self.batch.append([compiled, args, None])
+        elif path[2] == self.STEP_OPERATION and len(args) > 0:
+            if path[1] in self.open_steps and self.batch[self.open_steps[path[1]]][0] is compiled:
+                entry = self.batch[self.open_steps[path[1]]]
+                entry[1] += int(args[0])
+                entry[2].append(args)
+            else:
+                self.open_steps[path[1]] = len(self.batch)
+                self.batch.append([compiled, int(args[0]), [args]])
+        else:
+            self.open_steps.pop(path[1], None) # e.g. set_degree: later steps start from the new degree
+            self.batch.append([compiled, args, None])
+
+    def __replace(self, index):
+        if self.stamp is not None:
+            self.stamp(self.batch[index][1], "dropped")
+        self.batch[index] = None
+
+    def isEmpty(self):
+        return all([entry is None for entry in self.batch])
+
+    def drain(self):
+        batch = []
+        for entry in self.batch:
+            if entry is None:
+                continue
+
+            compiled, args, merged = entry
+            if merged is None:
+                batch.append((compiled, args))
+                self.__stampQueued([args])
+            else:
+                if args != 0: # moves that cancel out are not sent
+                    batch.append((compiled, [args]))
+                self.__stampQueued(merged)
+
+        self.__reset()
+        return batch
+
+    def __stampQueued(self, written):
+        if self.stamp is not None:
+            for args in written:
+                self.stamp(args, "queued")
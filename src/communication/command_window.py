@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import deque
+
+class InFlightCommand:
+    def __init__(self, seq, command, sent_at):
+        self.seq = seq
+        self.command = command
+        self.sent_at = sent_at
+        self.retries = 0
+        self.rtt_ms = None
+
+# keeps track of commands that Nova acknowledges, per (module, operation)
+# - at most window_size commands of one kind are in flight at the same time
+# - sequence numbers are assigned on this side; Nova acks in order and without arguments,
+#   so an ack always belongs to the oldest command in flight of its kind
+# - commands that are not acked within timeout_ms are sent again up to max_retries times, then dropped;
+#   the ack of a resent command may be the late ack of an earlier send, and a second ack for it is taken
+#   for the ack of the next command in flight, so a resent command gives no round trip time sample
+# - the round trip time counts from the last write of the command to the port (see written())
+class CommandWindow:
+    def __init__(self, acked_operations, window_size, timeout_ms, max_retries, rtt_samples=100, clock=time.monotonic):
+        self.window_size = window_size
+        self.timeout = timeout_ms / 1000
+        self.max_retries = max_retries
+        self.clock = clock
+
+        self.ack_index = { ack : key for key, ack in acked_operations.items() }
+        self.in_flight = { key : deque() for key in acked_operations }
+        self.seq = 0
+        self.dropped = 0
+        self.round_trip_times = deque(maxlen=rtt_samples)
+        self.lock = threading.Lock() # acks arrive on the reader thread in threaded mode
+
+    def needsAck(self, key):
+        return key in self.in_flight
+
+    def isOpen(self, key):
+        return key not in self.in_flight or len(self.in_flight[key]) < self.window_size
+
+    def isAck(self, ack_key):
+        return ack_key in self.ack_index
+
+    def track(self, key, command):
+        with self.lock:
+            self.seq += 1
+            self.in_flight[key].append(InFlightCommand(self.seq, command, self.clock()))
+            return self.seq
+
+    # restarts the clock of the commands in flight among the batch, which was just written to the port;
+    # until then they count from when they were tracked, so a command that is never written still times out
+    def written(self, batch):
+        with self.lock:
+            now = self.clock()
+            for in_flight in self.in_flight.values():
+                for cmd in in_flight:
+                    if any(cmd.command is command for command in batch):
+                        cmd.sent_at = now
+
+    # returns (seq, round trip time in ms) of the acked command, or None for an unexpected ack
+    def acknowledge(self, ack_key):
+        cmd = self.acknowledgeCommand(ack_key)
+        return (cmd.seq, cmd.rtt_ms) if cmd is not None else None
+
+    # returns the acked InFlightCommand with its round trip time (None if it was resent), or None for an unexpected ack
+    def acknowledgeCommand(self, ack_key):
+        with self.lock:
+            in_flight = self.in_flight[self.ack_index[ack_key]]
+            if len(in_flight) == 0:
+                return None
+
+            cmd = in_flight.popleft()
+            if cmd.retries == 0:
+                cmd.rtt_ms = (self.clock() - cmd.sent_at) * 1000
+                self.round_trip_times.append(cmd.rtt_ms)
+            return cmd
+
+    # returns the commands that should be sent again
+    def expire(self):
+        resend = []
+        with self.lock:
+            now = self.clock()
+            for key, in_flight in self.in_flight.items():
+                for cmd in list(in_flight):
+                    if now - cmd.sent_at < self.timeout:
+                        continue
+
+                    if cmd.retries < self.max_retries:
+                        cmd.retries += 1
+                        cmd.sent_at = now
+                        resend.append(cmd.command)
+                    else:
+                        in_flight.remove(cmd)
+                        self.dropped += 1
+
+        return resend
+
+    # seconds until the oldest command in flight times out, or None when nothing is in flight
+    def nextTimeout(self):
+        with self.lock:
+            sent = [in_flight[0].sent_at for in_flight in self.in_flight.values() if len(in_flight) > 0]
+            if len(sent) == 0:
+                return None
+            return max(0, min(sent) + self.timeout - self.clock())
+
+    def reset(self):
+        with self.lock:
+            for in_flight in self.in_flight.values():
+                in_flight.clear()
+
+    def roundTripTimes(self):
+        return list(self.round_trip_times)
@@ -1,4 +1,8 @@
+import sys
+from collections import namedtuple
 from utils.commandtype_enum import CommandType
+from config.constants import NovaConstants
+from communication.wire_format import AsciiWireFormat
 
 class ProtocolNode:
     def __init__(self, id, code):
@@ -50,6 +54,7 @@ class PIDNode(ProtocolNode):
 class NovaNode(ProtocolNode):
     children = {
         "set_mode" : ProtocolLeaf("set_mode", '1'),
+        "set_wire_format" : ProtocolLeaf("set_wire_format", '2'),
         "servo1" : ServoNode("servo1", '1'),
         "servo2" : ServoNode("servo2", '2'),
         "servo3" : ServoNode("servo3", '3'),
@@ -107,6 +112,11 @@ class Root(ProtocolNode):
     def __init__(self):
         super().__init__("root", "0")
 
+# operations that Nova acknowledges, as (module, operation) : (module, ack operation)
+ACKNOWLEDGED_OPERATIONS = {
+    ("track_object", "set_coordinates") : ("track_object", "ack_coordinates")
+}
+
 class NovaProtocolCommandBuilder:
 
     root = Root()
@@ -220,30 +230,57 @@ class NovaProtocolCommandReader:
                 ids = id_parts + [v.id]
                 self.__addToLookup(codes, ids)
 
+    # ids are interned so comparing them is as cheap as an identity check
     def __addToLookup(self, code_list, command_list):
-        key = ":".join(code_list)
-        self.lookup[key] = command_list
+        key = tuple(code_list)
+        self.lookup[key] = tuple([sys.intern(id) for id in command_list])
 
-    def readCommand(self, cmd_codes):
-        cmd = self.lookup[":".join(cmd_codes[:3])]
+    def readCommand(self, cmd_codes, type=CommandType.NOVA):
+        module, asset, operation = self.lookup[(cmd_codes[0], cmd_codes[1], cmd_codes[2])]
 
-        if int(cmd_codes[3]) > int(0):
-            args = cmd_codes[4:]
+        if int(cmd_codes[3]) > 0:
+            args = tuple(cmd_codes[4:])
         else:
-            args = []
+            args = ()
 
-        cmd.append(args)
+        return NovaCommand(type, module, asset, operation, args)
 
-        return cmd
+# a (module, asset, operation) path of the protocol tree with its codes and pre-encoded frame prefixes
+class CompiledCommand:
+    def __init__(self, path, codes):
+        self.path = path
+        self.codes = codes
+        self.ascii_prefix = (NovaConstants.CMD_START_MARKER + NovaConstants.CMD_SEPARATOR.join(codes) + NovaConstants.CMD_SEPARATOR).encode()
+        self.binary_codes = tuple(int(code) for code in codes)
+
+    # same result as the builder chain for this path
+    def build(self, args=[]):
+        return self.codes + [str(len(args))] + list(args)
+
+# the protocol tree compiled once into flat tables, so hot paths skip the builder
+def __compileCommands():
+    commands = {}
+    for codes, path in NovaProtocolCommandReader().lookup.items():
+        commands[path] = CompiledCommand(path, list(codes))
+
+    return commands
+
+COMMANDS = __compileCommands()
+COMMANDS_BY_CODES = { tuple(compiled.codes) : compiled for compiled in COMMANDS.values() }
+ASCII_WIRE_FORMAT = AsciiWireFormat()
+
+def encode(path, args=[], wire_format=ASCII_WIRE_FORMAT):
+    return wire_format.encodeCompiled(COMMANDS[path], args)
+
+# immutable command as it travels through the controller, both decoded from Nova (CommandType.NOVA)
+# and created by the keyboard, mouse or API (CommandType.INPUT); args is a tuple
+class NovaCommand(namedtuple("NovaCommand", ["type", "module", "asset", "operation", "args"])):
+    __slots__ = ()
 
-class NovaCommand:
-    def __init__(self, type, module, asset, operation, args):
-        self.type = type
-        self.module = module
-        self.asset = asset
-        self.operation = operation
-        self.args = args
+    @property
+    def path(self):
+        return (self.module, self.asset, self.operation)
 
     def toList(self):
-        cmd = [self.type, self.module, self.asset, self.operation] + self.args
+        cmd = [self.type, self.module, self.asset, self.operation] + list(self.args)
         return cmd
@@ -0,0 +1,99 @@
+# drives a (non-threaded) SerialCommunication from an asyncio event loop
+# 1. the port's file descriptor is watched with add_reader, so data from Nova is handled as soon as it arrives;
+#    where the port has no descriptor or the loop cannot watch it (Windows), the port is polled instead
+# 2. control loops write through this link; the commands written while handling one event are sent together
+#    by a single flush, scheduled with call_soon
+# 3. while commands wait for an ack, a timer flushes again when the oldest times out, so the window expires it
+# 4. writes from control loops running in an executor are handed to the event loop thread
+
+import asyncio
+from config.config import NovaConfig
+
+class AsyncSerialLink:
+    # instrumentation, if given, times reading from and flushing to Nova as the "serial" and "flush" stages
+    # and counts the commands sent (see utils.instrumentation)
+    def __init__(self, serial_comm, loop, poll_ms=NovaConfig.SCHEDULER_PERIODS_MS["serial"], instrumentation=None):
+        self.serial_comm = serial_comm
+        self.loop = loop
+        if instrumentation is not None:
+            self.run = instrumentation.timed("serial", serial_comm.run)
+            self.flushCommands = instrumentation.timed("flush", serial_comm.flushCommands)
+            self.commands_out = instrumentation.counter("out")
+        else:
+            self.run = serial_comm.run
+            self.flushCommands = serial_comm.flushCommands
+            self.commands_out = None
+        self.poll = poll_ms / 1000
+        self.flush_scheduled = False
+        self.ack_timer = None
+
+    # calls on_receive() after every read from Nova; reconnects after the configured delay when the port is lost
+    async def serve(self, on_receive):
+        while True:
+            if not self.serial_comm.isConnected():
+                await asyncio.sleep(NovaConfig.SERIAL_RECONNECT_MS / 1000)
+                self.run()
+                continue
+
+            readable = asyncio.Event()
+            fd = self.serial_comm.fileno()
+            if fd is None:
+                await self.__pollOnce(on_receive)
+                continue
+            try:
+                self.loop.add_reader(fd, readable.set)
+            except NotImplementedError:
+                await self.__pollOnce(on_receive)
+                continue
+
+            try:
+                while self.serial_comm.isConnected():
+                    await readable.wait()
+                    readable.clear()
+                    self.__receive(on_receive)
+            finally:
+                self.loop.remove_reader(fd)
+
+    async def __pollOnce(self, on_receive):
+        await asyncio.sleep(self.poll)
+        self.__receive(on_receive)
+
+    def __receive(self, on_receive):
+        self.run()
+        on_receive()
+
+    def requestFlush(self):
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            self.loop.call_soon(self.__flush)
+
+    def __flush(self):
+        self.flush_scheduled = False
+        sent = self.flushCommands()
+        if self.commands_out is not None:
+            self.commands_out.add(sent)
+
+        if self.ack_timer is not None:
+            self.ack_timer.cancel()
+            self.ack_timer = None
+        timeout = self.serial_comm.nextAckTimeout()
+        if timeout is not None:
+            self.ack_timer = self.loop.call_later(timeout, self.requestFlush)
+
+    # the same interface as SerialCommunication for the control loops; safe to call from any thread
+    def write(self, path, args):
+        self.loop.call_soon_threadsafe(self.__write, path, args)
+
+    def __write(self, path, args):
+        self.serial_comm.write(path, args)
+        self.requestFlush()
+
+    def windowOpen(self, module, operation):
+        return self.serial_comm.windowOpen(module, operation)
+
+    def roundTripTimes(self):
+        return self.serial_comm.roundTripTimes()
+
+    def cleanup(self):
+        if self.ack_timer is not None:
+            self.ack_timer.cancel()
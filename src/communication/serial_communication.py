@@ -1,101 +1,329 @@
 import serial
 import sys
+import threading
+import time
 from collections import deque
-from config.constants import NovaConstants
+from queue import Queue, Empty, Full
 from config.config import NovaConfig
-from utils.commandtype_enum import CommandType
 from utils.frequencytimer import FrequencyTimer
-from communication.protocol import NovaProtocolCommandReader
+from communication.protocol import NovaProtocolCommandReader, ACKNOWLEDGED_OPERATIONS, COMMANDS, COMMANDS_BY_CODES
+from communication.command_coalescer import CommandCoalescer
+from communication.wire_format import AsciiWireFormat, WIRE_FORMATS
+from communication.command_window import CommandWindow
+from utils.latency_trace import LatencyTrace, traceOf
 
 class SerialCommunication:
-    def __init__(self):
+    # commands that control the link itself, only sent by the link (see __negotiateWireFormat)
+    LINK_CONTROL_PATHS = { ("nova", "module", "set_wire_format") }
+
+    # latency_tracer, if given, receives the traces of commands that Nova acked (see utils.latency_trace);
+    # whatever rides along in TracedArgs is stamped "queued", "write", "ack" or "dropped", e.g. API requests;
+    # port, if given, replaces the port from the config
+    def __init__(self, threaded=NovaConfig.SERIAL_THREADED, latency_tracer=None, port=None):
+        self.threaded = threaded
+        self.latency_tracer = latency_tracer
+        self.ascii_format = AsciiWireFormat()
+        self.requested_format = WIRE_FORMATS[NovaConfig.SERIAL_WIRE_FORMAT]()
+        self.wire_format = self.ascii_format
+        self.protocolReader = NovaProtocolCommandReader()
+        self.commandWindow = CommandWindow(ACKNOWLEDGED_OPERATIONS, NovaConfig.SERIAL_ACK_WINDOW_SIZE,
+                                            NovaConfig.SERIAL_ACK_TIMEOUT_MS, NovaConfig.SERIAL_ACK_MAX_RETRIES)
+
         self.connection_timer = FrequencyTimer(NovaConfig.SERIAL_RECONNECT_MS)
         self.ser = serial.Serial()
-        self.ser.port = self.__determineSerialPort() # TODO only work on windows for now
+        self.ser.port = port if port is not None else self.__determineSerialPort() # TODO only work on windows for now
         self.ser.baudrate = NovaConfig.SERIAL_BAUDRATE
+        if self.threaded:
+            self.ser.timeout = NovaConfig.SERIAL_THREAD_READ_TIMEOUT_MS / 1000
+        self.port_lock = threading.Lock() # the reader thread reopens the port while the writer thread may write to it
         self.__open()
 
         # for receiving data
-        self.recvInProgress = False
-        self.newData = False
-        self.receivedBytes = []
-        self.receivedCommands = deque()
+        self.receiveBuffer = bytearray()
+        self.receivedCommands = deque(maxlen=NovaConfig.SERIAL_QUEUE_SIZE) if self.threaded else deque()
 
-        self.protocolReader = NovaProtocolCommandReader()
+        # for sending data
+        self.coalescer = CommandCoalescer(stamp=self.__stamp) if NovaConfig.SERIAL_COALESCE_COMMANDS else None
+        self.pendingCommands = []
+
+        if self.threaded:
+            self.__startIOThreads()
+
+    # reader and writer threads exchange commands with the main loop through bounded queues
+    def __startIOThreads(self):
+        self.outgoingCommands = Queue(maxsize=NovaConfig.SERIAL_QUEUE_SIZE)
+        self.io_running = threading.Event()
+        self.io_running.set()
+
+        self.reader_thread = threading.Thread(target=self.__readerThread, name="nova-serial-reader", daemon=True)
+        self.writer_thread = threading.Thread(target=self.__writerThread, name="nova-serial-writer", daemon=True)
+        self.reader_thread.start()
+        self.writer_thread.start()
+
+    def __stopIOThreads(self):
+        self.io_running.clear()
+        self.reader_thread.join()
+        self.writer_thread.join()
+
+    def __readerThread(self):
+        while self.io_running.is_set():
+            if self.connected:
+                self.__recvBytesWithStartEndMarkers()
+                self.__parseInput()
+            else:
+                time.sleep(NovaConfig.SERIAL_RECONNECT_MS / 1000)
+                self.__open()
+
+    def __writerThread(self):
+        while self.io_running.is_set():
+            try:
+                batch = self.outgoingCommands.get(timeout=NovaConfig.SERIAL_THREAD_READ_TIMEOUT_MS / 1000)
+            except Empty:
+                continue
+
+            self.__writeToPort(batch)
 
     def __open(self):
-        try:
-            self.ser.open()
-            self.connected = True
-        except serial.serialutil.SerialException:
-            self.connected = False
-            print("[cntr] Failed to open serial connection to Nova.")
+        with self.port_lock:
+            try:
+                if self.ser.is_open:
+                    self.ser.close()
+                self.ser.open()
+                self.commandWindow.reset()
+                self.__negotiateWireFormat()
+                self.connected = True
+            except serial.serialutil.SerialException:
+                self.connected = False
+                print("[cntr] Failed to open serial connection to Nova.")
 
     def close(self):
+        if self.threaded:
+            self.__stopIOThreads()
         self.ser.close()
 
     def run(self):
-        if self.connected:
+        if self.threaded:
+            return # serviced by the reader and writer threads
+        elif self.connected:
             self.__recvBytesWithStartEndMarkers()
             self.__parseInput()
         elif self.connection_timer.frequencyElapsed():
             self.__open()
 
+    def isConnected(self):
+        return self.connected
+
+    # file descriptor to wait on for incoming data, None where the port does not have one (Windows)
+    def fileno(self):
+        try:
+            return self.ser.fileno()
+        except (AttributeError, serial.serialutil.SerialException):
+            return None
+
+    # seconds until the oldest unacknowledged command times out, None when all are acked;
+    # flushCommands() expires it, a loop that does not flush on every tick should flush by then
+    def nextAckTimeout(self):
+        return self.commandWindow.nextTimeout()
+
     def commandAvailable(self):
         return len(self.receivedCommands) > 0
 
     def readCommand(self):
         return self.receivedCommands.popleft()
 
+    # check before writing a command that Nova acknowledges (see ACKNOWLEDGED_OPERATIONS)
+    def windowOpen(self, module, operation):
+        return self.commandWindow.isOpen((module, operation))
+
+    def roundTripTimes(self):
+        return self.commandWindow.roundTripTimes()
+
+    # commands are collected during a tick and sent together by flushCommands()
     def writeCommand(self, cmd_list_codes):
-        cmd_list_strings = [str(i) for i in cmd_list_codes]
-        command = NovaConstants.CMD_START_MARKER + NovaConstants.CMD_SEPARATOR.join(cmd_list_strings) + NovaConstants.CMD_END_MARKER
-        if self.connected:
+        compiled = COMMANDS_BY_CODES.get(tuple([str(code) for code in cmd_list_codes[:3]]))
+        if compiled is None:
+            print(f"[ctrl] Dropped command unknown to the protocol: {cmd_list_codes}")
+            return
+
+        self.__queueOutgoing(compiled, cmd_list_codes[4:])
+
+    # fast path for a (module, asset, operation) path of the protocol tree, skipping the builder
+    def write(self, path, args):
+        self.__queueOutgoing(COMMANDS[path], args)
+
+    def __queueOutgoing(self, compiled, args):
+        if compiled.path in self.LINK_CONTROL_PATHS:
+            print(f"[ctrl] Dropped {':'.join(compiled.path)} command, only the serial link may send it.")
+            self.__stamp(args, "dropped")
+            return
+
+        if self.coalescer is not None:
+            self.coalescer.add(compiled, args)
+        else:
+            self.pendingCommands.append((compiled, args))
+
+    # returns how many commands were sent
+    # commands count as queued once the coalescer kept them (or merged them into another)
+    def flushCommands(self):
+        if self.coalescer is not None:
+            batch = self.coalescer.drain()
+        else:
+            batch, self.pendingCommands = self.pendingCommands, []
+            for compiled, args in batch:
+                self.__stamp(args, "queued")
+
+        batch = self.commandWindow.expire() + self.__trackInFlight(batch)
+        if len(batch) == 0:
+            return 0
+
+        if self.threaded:
             try:
-                self.ser.write(command.encode())
-                self.__printOutgoingCommand(command)
+                self.outgoingCommands.put_nowait(batch)
+            except Full:
+                print("[ctrl] Outgoing serial queue is full, dropped commands to Nova.")
+                for compiled, args in batch:
+                    self.__stamp(args, "dropped")
+                return 0
+        else:
+            self.__writeToPort(batch)
+        return len(batch)
+
+    # commands that need an ack take a place in the window, or are dropped when it is full
+    def __trackInFlight(self, batch):
+        tracked = []
+        for command in batch:
+            module, asset, operation = command[0].path
+            key = (module, operation)
+            if self.commandWindow.needsAck(key):
+                if not self.commandWindow.isOpen(key):
+                    print(f"[ctrl] Too many {module}:{operation} commands in flight, dropped one.")
+                    self.__stamp(command[1], "dropped")
+                    continue
+                self.commandWindow.track(key, command)
+            tracked.append(command)
+
+        return tracked
+
+    # every (re)connect starts in ascii; Nova confirms a switch by echoing the set_wire_format command
+    def __negotiateWireFormat(self):
+        self.wire_format = self.ascii_format
+        if self.requested_format.id != self.ascii_format.id:
+            command = (COMMANDS[("nova", "module", "set_wire_format")], [self.requested_format.code])
+            self.ser.write(self.ascii_format.encodeCompiled(*command))
+            self.__printOutgoingCommand([command])
+
+    def __switchWireFormat(self, cmd):
+        args = cmd.args
+        if len(args) > 0 and args[0] == self.requested_format.code:
+            self.wire_format = self.requested_format
+        else:
+            self.wire_format = self.ascii_format
+        print(f"[ctrl] Using {self.wire_format.id} wire format for Nova.")
+
+    # the whole batch goes out in a single write
+    def __writeToPort(self, batch):
+        with self.port_lock:
+            batch, frames = self.__encode(batch) # the wire format changes on a reconnect
+            if not self.connected or len(frames) == 0:
+                return
+            try:
+                self.ser.write(b''.join(frames))
             except serial.serialutil.SerialException:
                 self.connected = False
                 print("[ctrl] SerialException while writing to Nova.")
+                return
+
+        self.commandWindow.written(batch)
+        self.__stampTraces(batch)
+        self.__printOutgoingCommand(batch)
 
+    # a command the wire format cannot carry (e.g. an arg beyond 16 bits in binary) is dropped on its own
+    def __encode(self, batch):
+        wire_format = self.wire_format
+        encoded = []
+        frames = []
+        for command in batch:
+            compiled, args = command
+            try:
+                frames.append(wire_format.encodeCompiled(compiled, args))
+                encoded.append(command) # the command window knows the command by identity
+            except ValueError as error:
+                print(f"[ctrl] Dropped {':'.join(compiled.path)} command to Nova: {error}")
+                self.__stamp(args, "dropped")
+
+        return (encoded, frames)
+
+    # drain everything the port has buffered in one call
     def __recvBytesWithStartEndMarkers(self):
         try:
-            while(self.connected and self.ser.in_waiting > 0 and not self.newData):
-                receivedByte = self.ser.read()
-
-                if self.recvInProgress:
-                    if receivedByte is not NovaConstants.CMD_END_MARKER.encode():
-                        self.receivedBytes.append(receivedByte)
-                    else:
-                        self.recvInProgress = False
-                        self.newData = True
-                elif receivedByte is NovaConstants.CMD_START_MARKER.encode():
-                    self.recvInProgress = True
+            waiting = self.ser.in_waiting
+            if waiting > 0:
+                self.receiveBuffer += self.ser.read(waiting)
+            elif self.threaded:
+                self.receiveBuffer += self.ser.read(1) # blocks for at most the read timeout
         except serial.serialutil.SerialException:
             self.connected = False
-            self.newData = False
-            self.recvInProgress = False
-            self.receivedBytes = []
+            self.receiveBuffer.clear()
             print("[ctrl] SerialException while reading from Nova.")
 
+    # decode all complete frames in the buffer, the wire format may change halfway after negotiation
     def __parseInput(self):
-        if self.newData:
-            cmdFields = ''.join([byte.decode() for byte in self.receivedBytes]).split(NovaConstants.CMD_SEPARATOR)
-            cmd = [CommandType.NOVA] + self.protocolReader.readCommand(cmdFields)
-            self.newData = False
-            self.receivedBytes.clear()
-            self.receivedCommands.append(cmd)
-            self.__printIncomingCommand(cmd)
+        buffer = self.receiveBuffer
+        pos = 0
+
+        while True:
+            cmdFields, pos = self.wire_format.nextFrame(buffer, pos)
+            if cmdFields is None:
+                break
+            self.__queueCommand(cmdFields)
+
+        del buffer[:pos]
+
+    def __queueCommand(self, cmdFields):
+        try:
+            cmd = self.protocolReader.readCommand(cmdFields)
+        except (KeyError, IndexError, ValueError):
+            print(f"[ctrl] Dropped malformed frame from Nova: {cmdFields}")
+            return
+
+        if cmd.module == "nova" and cmd.operation == "set_wire_format":
+            self.__switchWireFormat(cmd)
+        elif self.commandWindow.isAck((cmd.module, cmd.operation)):
+            self.__finishTrace(self.commandWindow.acknowledgeCommand((cmd.module, cmd.operation)))
+
+        if len(self.receivedCommands) == self.receivedCommands.maxlen:
+            print("[ctrl] Incoming serial queue is full, dropped the oldest command from Nova.")
+        self.receivedCommands.append(cmd)
+        self.__printIncomingCommand(cmd)
+
+    def __stamp(self, args, name):
+        trace = traceOf(args)
+        if trace is not None:
+            trace.stamp(name)
+
+    def __stampTraces(self, batch):
+        for compiled, args in batch:
+            self.__stamp(args, "write")
+
+    def __finishTrace(self, acked):
+        if acked is not None:
+            trace = traceOf(acked.command[1])
+            if trace is not None:
+                trace.stamp("ack")
+                if self.latency_tracer is not None and isinstance(trace, LatencyTrace):
+                    self.latency_tracer.finish(trace)
 
     def __printIncomingCommand(self, command):
-        cmd_list = [str(command[0])] + command[1:4] + [x for x in command[4:][0]]
+        cmd_list = [command.module, command.asset, command.operation] + list(command.args)
         print("[nova] " + ':'.join(cmd_list))
 
-    def __printOutgoingCommand(self, command):
-        print("[cntr] " + command)
+    def __printOutgoingCommand(self, batch):
+        print("[cntr] " + ' '.join([':'.join(compiled.build([str(arg) for arg in args])) for compiled, args in batch]))
 
     def __determineSerialPort(self):
-        if sys.platform.startswith('win32'):
+        if NovaConfig.SERIAL_USE_EMULATOR:
+            return NovaConfig.EMULATOR_PORT_LINK
+        elif sys.platform.startswith('win32'):
             return NovaConfig.SERIAL_PORT_WINDOWS
         elif sys.platform.startswith('darwin'):
             return NovaConfig.SERIAL_PORT_MACOS
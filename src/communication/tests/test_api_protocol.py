@@ -0,0 +1,48 @@
+import unittest
+
+from api_protocol import *
+
+class APIProtocolTest(unittest.TestCase):
+    SET_MODE = NovaCommand(CommandType.INPUT, "nova", "module", "set_mode", (2,))
+    SET_COORDINATES = NovaCommand(CommandType.INPUT, "track_object", "module", "set_coordinates", (-120, 45))
+    QUIT = NovaCommand(CommandType.CONTROLLER, "controller", "module", "quit", ())
+
+    def testRequestRoundTrip(self):
+        payload = encodeRequest(7, [self.SET_MODE, self.SET_COORDINATES, self.QUIT], REPLY_ON_ACK)
+        request_id, reply_on, commands = decodeRequest(payload)
+
+        self.assertEqual(request_id, 7)
+        self.assertEqual(reply_on, REPLY_ON_ACK)
+        self.assertEqual([cmd.path for cmd in commands], [self.SET_MODE.path, self.SET_COORDINATES.path, self.QUIT.path])
+        self.assertEqual([list(cmd.args) for cmd in commands], [[2], [-120, 45], []])
+        self.assertEqual([cmd.type for cmd in commands], [CommandType.INPUT, CommandType.INPUT, CommandType.CONTROLLER])
+
+    def testUnknownCommandsAreNone(self):
+        payload = bytearray(encodeRequest(1, [self.SET_MODE, self.SET_MODE]))
+        payload[REQUEST_HEADER.size] = CommandType.NOVA.value
+        request_id, reply_on, commands = decodeRequest(bytes(payload))
+
+        self.assertIsNone(commands[0])
+        self.assertEqual(commands[1].operation, "set_mode")
+
+    def testMalformedRequestsRaise(self):
+        payload = encodeRequest(1, [self.SET_MODE])
+        with self.assertRaises(ValueError):
+            decodeRequest(payload[:3])
+        with self.assertRaises(ValueError):
+            decodeRequest(payload[:-1])
+        with self.assertRaises(ValueError):
+            decodeRequest(REQUEST_HEADER.pack(1, REPLY_ON_QUEUED, 2) + payload[REQUEST_HEADER.size:])
+
+    def testRequestsCarryUpToMaxCommands(self):
+        with self.assertRaises(ValueError):
+            encodeRequest(1, [self.SET_MODE] * (MAX_COMMANDS + 1))
+        with self.assertRaises(ValueError):
+            decodeRequest(REQUEST_HEADER.pack(1, REPLY_ON_QUEUED, REPLY_MALFORMED))
+
+    def testReplyRoundTrip(self):
+        self.assertEqual(decodeReply(encodeReply(3, [STATUS_QUEUED, STATUS_TIMEOUT])), (3, [STATUS_QUEUED, STATUS_TIMEOUT]))
+        self.assertEqual(decodeReply(encodeMalformedReply(4)), (4, None))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+
+from api_requests import *
+from latency_trace import traceOf
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class APIRequestTrackerTest(unittest.TestCase):
+    ENVELOPE = [b"client"]
+    SET_MODE = NovaCommand(CommandType.INPUT, "nova", "module", "set_mode", (2,))
+    SET_COORDINATES = NovaCommand(CommandType.INPUT, "track_object", "module", "set_coordinates", (10, 20))
+    QUIT = NovaCommand(CommandType.CONTROLLER, "controller", "module", "quit", ())
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.finished = 0
+        self.tracker = APIRequestTracker(timeout_ms=100, on_finished=self.onFinished, clock=self.clock)
+
+    def onFinished(self):
+        self.finished += 1
+
+    def testRepliesOnceEveryCommandIsQueued(self):
+        commands = self.tracker.receive(self.ENVELOPE, encodeRequest(1, [self.SET_MODE, self.SET_COORDINATES]))
+        traceOf(commands[0].args).stamp("queued")
+        self.assertEqual(self.tracker.replies(), [])
+
+        traceOf(commands[1].args).stamp("queued")
+        self.assertEqual(self.finished, 2)
+        envelope, reply = self.tracker.replies()[0]
+        self.assertEqual(envelope, self.ENVELOPE)
+        self.assertEqual(decodeReply(reply), (1, [STATUS_QUEUED, STATUS_QUEUED]))
+
+    def testAcknowledgedOperationsWaitForTheAck(self):
+        commands = self.tracker.receive(self.ENVELOPE, encodeRequest(2, [self.SET_MODE, self.SET_COORDINATES], REPLY_ON_ACK))
+        self.assertEqual(list(commands[1].args), [10, 20])
+        for cmd in commands:
+            traceOf(cmd.args).stamp("queued")
+            traceOf(cmd.args).stamp("write")
+        self.assertEqual(self.tracker.replies(), [])
+
+        traceOf(commands[1].args).stamp("ack")
+        self.assertEqual(decodeReply(self.tracker.replies()[0][1]), (2, [STATUS_QUEUED, STATUS_ACKED]))
+
+    def testControllerAndUnknownCommandsAreAnsweredRightAway(self):
+        payload = bytearray(encodeRequest(3, [self.QUIT, self.SET_MODE]))
+        payload[-len(encodeCommand(self.SET_MODE))] = CommandType.NOVA.value
+        commands = self.tracker.receive(self.ENVELOPE, bytes(payload))
+
+        self.assertEqual(commands, [self.QUIT])
+        self.assertEqual(decodeReply(self.tracker.replies()[0][1]), (3, [STATUS_DONE, STATUS_REJECTED]))
+
+    def testMissingCommandsTimeOut(self):
+        commands = self.tracker.receive(self.ENVELOPE, encodeRequest(4, [self.SET_COORDINATES, self.SET_COORDINATES], REPLY_ON_ACK))
+        traceOf(commands[0].args).stamp("dropped")
+        self.assertAlmostEqual(self.tracker.nextTimeout(), 0.1)
+
+        self.clock.now = 0.1
+        self.assertEqual(decodeReply(self.tracker.replies()[0][1]), (4, [STATUS_DROPPED, STATUS_TIMEOUT]))
+        self.assertIsNone(self.tracker.nextTimeout())
+
+    def testMalformedRequestIsToldApartFromAnEmptyOne(self):
+        self.assertEqual(self.tracker.receive(self.ENVELOPE, REQUEST_HEADER.pack(5, REPLY_ON_QUEUED, 1)), [])
+        self.tracker.receive(self.ENVELOPE, encodeRequest(6, []))
+        replies = [decodeReply(reply) for envelope, reply in self.tracker.replies()]
+        self.assertEqual(replies, [(5, None), (6, [])])
+
+    def testTooShortRequestIsMalformed(self):
+        self.tracker.receive(self.ENVELOPE, b"\x07\x00\x00\x00")
+        self.tracker.receive(self.ENVELOPE, b"\x01")
+        replies = [decodeReply(reply) for envelope, reply in self.tracker.replies()]
+        self.assertEqual(replies, [(7, None), (0, None)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+
+from command_coalescer import *
+from protocol import COMMANDS
+
+class CommandCoalescerTest(unittest.TestCase):
+    SERVO4_STEPS = COMMANDS[("external_input", "servo4", "set_degree_steps")]
+    SERVO5_STEPS = COMMANDS[("external_input", "servo5", "set_degree_steps")]
+    SERVO4_DEGREE = COMMANDS[("external_input", "servo4", "set_degree")]
+    SET_MODE = COMMANDS[("nova", "module", "set_mode")]
+    SET_COORDINATES = COMMANDS[("track_object", "module", "set_coordinates")]
+    SET_TUNING = COMMANDS[("keep_distance", "pid", "set_tuning")]
+    TOGGLE_AUTO = COMMANDS[("keep_distance", "pid", "toggle_auto")]
+
+    def testStepsAreSummedPerServo(self):
+        coalescer = CommandCoalescer()
+        coalescer.add(self.SERVO5_STEPS, [3])
+        coalescer.add(self.SERVO4_STEPS, [-3])
+        coalescer.add(self.SERVO5_STEPS, [3])
+
+        expected = [(self.SERVO5_STEPS, [6]), (self.SERVO4_STEPS, [-3])]
+        self.assertListEqual(coalescer.drain(), expected)
+
+    def testCancellingStepsAreDropped(self):
+        coalescer = CommandCoalescer()
+        coalescer.add(self.SERVO4_STEPS, [3])
+        coalescer.add(self.SERVO4_STEPS, [-3])
+
+        self.assertListEqual(coalescer.drain(), [])
+
+    def testStepsAreNotMergedAcrossOtherCommandsForTheServo(self):
+        coalescer = CommandCoalescer()
+        coalescer.add(self.SERVO4_STEPS, [3])
+        coalescer.add(self.SERVO4_DEGREE, [90])
+        coalescer.add(self.SERVO4_STEPS, [3])
+        coalescer.add(self.SERVO4_STEPS, [2])
+
+        expected = [(self.SERVO4_STEPS, [3]), (self.SERVO4_DEGREE, [90]), (self.SERVO4_STEPS, [5])]
+        self.assertListEqual(coalescer.drain(), expected)
+
+    def testModeKeepsItsPlaceAndOnlyTheLatestOfConsecutiveModesIsKept(self):
+        coalescer = CommandCoalescer()
+        coalescer.add(self.SERVO5_STEPS, [3])
+        coalescer.add(self.SET_MODE, ['3'])
+        coalescer.add(self.SET_MODE, ['5'])
+        coalescer.add(self.SERVO5_STEPS, [3])
+
+        expected = [(self.SERVO5_STEPS, [3]), (self.SET_MODE, ['5']), (self.SERVO5_STEPS, [3])]
+        self.assertListEqual(coalescer.drain(), expected)
+
+    def testModesWithCommandsBetweenThemAreKept(self):
+        coalescer = CommandCoalescer()
+        coalescer.add(self.SET_MODE, ['3'])
+        coalescer.add(self.SET_COORDINATES, [90,90])
+        coalescer.add(self.SET_MODE, ['5'])
+        coalescer.add(self.SET_COORDINATES, [100,80])
+
+        expected = [(self.SET_MODE, ['3']), (self.SET_COORDINATES, [90,90]), (self.SET_MODE, ['5']), (self.SET_COORDINATES, [100,80])]
+        self.assertListEqual(coalescer.drain(), expected)
+
+    def testOnlyLatestCoordinatesAreKept(self):
+        coalescer = CommandCoalescer()
+        coalescer.add(self.SET_COORDINATES, [90,90])
+        coalescer.add(self.SET_COORDINATES, [100,80])
+
+        self.assertListEqual(coalescer.drain(), [(self.SET_COORDINATES, [100,80])])
+
+    def testOtherCommandsPassThroughInOrder(self):
+        coalescer = CommandCoalescer()
+        coalescer.add(self.SET_TUNING, [500,400,0])
+        coalescer.add(self.TOGGLE_AUTO, [])
+        coalescer.add(self.SET_TUNING, [505,400,0])
+
+        expected = [(self.SET_TUNING, [500,400,0]), (self.TOGGLE_AUTO, []), (self.SET_TUNING, [505,400,0])]
+        self.assertListEqual(coalescer.drain(), expected)
+
+    def testReplacedCommandsAreStampedDroppedAndTheRestQueued(self):
+        stamps = []
+        coalescer = CommandCoalescer(stamp=lambda args, name: stamps.append((args, name)))
+        first, second, steps, more_steps = [90,90], [100,80], [3], [-3]
+        coalescer.add(self.SET_COORDINATES, first)
+        coalescer.add(self.SERVO4_STEPS, steps)
+        coalescer.add(self.SERVO4_STEPS, more_steps)
+        coalescer.add(self.SET_COORDINATES, second)
+        self.assertEqual(stamps, [(first, "dropped")])
+
+        self.assertListEqual(coalescer.drain(), [(self.SET_COORDINATES, second)])
+        self.assertEqual(stamps[1:], [(steps, "queued"), (more_steps, "queued"), (second, "queued")])
+
+    def testDrainResets(self):
+        coalescer = CommandCoalescer()
+        coalescer.add(self.SET_MODE, ['3'])
+        coalescer.drain()
+
+        self.assertTrue(coalescer.isEmpty())
+        self.assertListEqual(coalescer.drain(), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+
+from command_window import *
+
+class FakeClock:
+    def __init__(self):
+        self.time = 0
+
+    def __call__(self):
+        return self.time
+
+class CommandWindowTest(unittest.TestCase):
+    KEY = ("track_object", "set_coordinates")
+    ACK = ("track_object", "ack_coordinates")
+
+    def createWindow(self, window_size=2, timeout_ms=100, max_retries=0):
+        self.clock = FakeClock()
+        return CommandWindow({ self.KEY : self.ACK }, window_size, timeout_ms, max_retries, clock=self.clock)
+
+    def testWindowClosesWhenFull(self):
+        window = self.createWindow()
+        window.track(self.KEY, ['5','0','1','2',1,1])
+        self.assertTrue(window.isOpen(self.KEY))
+        window.track(self.KEY, ['5','0','1','2',2,2])
+        self.assertFalse(window.isOpen(self.KEY))
+
+    def testOtherOperationsAreAlwaysOpen(self):
+        window = self.createWindow(window_size=0)
+        self.assertFalse(window.needsAck(("nova", "set_mode")))
+        self.assertTrue(window.isOpen(("nova", "set_mode")))
+
+    def testAcksMatchOldestCommand(self):
+        window = self.createWindow()
+        first = window.track(self.KEY, ['5','0','1','2',1,1])
+        self.clock.time = 0.01
+        second = window.track(self.KEY, ['5','0','1','2',2,2])
+        self.clock.time = 0.03
+
+        seq, rtt_ms = window.acknowledge(self.ACK)
+        self.assertEqual(seq, first)
+        self.assertAlmostEqual(rtt_ms, 30)
+        seq, rtt_ms = window.acknowledge(self.ACK)
+        self.assertEqual(seq, second)
+        self.assertAlmostEqual(rtt_ms, 20)
+        self.assertIsNone(window.acknowledge(self.ACK))
+
+    def testAckReturnsTheCommand(self):
+        window = self.createWindow()
+        window.track(self.KEY, ['5','0','1','2',1,1])
+        self.clock.time = 0.02
+
+        acked = window.acknowledgeCommand(self.ACK)
+        self.assertListEqual(acked.command, ['5','0','1','2',1,1])
+        self.assertAlmostEqual(acked.rtt_ms, 20)
+        self.assertIsNone(window.acknowledgeCommand(self.ACK))
+
+    def testCountsAbove256(self):
+        window = self.createWindow(window_size=1)
+        for i in range(300):
+            window.track(self.KEY, ['5','0','1','2',i,i])
+            window.acknowledge(self.ACK)
+        self.assertTrue(window.isOpen(self.KEY))
+
+    def testStaleCommandsAreDropped(self):
+        window = self.createWindow()
+        window.track(self.KEY, ['5','0','1','2',1,1])
+        self.clock.time = 0.2
+
+        self.assertListEqual(window.expire(), [])
+        self.assertEqual(window.dropped, 1)
+        self.assertTrue(window.isOpen(self.KEY))
+
+    def testStaleCommandsAreResent(self):
+        window = self.createWindow(max_retries=1)
+        window.track(self.KEY, ['5','0','1','2',1,1])
+        self.clock.time = 0.2
+
+        self.assertListEqual(window.expire(), [['5','0','1','2',1,1]])
+        self.assertListEqual(window.expire(), [])
+        self.clock.time = 0.4
+        self.assertListEqual(window.expire(), [])
+        self.assertEqual(window.dropped, 1)
+
+    def testRoundTripStartsAtTheWrite(self):
+        window = self.createWindow()
+        command = ['5','0','1','2',1,1]
+        window.track(self.KEY, command)
+        self.clock.time = 0.05
+        window.written([['5','0','1','2',1,1]]) # an equal command is not the same one
+        window.written([command])
+        self.clock.time = 0.06
+
+        self.assertAlmostEqual(window.acknowledge(self.ACK)[1], 10)
+
+    def testResentCommandHasNoRoundTripTime(self):
+        window = self.createWindow(max_retries=1)
+        window.track(self.KEY, ['5','0','1','2',1,1])
+        self.clock.time = 0.2
+        window.expire()
+        self.clock.time = 0.21
+
+        self.assertEqual(window.acknowledge(self.ACK), (1, None))
+        self.assertListEqual(window.roundTripTimes(), [])
+
+    def testNextTimeoutFollowsOldestCommand(self):
+        window = self.createWindow()
+        self.assertIsNone(window.nextTimeout())
+
+        window.track(self.KEY, ['5','0','1','2',1,1])
+        self.clock.time = 0.03
+        window.track(self.KEY, ['5','0','1','2',2,2])
+        self.assertAlmostEqual(window.nextTimeout(), 0.07)
+
+        window.acknowledge(self.ACK)
+        self.assertAlmostEqual(window.nextTimeout(), 0.1)
+        self.clock.time = 0.5
+        self.assertEqual(window.nextTimeout(), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -96,28 +96,63 @@ class ProtocolReaderTest(unittest.TestCase):
 
     def testReadServoStatusCommand(self):
         received = ['0','1','1','1','90']
-        expected = ['nova','servo1','get_degree',['90']]
+        expected = NovaCommand(CommandType.NOVA, 'nova', 'servo1', 'get_degree', ('90',))
 
         reader = NovaProtocolCommandReader()
         cmd = reader.readCommand(received)
-        self.assertListEqual(cmd, expected)
+        self.assertEqual(cmd, expected)
 
     def testReadTrackObjectAckCommand(self):
         received = ['5','0','2','0']
-        expected = ['track_object', 'module', 'ack_coordinates', []]
+        expected = NovaCommand(CommandType.NOVA, 'track_object', 'module', 'ack_coordinates', ())
 
         reader = NovaProtocolCommandReader()
         cmd = reader.readCommand(received)
-        self.assertListEqual(cmd, expected)
+        self.assertEqual(cmd, expected)
 
     def testGetPIDTuning(self):
         received = ['4','1','4','3','500','400','0']
-        expected = ['keep_distance', 'pid', 'get_tuning', ['500','400','0']]
+        expected = NovaCommand(CommandType.NOVA, 'keep_distance', 'pid', 'get_tuning', ('500','400','0'))
 
         reader = NovaProtocolCommandReader()
         cmd = reader.readCommand(received)
+        self.assertEqual(cmd, expected)
+
+    def testRepeatedReadsDoNotShareArgs(self):
+        reader = NovaProtocolCommandReader()
+        first = reader.readCommand(['0','1','1','1','90'])
+        second = reader.readCommand(['0','1','1','1','45'])
+
+        self.assertEqual(first.args, ('90',))
+        self.assertEqual(second.args, ('45',))
+        self.assertEqual(reader.lookup[('0','1','1')], ('nova', 'servo1', 'get_degree'))
+
+    def testReadInputCommand(self):
+        reader = NovaProtocolCommandReader()
+        cmd = reader.readCommand(['3','5','2','1','90'], CommandType.INPUT)
+
+        self.assertEqual(cmd.type, CommandType.INPUT)
+        self.assertEqual(cmd.path, ('external_input', 'servo5', 'set_degree'))
+
+class ProtocolCompiledCommandTest(unittest.TestCase):
+
+    def testCompiledMatchesBuilder(self):
+        expected = createCommand().setModule("external_input").setAsset("servo5").setOperation("set_degree_steps").setArgs([3]).build()
+        cmd = COMMANDS[("external_input", "servo5", "set_degree_steps")].build([3])
         self.assertListEqual(cmd, expected)
 
+    def testCompiledByCodes(self):
+        compiled = COMMANDS_BY_CODES[('4','1','3')]
+        self.assertEqual(compiled.path, ("keep_distance", "pid", "set_tuning"))
+
+    def testEncodeTrackObjectSetCoordinates(self):
+        encoded = encode(("track_object", "module", "set_coordinates"), [90,90])
+        self.assertEqual(encoded, b'>5:0:1:2:90:90<')
+
+    def testEncodeWithoutArgs(self):
+        encoded = encode(("track_object", "module", "ack_coordinates"))
+        self.assertEqual(encoded, b'>5:0:2:0<')
+
 class ProtocolUtilTest(unittest.TestCase):
 
     def testListPIDNodes(self):
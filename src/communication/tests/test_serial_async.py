@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import unittest
+
+from serial_async import *
+from instrumentation import Instrumentation
+
+class FakeSerialCommunication:
+    def __init__(self):
+        self.written = []
+        self.flushes = []
+        self.ack_timeout = None
+
+    def run(self):
+        pass
+
+    def write(self, path, args):
+        self.written.append((path, args))
+
+    def flushCommands(self):
+        self.flushes.append(self.written)
+        sent, self.written = len(self.written), []
+        return sent
+
+    def nextAckTimeout(self):
+        return self.ack_timeout
+
+class AsyncSerialLinkTest(unittest.TestCase):
+    PATH = ("track_object", "module", "set_coordinates")
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.serial_comm = FakeSerialCommunication()
+        self.link = AsyncSerialLink(self.serial_comm, self.loop)
+
+    def tearDown(self):
+        self.link.cleanup()
+        self.loop.close()
+
+    def runLoop(self, seconds=0.01):
+        self.loop.run_until_complete(asyncio.sleep(seconds))
+
+    def testWritesOfOneEventAreFlushedTogether(self):
+        self.link.write(self.PATH, [1, 1])
+        self.link.write(self.PATH, [2, 2])
+        self.runLoop()
+
+        self.assertEqual(self.serial_comm.flushes, [[(self.PATH, [1, 1]), (self.PATH, [2, 2])]])
+
+    def testWritesFromOtherThreadsAreFlushedOnTheLoop(self):
+        thread = threading.Thread(target=self.link.write, args=(self.PATH, [1, 1]))
+        thread.start()
+        thread.join()
+        self.runLoop()
+
+        self.assertEqual(self.serial_comm.flushes, [[(self.PATH, [1, 1])]])
+
+    def testFlushesAgainWhenAckTimesOut(self):
+        self.serial_comm.ack_timeout = 0.02
+        self.link.write(self.PATH, [1, 1])
+        self.runLoop()
+        self.assertEqual(len(self.serial_comm.flushes), 1)
+
+        self.serial_comm.ack_timeout = None
+        self.runLoop(0.05)
+        self.assertEqual(len(self.serial_comm.flushes), 2)
+        self.runLoop(0.05)
+        self.assertEqual(len(self.serial_comm.flushes), 2)
+
+    def testFlushesAreTimedAndCounted(self):
+        instrumentation = Instrumentation(enabled=True, samples=8)
+        link = AsyncSerialLink(self.serial_comm, self.loop, instrumentation=instrumentation)
+        link.write(self.PATH, [1, 1])
+        self.runLoop()
+
+        self.assertEqual(instrumentation.summary()["stages"]["flush"]["count"], 1)
+        self.assertEqual(instrumentation.counter("out").total, 1)
+
+if __name__ == "__main__":
+    unittest.main()
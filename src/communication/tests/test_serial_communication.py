@@ -0,0 +1,82 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from serial_communication import *
+from nova_emulator import NovaEmulator
+
+# runs the emulator on a thread of its own, behind a link that stays the same when the emulator is replaced
+class EmulatorThread:
+    def __init__(self, port_link):
+        self.emulator = NovaEmulator(latency_ms=0, baudrate=0, status_interval_ms=0, port_link=port_link)
+        self.running = True
+        self.thread = threading.Thread(target=self.__run, daemon=True)
+        self.thread.start()
+
+    def __run(self):
+        while self.running:
+            self.emulator.step(0.01)
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        self.emulator.close()
+
+class ThreadedSerialCommunicationTest(unittest.TestCase):
+    SET_COORDINATES = ("track_object", "module", "set_coordinates")
+
+    def setUp(self):
+        self.port_link = os.path.join(tempfile.mkdtemp(), "nova")
+        self.emulator = EmulatorThread(self.port_link)
+        self.serial_comm = SerialCommunication(threaded=True, port=self.port_link)
+
+    def tearDown(self):
+        self.serial_comm.close()
+        self.emulator.stop()
+        os.rmdir(os.path.dirname(self.port_link))
+
+    def __waitFor(self, condition, timeout=3):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if condition():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def __exchangeCoordinates(self):
+        self.serial_comm.write(self.SET_COORDINATES, [10, 20])
+        self.assertEqual(self.serial_comm.flushCommands(), 1)
+
+        received = []
+        def acked():
+            while self.serial_comm.commandAvailable():
+                received.append(self.serial_comm.readCommand().operation)
+            return "ack_coordinates" in received
+
+        self.assertTrue(self.__waitFor(acked))
+        self.assertTrue(self.serial_comm.windowOpen("track_object", "set_coordinates"))
+
+    def testWriteAndRead(self):
+        self.assertTrue(self.serial_comm.isConnected())
+        self.__exchangeCoordinates()
+
+    def testReconnectsToANewNova(self):
+        self.__exchangeCoordinates()
+
+        self.emulator.stop()
+        self.assertTrue(self.__waitFor(lambda: not self.serial_comm.isConnected()))
+
+        self.emulator = EmulatorThread(self.port_link)
+        self.assertTrue(self.__waitFor(self.serial_comm.isConnected, timeout=NovaConfig.SERIAL_RECONNECT_MS / 1000 + 3))
+        self.__exchangeCoordinates()
+
+    def testLinkControlCommandsAreNotSent(self):
+        self.serial_comm.write(("nova", "module", "set_wire_format"), [0])
+        self.serial_comm.writeCommand([0, 0, 2, 0, 0])
+        self.assertEqual(self.serial_comm.flushCommands(), 0)
+        self.__exchangeCoordinates()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+from wire_format import *
+
+class AsciiWireFormatTest(unittest.TestCase):
+
+    def testEncode(self):
+        wire_format = AsciiWireFormat()
+        self.assertEqual(wire_format.encode(['5','0','1','2',90,90]), b'>5:0:1:2:90:90<')
+
+    def testReadAllFramesAndSkipGarbage(self):
+        wire_format = AsciiWireFormat()
+        buffer = bytearray(b'xx>0:1:1:1:90<garbage>5:0:2:0<>4:1')
+
+        fields, pos = wire_format.nextFrame(buffer, 0)
+        self.assertListEqual(fields, ['0','1','1','1','90'])
+        fields, pos = wire_format.nextFrame(buffer, pos)
+        self.assertListEqual(fields, ['5','0','2','0'])
+        fields, pos = wire_format.nextFrame(buffer, pos)
+        self.assertIsNone(fields)
+        self.assertEqual(buffer[pos:], b'>4:1')
+
+    def testResyncOnTruncatedFrame(self):
+        wire_format = AsciiWireFormat()
+        buffer = bytearray(b'>5:0>0:2:1:1:45<')
+
+        fields, pos = wire_format.nextFrame(buffer, 0)
+        self.assertListEqual(fields, ['0','2','1','1','45'])
+
+class BinaryWireFormatTest(unittest.TestCase):
+
+    def testEncode(self):
+        wire_format = BinaryWireFormat()
+        frame = wire_format.encode(['5','0','1','2',90,90])
+
+        self.assertEqual(len(frame), 11)
+        self.assertEqual(frame[:6], bytes([0xA5, 8, 5, 0, 1, 2]))
+        self.assertEqual(frame[-1], sum(frame[1:-1]) & 0xFF)
+
+    def testRoundTrip(self):
+        wire_format = BinaryWireFormat()
+        buffer = bytearray(wire_format.encode(['4','1','3','3','500','-400','0']))
+
+        fields, pos = wire_format.nextFrame(buffer, 0)
+        self.assertListEqual(fields, ['4','1','3','3','500','-400','0'])
+        self.assertEqual(pos, len(buffer))
+
+    def testPartialFrameIsKept(self):
+        wire_format = BinaryWireFormat()
+        frame = wire_format.encode(['5','0','2','0'])
+        buffer = bytearray(b'\x00' + frame[:-1])
+
+        fields, pos = wire_format.nextFrame(buffer, 0)
+        self.assertIsNone(fields)
+        self.assertEqual(pos, 1)
+
+    def testResyncOnChecksumError(self):
+        wire_format = BinaryWireFormat()
+        corrupt = bytearray(wire_format.encode(['0','1','1','1','90']))
+        corrupt[-1] ^= 0xFF
+        buffer = corrupt + wire_format.encode(['5','0','2','0'])
+
+        fields, pos = wire_format.nextFrame(buffer, 0)
+        self.assertListEqual(fields, ['5','0','2','0'])
+        self.assertEqual(pos, len(buffer))
+    def testArgsThatDoNotFitRaiseValueError(self):
+        wire_format = BinaryWireFormat()
+        with self.assertRaises(ValueError):
+            wire_format.encode(['4','1','3','3',40000,1,1])
+        with self.assertRaises(ValueError):
+            wire_format.encode(['4','1','3','40'] + [1] * 40)
+
+        # ascii carries the same command
+        self.assertEqual(AsciiWireFormat().encode(['4','1','3','3',40000,1,1]), b'>4:1:3:3:40000:1:1<')
+
+if __name__ == "__main__":
+    unittest.main()
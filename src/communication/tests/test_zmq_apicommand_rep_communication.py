@@ -0,0 +1,69 @@
+import unittest
+import zmq
+
+from zmq_apicommand_rep_communication import *
+from utils.commandtype_enum import CommandType
+
+class APICommandRepCommunicationTest(unittest.TestCase):
+    URI = "inproc://nova-api-commands"
+    SET_COORDINATES = NovaCommand(CommandType.INPUT, "track_object", "module", "set_coordinates", (10, 20))
+
+    def setUp(self):
+        self.api_comm = APICommandRepCommunication(uri=self.URI, poll_timeout_ms=100)
+        self.clients = []
+        self.client = self.connectClient()
+
+    def tearDown(self):
+        for client in self.clients:
+            client.close(linger=0)
+        self.api_comm.cleanup()
+
+    def connectClient(self):
+        client = self.api_comm.context.socket(zmq.REQ)
+        client.connect(self.URI)
+        self.clients.append(client)
+        return client
+
+    # the next reply fails with error, the ones after it go out again
+    def failNextReply(self, error):
+        server = self.api_comm.server
+        def send_pyobj(obj, flags=0):
+            del server.send_pyobj
+            raise error
+        server.send_pyobj = send_pyobj
+
+    def receivedCommands(self):
+        commands = []
+        while self.api_comm.commandAvailable():
+            commands.append(self.api_comm.readCommand())
+        return commands
+
+    def testReplyThatWouldBlockIsRetried(self):
+        self.client.send_pyobj(self.SET_COORDINATES)
+        self.failNextReply(zmq.error.Again())
+        self.api_comm.run()
+        self.assertEqual(self.receivedCommands(), [self.SET_COORDINATES])
+        self.assertEqual(self.client.poll(10), 0)
+
+        self.api_comm.run()
+        self.assertEqual(self.client.recv_pyobj(), "Ack")
+
+        self.client.send_pyobj(self.SET_COORDINATES)
+        self.api_comm.run()
+        self.assertEqual(self.receivedCommands(), [self.SET_COORDINATES])
+        self.assertEqual(self.client.recv_pyobj(), "Ack")
+
+    def testSocketIsReopenedWhenReplyFails(self):
+        self.client.send_pyobj(self.SET_COORDINATES)
+        self.failNextReply(zmq.error.ZMQError(zmq.EFSM))
+        self.api_comm.run()
+        self.assertEqual(self.receivedCommands(), [self.SET_COORDINATES])
+
+        client = self.connectClient()
+        client.send_pyobj(self.SET_COORDINATES)
+        self.api_comm.run()
+        self.assertEqual(self.receivedCommands(), [self.SET_COORDINATES])
+        self.assertEqual(client.recv_pyobj(), "Ack")
+
+if __name__ == "__main__":
+    unittest.main()
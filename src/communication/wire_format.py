@@ -0,0 +1,122 @@
+import struct
+from config.constants import NovaConstants
+from config.config import NovaConfig
+
+# Both wire formats turn a list of command codes ([module, asset, operation, no_of_args] + args)
+# into bytes and back. nextFrame(buffer, pos) returns the codes of the first complete frame
+# at or after pos and the position after it, or (None, pos) when the rest of the buffer has no
+# complete frame yet (pos then points at the first byte worth keeping).
+
+class AsciiWireFormat:
+    id = "ascii"
+    code = '0'
+
+    START_MARKER = NovaConstants.CMD_START_MARKER.encode()
+    END_MARKER = NovaConstants.CMD_END_MARKER.encode()
+
+    def encode(self, cmd_list_codes):
+        cmd_list_strings = [str(i) for i in cmd_list_codes]
+        command = NovaConstants.CMD_START_MARKER + NovaConstants.CMD_SEPARATOR.join(cmd_list_strings) + NovaConstants.CMD_END_MARKER
+        return command.encode()
+
+    def encodeCompiled(self, compiled, args):
+        fields = [str(len(args))] + [str(arg) for arg in args]
+        return compiled.ascii_prefix + NovaConstants.CMD_SEPARATOR.join(fields).encode() + self.END_MARKER
+
+    def nextFrame(self, buffer, pos):
+        while True:
+            start = buffer.find(self.START_MARKER, pos)
+            if start < 0:
+                return (None, len(buffer))
+
+            end = buffer.find(self.END_MARKER, start + 1)
+            if end < 0:
+                if len(buffer) - start > NovaConfig.SERIAL_MAX_FRAME_SIZE:
+                    pos = start + 1 # no end marker in sight, resync on the next start marker
+                    continue
+                return (None, start)
+
+            # a start marker inside the frame means the previous frame was cut off
+            restart = buffer.rfind(self.START_MARKER, start + 1, end)
+            if restart >= 0:
+                start = restart
+
+            try:
+                fields = buffer[start + 1:end].decode('ascii').split(NovaConstants.CMD_SEPARATOR)
+            except UnicodeDecodeError:
+                pos = end + 1
+                continue
+
+            return (fields, end + 1)
+
+# frame layout: start byte, length, module, asset, operation, no_of_args, args as int16, checksum
+# - length counts the bytes from module up to and including the last arg
+# - checksum is the sum of length and those bytes, modulo 256
+# - args are 16 bit signed, matching an int on the Nova side; encoding raises ValueError for args that do not fit
+class BinaryWireFormat:
+    id = "binary"
+    code = '1'
+
+    START_BYTE = 0xA5
+    HEADER = struct.Struct("<BBBBBB")
+    ARG_SIZE = 2
+    MIN_LENGTH = 4
+    CODE_STRINGS = [str(code) for code in range(256)]
+
+    def __init__(self):
+        self.arg_structs = [struct.Struct(f"<{no_of_args}h") for no_of_args in range(NovaConfig.SERIAL_MAX_FRAME_SIZE // self.ARG_SIZE)]
+
+    def encode(self, cmd_list_codes):
+        module, asset, operation = (int(code) for code in cmd_list_codes[:3])
+        args = [int(arg) for arg in cmd_list_codes[4:]]
+        length = self.MIN_LENGTH + self.ARG_SIZE * len(args)
+
+        frame = bytearray(self.HEADER.pack(self.START_BYTE, length, module, asset, operation, len(args)))
+        frame += self.__packArgs(args)
+        frame.append(sum(frame, -self.START_BYTE) & 0xFF)
+        return bytes(frame)
+
+    def encodeCompiled(self, compiled, args):
+        length = self.MIN_LENGTH + self.ARG_SIZE * len(args)
+
+        frame = bytearray(self.HEADER.pack(self.START_BYTE, length, *compiled.binary_codes, len(args)))
+        frame += self.__packArgs([int(arg) for arg in args])
+        frame.append(sum(frame, -self.START_BYTE) & 0xFF)
+        return bytes(frame)
+
+    def __packArgs(self, args):
+        if len(args) >= len(self.arg_structs):
+            raise ValueError(f"{len(args)} args do not fit in a binary frame")
+        try:
+            return self.arg_structs[len(args)].pack(*args)
+        except struct.error:
+            raise ValueError(f"args {args} do not fit in 16 bits")
+
+    def nextFrame(self, buffer, pos):
+        while True:
+            start = buffer.find(self.START_BYTE, pos)
+            if start < 0:
+                return (None, len(buffer))
+            if len(buffer) - start < self.HEADER.size:
+                return (None, start)
+
+            _, length, module, asset, operation, no_of_args = self.HEADER.unpack_from(buffer, start)
+            end = start + 2 + length # index of the checksum
+            if length != self.MIN_LENGTH + self.ARG_SIZE * no_of_args or no_of_args >= len(self.arg_structs):
+                pos = start + 1
+                continue
+            if len(buffer) <= end:
+                return (None, start)
+            if sum(buffer[start + 1:end]) & 0xFF != buffer[end]:
+                pos = start + 1
+                continue
+
+            args = self.arg_structs[no_of_args].unpack_from(buffer, start + self.HEADER.size)
+            codes = self.CODE_STRINGS
+            fields = [codes[module], codes[asset], codes[operation], codes[no_of_args]] + [str(arg) for arg in args]
+            return (fields, end + 1)
+
+WIRE_FORMATS = {
+    AsciiWireFormat.id : AsciiWireFormat,
+    BinaryWireFormat.id : BinaryWireFormat
+}
@@ -0,0 +1,40 @@
+import pickle
+import zmq
+import zmq.asyncio
+from collections import deque
+from communication.protocol import NovaProtocolCommandReader
+from communication.zmq_apicommand_rep_communication import toNovaCommand
+
+# the API command server for the asyncio controller: the same REP socket and commands as
+# APICommandRepCommunication, but receive() waits on the event loop instead of polling;
+# handle() takes the received request in, apart from the wait, so it can be timed
+class AsyncAPICommandRepCommunication:
+    def __init__(self, uri="tcp://*:5556"):
+        self.context = zmq.asyncio.Context()
+        self.server = self.context.socket(zmq.REP)
+        self.server.bind(uri)
+        self.receivedCommands = deque()
+        self.protocolReader = NovaProtocolCommandReader()
+
+    # waits for the next request and acks it
+    async def receive(self):
+        message = await self.server.recv()
+        await self.server.send_pyobj(("Ack"))
+        return message
+
+    def handle(self, message):
+        api_cmd = pickle.loads(message)
+        print(f"received api-command: {api_cmd}")
+        cmd = toNovaCommand(self.protocolReader, api_cmd)
+        if cmd is not None:
+            self.receivedCommands.append(cmd)
+
+    def commandAvailable(self):
+        return len(self.receivedCommands) > 0
+
+    def readCommand(self):
+        return self.receivedCommands.popleft()
+
+    def cleanup(self):
+        self.server.close(linger=0)
+        self.context.term()
@@ -1,32 +1,90 @@
 import zmq
 from collections import deque
+from config.config import NovaConfig
+from communication.protocol import NovaProtocolCommandReader, NovaCommand
+
+# commands arrive either as NovaCommand or as a [type, module code, asset code, operation code, no_of_args, args...] list
+def toNovaCommand(protocol_reader, api_cmd):
+    if isinstance(api_cmd, NovaCommand):
+        return api_cmd
+
+    try:
+        return protocol_reader.readCommand([str(code) for code in api_cmd[1:]], api_cmd[0])
+    except (KeyError, IndexError, ValueError, TypeError):
+        print(f"[ctrl] Dropped api-command unknown to the protocol: {api_cmd}")
+        return None
 
 class APICommandRepCommunication:
-    def __init__(self, uri="tcp://*:5556"):
-        self.__setupZMQ(uri)
+    def __init__(self, uri="tcp://*:5556", poll_timeout_ms=NovaConfig.COMPCOMM_COMMAND_POLL_TIMEOUT_MS,
+                    max_batch=NovaConfig.COMPCOMM_COMMAND_MAX_BATCH):
+        self.poll_timeout_ms = poll_timeout_ms
+        self.max_batch = max_batch
+        self.uri = uri
+        self.reply_pending = False # a REP socket takes no request until the last one is answered
+        self.__setupZMQ()
         self.receivedCommands = deque()
+        self.protocolReader = NovaProtocolCommandReader()
 
-    def __setupZMQ(self, uri):
+    def __setupZMQ(self):
         self.context = zmq.Context()
-        self.server = self.context.socket(zmq.REP)
-        self.server.bind(uri)
-
         self.poller = zmq.Poller()
+        self.__openSocket()
+
+    def __openSocket(self):
+        self.server = self.context.socket(zmq.REP)
+        self.server.bind(self.uri)
         self.poller.register(self.server, zmq.POLLIN)
 
-    # TODO add nova config item for polling interval
+    # the socket is stuck when a reply cannot be sent at all, a new one drops the request it owes a reply
+    def __reopenSocket(self):
+        print("[ctrl] Reopening the api-command socket.")
+        self.poller.unregister(self.server)
+        self.server.unbind(self.server.getsockopt(zmq.LAST_ENDPOINT)) # closing releases the endpoint only later
+        self.server.close(linger=0)
+        self.reply_pending = False
+        self.__openSocket()
+
+    # returns whether the socket is ready for the next request; a reply that would block is retried on the next run
+    def __reply(self):
+        try:
+            self.server.send_pyobj(("Ack"), flags=zmq.NOBLOCK)
+            self.reply_pending = False
+        except zmq.error.Again:
+            pass
+        except zmq.error.ZMQError:
+            print("ZMQError occurred while replying to Nova-REST.")
+            self.__reopenSocket()
+
+        return not self.reply_pending
+
     # TODO revisit send/receive flags and poller to make more robust (cmds must be ack'd)
-    def __listenForCommand(self):
-        incoming_cmd = None
-        socks = dict(self.poller.poll(200))
-        if socks.get(self.server) == zmq.POLLIN:
+    # drains up to max_batch pending requests; only the first poll may wait, so an idle API does not stall the main loop
+    def __listenForCommands(self):
+        incoming_cmds = []
+        if self.reply_pending and not self.__reply():
+            return incoming_cmds
+
+        timeout = self.poll_timeout_ms
+        while len(incoming_cmds) < self.max_batch:
+            socks = dict(self.poller.poll(timeout))
+            if socks.get(self.server) != zmq.POLLIN:
+                break
+
             try:
-                incoming_cmd = self.server.recv_pyobj()
-                self.server.send_pyobj(("Ack"), flags=zmq.NOBLOCK)
+                incoming_cmds.append(self.server.recv_pyobj(flags=zmq.NOBLOCK))
+            except zmq.error.Again:
+                break
             except zmq.error.ZMQError:
                 print("ZMQError occurred while receiving a command from Nova-REST.")
+                break
 
-        return incoming_cmd
+            self.reply_pending = True
+            if not self.__reply():
+                break
+
+            timeout = 0
+
+        return incoming_cmds
 
     def commandAvailable(self):
         return len(self.receivedCommands) > 0
@@ -35,13 +93,13 @@ class APICommandRepCommunication:
         return self.receivedCommands.popleft()
 
     def run(self):
-        api_cmd = self.__listenForCommand()
-
-        if not api_cmd == None:
+        for api_cmd in self.__listenForCommands():
             print(f"received api-command: {api_cmd}")
-            self.receivedCommands.append(api_cmd)
+            cmd = toNovaCommand(self.protocolReader, api_cmd)
+            if cmd is not None:
+                self.receivedCommands.append(cmd)
 
     def cleanup(self):
+        self.poller.unregister(self.server)
         self.server.close()
         self.context.term()
-        self.poller.unregister()
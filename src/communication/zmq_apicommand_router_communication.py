@@ -0,0 +1,105 @@
+import zmq
+import zmq.asyncio
+from collections import deque
+from config.config import NovaConfig
+from communication.api_requests import APIRequestTracker
+
+# the API command server on a ROUTER socket, replacing the REP socket with pickled commands
+# - any number of clients (DEALER or REQ) may have requests open at the same time
+# - a request carries a batch of commands in the form of communication.api_protocol
+# - the reply goes out once every command is queued for Nova, or acked by Nova, as the request asks for
+class APICommandRouterCommunication:
+    def __init__(self, uri="tcp://*:5556", max_batch=NovaConfig.COMPCOMM_COMMAND_MAX_BATCH,
+                    timeout_ms=NovaConfig.COMPCOMM_COMMAND_REPLY_TIMEOUT_MS):
+        self.max_batch = max_batch
+        self.context = zmq.Context()
+        self.server = self.context.socket(zmq.ROUTER)
+        self.server.bind(uri)
+        self.tracker = APIRequestTracker(timeout_ms)
+        self.receivedCommands = deque()
+
+    # takes in up to max_batch requests without waiting and answers those that are done
+    def run(self):
+        for i in range(self.max_batch):
+            try:
+                frames = self.server.recv_multipart(flags=zmq.NOBLOCK)
+            except zmq.error.Again:
+                break
+            except zmq.error.ZMQError:
+                print("[ctrl] ZMQError occurred while receiving a command from Nova-REST.")
+                break
+
+            # everything before the last frame is the envelope that routes the reply back to its client
+            self.receivedCommands.extend(self.tracker.receive(frames[:-1], frames[-1]))
+
+        sendReplies(self.server, self.tracker)
+
+    def commandAvailable(self):
+        return len(self.receivedCommands) > 0
+
+    def readCommand(self):
+        return self.receivedCommands.popleft()
+
+    def cleanup(self):
+        self.server.close(linger=0)
+        self.context.term()
+
+def sendReplies(server, tracker):
+    for envelope, reply in tracker.replies():
+        try:
+            server.send_multipart(envelope + [reply], flags=zmq.NOBLOCK)
+        except zmq.error.ZMQError:
+            print("[ctrl] Could not reply to an api-request, its client is gone or too slow.")
+
+# the same server for the asyncio controller: receive() waits on the event loop and handle() takes the request in,
+# replies go out as soon as the serial communication stamped the last command of a request, or when it times out
+class AsyncAPICommandRouterCommunication:
+    def __init__(self, loop, uri="tcp://*:5556", timeout_ms=NovaConfig.COMPCOMM_COMMAND_REPLY_TIMEOUT_MS):
+        self.loop = loop
+        self.context = zmq.asyncio.Context()
+        self.server = self.context.socket(zmq.ROUTER)
+        self.server.bind(uri)
+        self.tracker = APIRequestTracker(timeout_ms, on_finished=self.__onFinished)
+        self.receivedCommands = deque()
+        self.reply_scheduled = False
+        self.timeout_handle = None
+
+    # waits for the next request
+    async def receive(self):
+        return await self.server.recv_multipart()
+
+    def handle(self, frames):
+        self.receivedCommands.extend(self.tracker.receive(frames[:-1], frames[-1]))
+        self.sendReplies() # controller and rejected commands are done already
+
+    def sendReplies(self):
+        self.reply_scheduled = False
+        sendReplies(self.server, self.tracker)
+        self.__scheduleTimeout()
+
+    # stamps come from whichever thread writes to or reads from Nova, many of them lead to one reply run
+    def __onFinished(self):
+        if not self.reply_scheduled:
+            self.reply_scheduled = True
+            self.loop.call_soon_threadsafe(self.sendReplies)
+
+    def __scheduleTimeout(self):
+        if self.timeout_handle is not None:
+            self.timeout_handle.cancel()
+            self.timeout_handle = None
+
+        timeout = self.tracker.nextTimeout()
+        if timeout is not None:
+            self.timeout_handle = self.loop.call_later(timeout, self.sendReplies)
+
+    def commandAvailable(self):
+        return len(self.receivedCommands) > 0
+
+    def readCommand(self):
+        return self.receivedCommands.popleft()
+
+    def cleanup(self):
+        if self.timeout_handle is not None:
+            self.timeout_handle.cancel()
+        self.server.close(linger=0)
+        self.context.term()
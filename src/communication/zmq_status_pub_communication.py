@@ -21,12 +21,13 @@ class StatusPubCommunication:
         '12':"pid_y_face_detection"
     }
 
-    def __init__(self, status_dict, uri="tcp://*:5556", pub_frequency=1000):
+    def __init__(self, status_dict, router, uri="tcp://*:5556", pub_frequency=1000):
         self.__setupZMQ(uri)
         self.timer = FrequencyTimer(pub_frequency)
         self.assetStatus = {}
 
         self.status_dict = status_dict
+        self.commands = router.subscribe(CommandType.NOVA, "nova")
 
 #    def __initAssets(self):
 #        for k,v in StatusPubCommunication.assetDict:
@@ -37,11 +38,12 @@ class StatusPubCommunication:
         self.socket = self.context.socket(zmq.PUB)
         self.socket.bind(uri)
 
-    def __processStatusUpdates(self, cmds):
-        for cmd in cmds:
-            if cmd[0] == CommandType.NOVA:
+    def __processStatusUpdates(self):
+        while self.commands.commandAvailable():
+            cmd = self.commands.readCommand()
+            if cmd.type == CommandType.NOVA:
                 #(type, modcode, opcode, arg1, arg2, arg3) = cmd
-                module, asset, operation, args = cmd[1], cmd[2], cmd[3], cmd[4:]
+                module, asset, operation, args = cmd.module, cmd.asset, cmd.operation, cmd.args
                 if module is "nova":
                     #TODO: convert to new protocol from here
                     #self.__updateStatus(StatusPubCommunication.assetDict[opcode],(arg1,arg2,arg3))
@@ -64,16 +66,14 @@ class StatusPubCommunication:
                         self.status_dict[f"{key_modcode}_{key_opcode}_Ki"] = Decimal(arg2)/1000
                         self.status_dict[f"{key_modcode}_{key_opcode}_Kd"] = Decimal(arg3)/1000
 
-                    cmds.remove(cmd)
-
     def __updateStatus(self, asset, status):
         self.assetStatus[asset] = status
 
     def __publishStatuses(self):
         self.socket.send_pyobj(self.assetStatus)
 
-    def run(self, cmds):
-        self.__processStatusUpdates(cmds)
+    def run(self):
+        self.__processStatusUpdates()
 
         if self.timer.frequencyElapsed():
             self.__publishStatuses()
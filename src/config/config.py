@@ -18,13 +18,33 @@ class NovaConfig(Const):
     SERIAL_PORT_MACOS = '' # TODO set correct port for macos
     SERIAL_PORT_LINUX = '' # TODO set correct port for Linux
     SERIAL_RECONNECT_MS = 1000
+    SERIAL_MAX_FRAME_SIZE = 64 # bytes between start and end marker before a partial frame is discarded
+    SERIAL_THREADED = False # read and write on background threads instead of in the main loop
+    SERIAL_THREAD_READ_TIMEOUT_MS = 50
+    SERIAL_QUEUE_SIZE = 256
+    SERIAL_COALESCE_COMMANDS = True # merge the commands of one tick (summed steps, latest mode/coordinates)
+    SERIAL_WIRE_FORMAT = "ascii" # "ascii" or "binary"; binary is negotiated with Nova on connect, ascii is the fallback
+    SERIAL_ACK_WINDOW_SIZE = 3 # commands of one kind that may wait for an ack at the same time
+    SERIAL_ACK_TIMEOUT_MS = 500
+    SERIAL_ACK_MAX_RETRIES = 0 # a stale tracking target is not worth sending again
+    SERIAL_USE_EMULATOR = False # connect to the Nova emulator (nova-emulator.py) instead of the robot
+
+    EMULATOR_PORT_LINK = "/tmp/nova-emulator" # stable path that links to the emulator's pseudo-terminal
+    EMULATOR_LATENCY_MS = 5 # processing delay before Nova reacts to a command
+    EMULATOR_BAUDRATE = SERIAL_BAUDRATE # throttles traffic like the real line does, 0 to disable
+    EMULATOR_STATUS_INTERVAL_MS = 1000 # servo degree and distance reports, 0 to disable
 
     COMPCOMM_STATUS_PUBSUB_SOCKET = 8888
     COMPCOMM_STATUS_PUB_URI = f"tcp://*:{COMPCOMM_STATUS_PUBSUB_SOCKET}"
     COMPCOMM_STATUS_SUB_URI = f"tcp://localhost:{COMPCOMM_STATUS_PUBSUB_SOCKET}"
     COMPCOMM_COMMAND_SOCKET = 8889
     COMPCOMM_COMMAND_URI = f"tcp://*:{COMPCOMM_COMMAND_SOCKET}"
+    COMPCOMM_COMMAND_POLL_TIMEOUT_MS = 0 # how long a tick may wait for an API command, 0 never blocks the main loop
+    COMPCOMM_COMMAND_MAX_BATCH = 16 # API requests taken in per tick
+    COMPCOMM_COMMAND_SERVER = "router" # "router": many clients, batched binary requests (communication.api_protocol); "rep": one client, pickled commands
+    COMPCOMM_COMMAND_REPLY_TIMEOUT_MS = 1000 # a request is answered at the latest after this, missing commands as timed out
 
+    NOVA_HEADLESS = False # no window, keyboard or mouse; quit through the API or a signal
     NOVA_WINDOW_NAME = 'Nova'
     NOVA_WINDOW_NOIMAGE_PATH = "images/no_image_available.png"
 
@@ -32,9 +52,36 @@ class NovaConfig(Const):
     #NOVA_CAMERA_CAPTURE_SIZE_Y = 240
     NOVA_CAMERA_CAPTURE_SIZE_X = 640
     NOVA_CAMERA_CAPTURE_SIZE_Y = 480
+    NOVA_FRAME_SOURCE = "camera" # "camera", or the path of a video file or a directory of images to replay
+    NOVA_FRAME_SOURCE_PACE = "realtime" # replay at the recorded frame rate, or "fast" for one frame per tick
+    NOVA_FRAME_SOURCE_LOOP = True # start a replay again at its end; otherwise the controller stops
+    NOVA_FRAME_SOURCE_FPS = 30 # frame rate of image directories and of videos that do not tell
+    NOVA_CAMERA_THREADED = True # capture frames on a separate thread, the main loop takes the newest one
+    NOVA_CAMERA_CAPTURE_BUFFERS = 3 # frames preallocated for the capture thread, at least 3
+    NOVA_CAMERA_RETRY_MS = 1000 # wait before reading again when the camera delivers no frame
 
     STARTUP_MODE = "joystick_absolute"
 
+    SCHEDULER_PERIODS_MS = { # each part of the main loop runs at its own rate, 0 runs it on every pass
+        "serial": 2, # read from Nova and send the queued commands
+        "commands": 5, # controller, external input and status
+        "api": 20, # API commands
+        "frame": 33, # capture, keyboard and mouse, window refresh
+        "vision": 10 # face detection, on each new camera frame as soon as possible after it arrived
+    }
+    SCHEDULER_MAX_SLEEP_MS = 10
+    SCHEDULER_REPORT_MS = 10000 # how often runs, missed deadlines and load per task are logged, 0 to disable
+
+    INSTRUMENTATION_ENABLED = True # time every stage of the main loop
+    INSTRUMENTATION_SAMPLES = 512 # durations kept per stage for the percentiles
+    INSTRUMENTATION_REPORT_MS = 10000 # how often the stage timings are logged, 0 to disable
+    INSTRUMENTATION_STATUS_MS = 500 # how often the status view on screen is refreshed
+
+    LATENCY_TRACE_ENABLED = True # follow frames from the camera until Nova acks the coordinates computed from them
+    LATENCY_TRACE_MAX_TRACES = 1000 # last traces kept for the export
+    LATENCY_TRACE_REPORT_MS = 10000 # how often the latency per stage is logged, 0 to disable
+    LATENCY_TRACE_PATH = "" # Chrome trace JSON written on exit, e.g. "latency-trace.json"; empty to skip
+
     TUNE_PID_STEPSIZE = 0.005
 
     # module specific constants
@@ -44,7 +91,34 @@ class NovaConfig(Const):
     EXTERNAL_INPUT_MOUSE_FREQUENCY_MS = 15
 
     FACE_DETECTION_FACE_CASCADE_PATH = "data/haarcascades/haarcascade_frontalface_default.xml"
-    #FACE_DETECTION_COORDINATE_CORRECTION_X = 100 / 177 # 320x240 to 180x180
-    #FACE_DETECTION_COORDINATE_CORRECTION_Y = 100 / 133 # 320x240 to 180x180
-    FACE_DETECTION_COORDINATE_CORRECTION_X = 100 / 355 # 640x480 to 180x180
-    FACE_DETECTION_COORDINATE_CORRECTION_Y = 100 / 266 # 640x480 to 180x180
+    FACE_DETECTION_PROFILE_CASCADE_PATH = "data/haarcascades/haarcascade_profileface.xml"
+    FACE_DETECTION_UPPER_BODY_CASCADE_PATH = "data/haarcascades/haarcascade_upperbody.xml"
+    FACE_DETECTION_CASCADES = [ # run in parallel; a higher tier is only used when the lower tiers found nothing
+        { "path": FACE_DETECTION_FACE_CASCADE_PATH, "tier": 0 },
+        { "path": FACE_DETECTION_PROFILE_CASCADE_PATH, "tier": 1, "min_size": 40, "mirror": True },
+        { "path": FACE_DETECTION_UPPER_BODY_CASCADE_PATH, "tier": 2, "min_size": 100, "head": True }
+    ]
+    FACE_DETECTION_FALLBACK_FULL_FRAME = False # fallback tiers only search around a locked target, unless True
+    FACE_DETECTION_MAX_OVERLAP = 0.3 # hits overlapping more than this (intersection over union) are merged
+    FACE_DETECTION_COORDINATE_RANGE_X = 180 # frame coordinates are scaled from the actual frame size to this range
+    FACE_DETECTION_COORDINATE_RANGE_Y = 180
+    FACE_DETECTION_SCALE_FACTOR = 1.1
+    FACE_DETECTION_MIN_NEIGHBORS = 5
+    FACE_DETECTION_MIN_SIZE = 30 # pixels in the captured frame
+    FACE_DETECTION_DOWNSCALE = 0.5 # detection runs on the frame resized by this factor
+    FACE_DETECTION_ROI_MARGIN = 1.0 # after a lock, search the last face plus this many face sizes around it
+    FACE_DETECTION_REACQUIRE_FRAMES = 15 # full frame search at least every this many frames
+    FACE_DETECTION_BACKEND = "inline" # "inline" on the main loop, or "process" for detection worker processes
+    FACE_DETECTION_WORKERS = 2 # worker processes for the "process" backend
+    FACE_DETECTION_FRAME_SLOTS = 4 # frames that can be in detection at the same time; frames are skipped while all are taken
+    FACE_DETECTION_SLOT_TIMEOUT_MS = 2000 # a slot whose frame has no result by then is freed, e.g. after its worker died
+    FACE_DETECTION_MODE = "detect" # "detect" on every frame, or "detect_track" to track the face between detections
+    FACE_DETECTION_TRACK_FRAMES = 5 # in "detect_track" mode a full detection runs at least every this many frames
+    FACE_TRACKING_MIN_CONFIDENCE = 0.6 # template match score below which the face is lost and detected again
+    FACE_TRACKING_SEARCH_MARGIN = 0.5 # the face is searched for this many face sizes around its last position
+    FACE_DETECTION_REPORT_MS = 10000 # how often the detect/track ratio is logged
+    FACE_TARGET_GATE = 1.0 # a face belongs to the target when its centre is within this many face sizes of the predicted centre
+    FACE_TARGET_MAX_MISSED = 5 # detections without the target before another face is selected
+    FACE_TARGET_PROCESS_NOISE = 400.0 # Kalman filter: expected acceleration of a face, in pixels/s²
+    FACE_TARGET_MEASUREMENT_NOISE = 5.0 # Kalman filter: jitter of the detected face centres, in pixels
+    FACE_TARGET_LATENCY_MS = 50 # camera and servo latency on top of the measured frame age and serial latency
@@ -0,0 +1,215 @@
+# the controller on an asyncio event loop, an alternative to controller-main.py
+# - every I/O source is serviced when it has something to deliver: Nova's serial port through add_reader,
+#   the API through zmq.asyncio (replies go out once Nova took the commands), camera frames from an executor thread that waits on the camera
+# - face detection runs on the newest frame in a second executor thread while the loop keeps serving the rest
+# - commands go through the command router and the same control loops as in controller-main.py,
+#   which run as soon as commands arrive; writes to Nova are flushed once per event
+# - window and keyboard stay on the loop thread, as HighGUI expects
+
+import asyncio
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from communication.serial_communication import SerialCommunication
+from communication.serial_async import AsyncSerialLink
+from communication.zmq_apicommand_async_communication import AsyncAPICommandRepCommunication
+from communication.zmq_apicommand_router_communication import AsyncAPICommandRouterCommunication
+from controlloop.window_base import WindowBaseLoop
+from controlloop.external_input import ExternalInputControlLoop
+from controlloop.keyboard_mouse_input import KeyboardMouseInputLoop
+from controlloop.facedetection import FaceDetectionControlLoop
+from controlloop.controller_control import ControllerControlLoop
+from config.config import NovaConfig
+from utils.command_router import CommandRouter
+from utils.instrumentation import Instrumentation
+from utils.latency_trace import LatencyTracer
+
+def setupStatusDict():
+    statusdict = {}
+    statusdict["current_mode"] = NovaConfig.STARTUP_MODE
+
+    return statusdict
+
+def setupLoops(loop):
+    global serial_comm
+    global serial_link
+    global keyboard_mouse_input
+    global api_comm
+    global controller_control
+    global command_loops
+    global command_runs
+    global face_detection
+    global vision_dict
+    global timed_keyboard
+    global timed_face_detection
+    global timed_api
+    global latency_tracer
+
+    latency_tracer = LatencyTracer() if NovaConfig.LATENCY_TRACE_ENABLED else None
+    serial_comm = SerialCommunication(threaded=False, latency_tracer=latency_tracer)
+    serial_link = AsyncSerialLink(serial_comm, loop, instrumentation=instrumentation)
+    keyboard_mouse_input = KeyboardMouseInputLoop(serial_link, status_dict) if not NovaConfig.NOVA_HEADLESS else None
+    if NovaConfig.COMPCOMM_COMMAND_SERVER == "rep":
+        api_comm = AsyncAPICommandRepCommunication(uri=NovaConfig.COMPCOMM_COMMAND_URI)
+    else:
+        api_comm = AsyncAPICommandRouterCommunication(loop, uri=NovaConfig.COMPCOMM_COMMAND_URI)
+
+    controller_control = ControllerControlLoop(status_dict, router)
+    command_loops = [controller_control, ExternalInputControlLoop(serial_link, status_dict, router)]
+    command_runs = [instrumentation.timed(stage, command_loop.run) for stage, command_loop in zip(["controller", "external_input"], command_loops)]
+
+    # face detection reads its frame from a dict of its own, which only changes between two runs
+    vision_dict = { "overlay" : window_base.overlay }
+    face_detection = FaceDetectionControlLoop(serial_link, vision_dict)
+
+    timed_keyboard = instrumentation.timed("keyboard", keyboard_mouse_input.run) if keyboard_mouse_input is not None else None
+    timed_face_detection = instrumentation.timed("face_detection", face_detection.run)
+    timed_api = instrumentation.timed("api", api_comm.handle)
+
+# capture and face detection are timed on their executor threads, including the wait for the camera
+def setupInstrumentation():
+    global instrumentation
+    global timed_capture
+    global timed_finalise
+    global commands_in
+
+    instrumentation = Instrumentation()
+    timed_capture = instrumentation.timed("capture", window_base.captureFrame)
+    timed_finalise = instrumentation.timed("finalise", window_base.finaliseFrame)
+    commands_in = instrumentation.counter("in")
+    status_dict["instrumentation"] = instrumentation
+
+# signals wake the event loop, where the handler of ControllerControlLoop would only set a flag
+def setupSignals(loop):
+    for signal_number in [signal.SIGINT, signal.SIGTERM]:
+        try:
+            loop.add_signal_handler(signal_number, onSignal, signal_number)
+        except NotImplementedError:
+            pass # Windows: ControllerControlLoop's own handler stops the controller on the next event
+
+def onSignal(signal_number):
+    controller_control.stop(f"signal {signal_number}")
+    checkRunning()
+
+# hands the commands of an input loop to the control loops right away
+def dispatch(input_loop):
+    while input_loop.commandAvailable():
+        router.publish(input_loop.readCommand())
+        commands_in.add()
+
+    for command_run in command_runs:
+        command_run()
+    checkRunning()
+
+def keepRunning():
+    if keyboard_mouse_input is not None and not keyboard_mouse_input.isRunning():
+        return False
+    return controller_control.isRunning() and not window_base.sourceFinished()
+
+def checkRunning():
+    if not keepRunning():
+        stopped.set()
+
+async def serveAPI():
+    while True:
+        message = await api_comm.receive()
+        timed_api(message)
+        dispatch(api_comm)
+
+# live sources are read as fast as they deliver, the detection takes the newest frame;
+# fast replays wait for the detection, so every recorded frame is processed exactly once
+async def serveFrames(loop, camera_executor):
+    global latest_frame
+
+    while True:
+        frame = await loop.run_in_executor(camera_executor, timed_capture)
+        latest_frame = (frame, window_base.frameProducts())
+        vision_done.clear()
+        frame_ready.set()
+
+        if keyboard_mouse_input is not None:
+            timed_keyboard()
+            dispatch(keyboard_mouse_input)
+        timed_finalise(frame)
+        checkRunning()
+
+        if not window_base.frame_source.isLive():
+            await vision_done.wait()
+        elif not window_base.hasFrame():
+            await asyncio.sleep(NovaConfig.NOVA_CAMERA_RETRY_MS / 1000)
+
+async def serveVision(loop, detection_executor):
+    while True:
+        await frame_ready.wait()
+        frame_ready.clear()
+
+        vision_dict["frame"], vision_dict["frame_products"] = latest_frame
+        await loop.run_in_executor(detection_executor, timed_face_detection)
+        vision_done.set()
+
+async def serveReports(period_ms, report):
+    while True:
+        await asyncio.sleep(period_ms / 1000)
+        report()
+
+async def main():
+    global window_base
+    global status_dict
+    global router
+    global stopped
+    global frame_ready
+    global vision_done
+
+    loop = asyncio.get_running_loop()
+    status_dict = setupStatusDict()
+    router = CommandRouter()
+    stopped = asyncio.Event()
+    frame_ready = asyncio.Event()
+    vision_done = asyncio.Event()
+
+    # the camera thread waits on the camera itself, a capture thread of its own is not needed
+    window_base = WindowBaseLoop(threaded_capture=False)
+    status_dict["overlay"] = window_base.overlay
+    setupInstrumentation()
+    setupLoops(loop)
+    setupSignals(loop)
+
+    camera_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nova-camera")
+    detection_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nova-detection")
+    tasks = [
+        asyncio.ensure_future(serial_link.serve(lambda: dispatch(serial_comm))),
+        asyncio.ensure_future(serveAPI()),
+        asyncio.ensure_future(serveFrames(loop, camera_executor)),
+        asyncio.ensure_future(serveVision(loop, detection_executor))
+    ]
+    if instrumentation.enabled and NovaConfig.INSTRUMENTATION_REPORT_MS > 0:
+        tasks.append(asyncio.ensure_future(serveReports(NovaConfig.INSTRUMENTATION_REPORT_MS, instrumentation.report)))
+    if latency_tracer is not None and NovaConfig.LATENCY_TRACE_REPORT_MS > 0:
+        tasks.append(asyncio.ensure_future(serveReports(NovaConfig.LATENCY_TRACE_REPORT_MS, latency_tracer.report)))
+    stop = asyncio.ensure_future(stopped.wait())
+
+    try:
+        done, pending = await asyncio.wait(tasks + [stop], return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task is not stop:
+                task.result() # a failed task stops the controller with its exception
+    finally:
+        for task in tasks + [stop]:
+            task.cancel()
+        await asyncio.gather(*tasks, stop, return_exceptions=True)
+        camera_executor.shutdown()
+        detection_executor.shutdown()
+
+def cleanup():
+    for control_loop in command_loops + [face_detection]:
+        control_loop.cleanup()
+
+    serial_link.cleanup()
+    serial_comm.close()
+    api_comm.cleanup()
+    window_base.cleanup()
+    if latency_tracer is not None and NovaConfig.LATENCY_TRACE_PATH:
+        latency_tracer.export(NovaConfig.LATENCY_TRACE_PATH)
+
+if __name__ == '__main__':
+    asyncio.run(main())
+    cleanup()
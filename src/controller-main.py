@@ -2,32 +2,94 @@ import cv2 as cv
 from communication.serial_communication import SerialCommunication
 from communication.zmq_status_pub_communication import StatusPubCommunication
 from communication.zmq_apicommand_rep_communication import APICommandRepCommunication
+from communication.zmq_apicommand_router_communication import APICommandRouterCommunication
 from controlloop.window_base import WindowBaseLoop
 from controlloop.external_input import ExternalInputControlLoop
 from controlloop.keyboard_mouse_input import KeyboardMouseInputLoop
 from controlloop.facedetection import FaceDetectionControlLoop
+from controlloop.controller_control import ControllerControlLoop
 from config.config import NovaConfig
+from utils.command_router import CommandRouter
+from utils.scheduler import Scheduler
+from utils.instrumentation import Instrumentation
+from utils.latency_trace import LatencyTracer
 
 def setupInputLoops():
     global serial_comm
     global keyboard_mouse_input
-
-    serial_comm = SerialCommunication()
-    keyboard_mouse_input = KeyboardMouseInputLoop(serial_comm, status_dict)
-    api_comm = APICommandRepCommunication(uri=NovaConfig.COMPCOMM_COMMAND_URI)
+    global api_comm
+    global timed_flush
+    global latency_tracer
+
+    latency_tracer = LatencyTracer() if NovaConfig.LATENCY_TRACE_ENABLED else None
+    serial_comm = SerialCommunication(latency_tracer=latency_tracer)
+    timed_flush = instrumentation.timed("flush", serial_comm.flushCommands)
+    keyboard_mouse_input = KeyboardMouseInputLoop(serial_comm, status_dict) if not NovaConfig.NOVA_HEADLESS else None
+    if NovaConfig.COMPCOMM_COMMAND_SERVER == "rep":
+        api_comm = APICommandRepCommunication(uri=NovaConfig.COMPCOMM_COMMAND_URI)
+    else:
+        api_comm = APICommandRouterCommunication(uri=NovaConfig.COMPCOMM_COMMAND_URI)
 
     loops = []
-    loops.append(serial_comm)
-    loops.append(keyboard_mouse_input)
-    loops.append(api_comm)
+    loops.append(instrument("serial", serial_comm))
+    if keyboard_mouse_input is not None:
+        loops.append(instrument("keyboard", keyboard_mouse_input))
+    loops.append(instrument("api", api_comm))
     return loops
 
 def setupControlLoops():
-    loops = []
-    loops.append(ExternalInputControlLoop(serial_comm, status_dict))
-    loops.append(FaceDetectionControlLoop(serial_comm, status_dict))
-    #loops.append(StatusPubCommunication(status_dict, NovaConfig.COMPCOMM_STATUS_PUB_URI, NovaConfig.STATUS_PUBLISH_FREQUENCY_MS))
-    return loops
+    global controller_control
+    global command_loops
+    global face_detection
+
+    controller_control = instrument("controller", ControllerControlLoop(status_dict, router))
+    face_detection = instrument("face_detection", FaceDetectionControlLoop(serial_comm, status_dict))
+
+    command_loops = []
+    command_loops.append(controller_control)
+    command_loops.append(instrument("external_input", ExternalInputControlLoop(serial_comm, status_dict, router)))
+    #command_loops.append(StatusPubCommunication(status_dict, router, NovaConfig.COMPCOMM_STATUS_PUB_URI, NovaConfig.STATUS_PUBLISH_FREQUENCY_MS))
+    return command_loops + [face_detection]
+
+# every part of the main loop is a task with its own period; the order below is also the priority
+# when several tasks are due at the same time, so Nova's serial line is serviced first
+def setupScheduler():
+    scheduler = Scheduler(max_sleep_ms=NovaConfig.SCHEDULER_MAX_SLEEP_MS)
+    periods = NovaConfig.SCHEDULER_PERIODS_MS
+
+    scheduler.add("serial", runSerial, periods["serial"], priority=0)
+    scheduler.add("commands", runCommands, periods["commands"], priority=1)
+    scheduler.add("api", runAPI, periods["api"], priority=2)
+    scheduler.add("frame", runFrame, periods["frame"], priority=3)
+    scheduler.add("vision", runVision, periods["vision"], priority=4)
+    if NovaConfig.SCHEDULER_REPORT_MS > 0:
+        scheduler.add("report", scheduler.report, NovaConfig.SCHEDULER_REPORT_MS, priority=5)
+    if instrumentation.enabled and NovaConfig.INSTRUMENTATION_REPORT_MS > 0:
+        scheduler.add("timing", instrumentation.report, NovaConfig.INSTRUMENTATION_REPORT_MS, priority=6)
+    if latency_tracer is not None and NovaConfig.LATENCY_TRACE_REPORT_MS > 0:
+        scheduler.add("latency", latency_tracer.report, NovaConfig.LATENCY_TRACE_REPORT_MS, priority=7)
+    return scheduler
+
+# the stages of the main loop are timed through these wrappers
+def setupInstrumentation():
+    global instrumentation
+    global timed_runs
+    global timed_capture
+    global timed_finalise
+    global commands_in
+    global commands_out
+
+    instrumentation = Instrumentation()
+    timed_runs = {}
+    timed_capture = instrumentation.timed("capture", window_base.captureFrame)
+    timed_finalise = instrumentation.timed("finalise", window_base.finaliseFrame)
+    commands_in = instrumentation.counter("in")
+    commands_out = instrumentation.counter("out")
+    status_dict["instrumentation"] = instrumentation
+
+def instrument(stage, loop):
+    timed_runs[loop] = instrumentation.timed(stage, loop.run)
+    return loop
 
 def setupStatusDict():
     statusdict = {}
@@ -35,46 +97,75 @@ def setupStatusDict():
 
     return statusdict
 
-def loop():
-    global status_dict
-
-    cmds = []
-    status_dict["frame"] = window_base.captureFrame()
-
-    for input_loop in input_loops:
-        input_loop.run()
-        while input_loop.commandAvailable():
-            cmds.append(input_loop.readCommand())
-
-    for control_loop in control_loops:
-        control_loop.run(cmds)
-
-    window_base.finaliseFrame(status_dict["frame"])
-    status_dict.pop("frame", None)
+def runInputLoop(input_loop):
+    timed_runs[input_loop]()
+    while input_loop.commandAvailable():
+        router.publish(input_loop.readCommand())
+        commands_in.add()
+
+# commands written by any task go out with the next serial run
+def runSerial():
+    runInputLoop(serial_comm)
+    commands_out.add(timed_flush())
+
+def runCommands():
+    for command_loop in command_loops:
+        timed_runs[command_loop]()
+
+def runAPI():
+    runInputLoop(api_comm)
+
+# the latest frame stays in the status dict for the vision task, which runs at its own rate
+def runFrame():
+    captureFrame()
+    if keyboard_mouse_input is not None:
+        runInputLoop(keyboard_mouse_input)
+    timed_finalise(status_dict["frame"])
+
+# the vision task takes a new camera frame up itself instead of waiting for the frame task,
+# which measurably was the largest part of the latency from camera to Nova (see utils.latency_trace)
+def runVision():
+    if window_base.newFrameAvailable():
+        captureFrame()
+    timed_runs[face_detection]()
+
+def captureFrame():
+    status_dict["frame"] = timed_capture()
+    status_dict["frame_products"] = window_base.frameProducts()
 
 def main():
     global input_loops
     global control_loops
     global window_base
     global status_dict
+    global router
 
     status_dict = setupStatusDict()
+    router = CommandRouter()
 
     window_base = WindowBaseLoop()
+    status_dict["overlay"] = window_base.overlay
+    setupInstrumentation()
     input_loops = setupInputLoops()
     control_loops = setupControlLoops()
 
-    while keepRunning():
-        loop()
+    captureFrame()
+    scheduler = setupScheduler()
+    scheduler.run(keepRunning)
 
 def keepRunning():
-    return keyboard_mouse_input.isRunning() # add different kill signal sources if needed
+    if keyboard_mouse_input is not None and not keyboard_mouse_input.isRunning():
+        return False
+    return controller_control.isRunning() and not window_base.sourceFinished() # add different kill signal sources if needed
 
 def cleanup():
     for control_loop in control_loops:
         control_loop.cleanup()
 
     serial_comm.close()
+    window_base.cleanup()
+    if latency_tracer is not None and NovaConfig.LATENCY_TRACE_PATH:
+        latency_tracer.export(NovaConfig.LATENCY_TRACE_PATH)
 
 if __name__ == '__main__':
     main()
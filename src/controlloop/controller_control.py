@@ -0,0 +1,37 @@
+import signal
+from utils.commandtype_enum import CommandType
+
+# stops the controller on a quit command from the API, or on SIGINT / SIGTERM;
+# without a window this replaces the 'q' key of the keyboard input
+class ControllerControlLoop:
+    def __init__(self, status_dict, router):
+        self.status_dict = status_dict
+        self.commands = router.subscribe(CommandType.CONTROLLER)
+        self.running = True
+
+        for signal_number in [signal.SIGINT, signal.SIGTERM]:
+            signal.signal(signal_number, self.__onSignal)
+
+    def __onSignal(self, signal_number, frame):
+        self.stop(f"signal {signal_number}")
+
+    def stop(self, reason):
+        if self.running:
+            self.running = False
+            print(f"[cntr] Closing Nova controller after {reason}... Bye")
+
+    def __processCommand(self, cmd):
+        if cmd.operation == "quit":
+            self.stop("quit command")
+        else:
+            print(f"[ctrl] Ignored unknown controller command: {cmd.operation}")
+
+    def run(self):
+        while self.commands.commandAvailable():
+            self.__processCommand(self.commands.readCommand())
+
+    def isRunning(self):
+        return self.running
+
+    def cleanup(self):
+        pass
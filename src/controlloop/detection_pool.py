@@ -0,0 +1,120 @@
+# runs face detection in worker processes, so detection does not hold up the main loop and can use several cores
+# 1. the main loop copies the downscaled grayscale frame into a free slot of a shared ring buffer and queues a job with its frame id
+# 2. a worker detects faces in the slot and returns them tagged with the frame id, which frees the slot again
+# 3. the main loop picks up results without blocking; only results newer than the last one are used, and they
+#    carry the capture time of their frame, which is older than the frame the main loop is at
+# frames are skipped while all slots are taken, so detection never queues up behind the camera;
+# a slot without result after the slot timeout is freed, and a worker that died is replaced
+
+import ctypes
+import multiprocessing
+import time
+import numpy as np
+from collections import deque, namedtuple
+from queue import Empty
+from multiprocessing.sharedctypes import RawArray
+from config.config import NovaConfig
+from controlloop.face_detector import FaceDetector
+
+# the faces found in a frame, with the frame's capture time and when it was handed to the detection
+DetectionResult = namedtuple("DetectionResult", ["frame_id", "timestamp", "submitted_at", "faces"])
+
+def detectionWorker(buffer, slot_size, jobs, results):
+    frames = np.frombuffer(buffer, dtype=np.uint8)
+    detector = FaceDetector()
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+
+        frame_id, timestamp, submitted_at, slot, shape, region = job
+        start = slot * slot_size
+        frame = frames[start:start + int(np.prod(shape))].reshape(shape)
+        results.put((slot, DetectionResult(frame_id, timestamp, submitted_at, detector.detectScaled(frame, region))))
+
+    detector.close()
+
+class DetectionWorkerPool:
+    def __init__(self, workers=NovaConfig.FACE_DETECTION_WORKERS, slots=NovaConfig.FACE_DETECTION_FRAME_SLOTS,
+                    max_frame_size=(NovaConfig.NOVA_CAMERA_CAPTURE_SIZE_X, NovaConfig.NOVA_CAMERA_CAPTURE_SIZE_Y),
+                    slot_timeout_ms=NovaConfig.FACE_DETECTION_SLOT_TIMEOUT_MS):
+        self.slot_timeout = slot_timeout_ms / 1000
+        self.downscale = NovaConfig.FACE_DETECTION_DOWNSCALE
+        self.slot_size = int(np.ceil(max_frame_size[0] * self.downscale)) * int(np.ceil(max_frame_size[1] * self.downscale))
+        self.buffer = RawArray(ctypes.c_uint8, slots * self.slot_size)
+        self.frames = np.frombuffer(self.buffer, dtype=np.uint8)
+        self.free_slots = deque(range(slots))
+        self.taken_slots = {} # slot : (frame id, submitted at) of the frame in detection
+        self.latest_frame_id = -1
+
+        self.jobs = multiprocessing.Queue()
+        self.results = multiprocessing.Queue()
+        self.workers = [self.__startWorker(i) for i in range(workers)]
+
+    def __startWorker(self, index):
+        worker = multiprocessing.Process(target=detectionWorker, name=f"nova-detection-{index}", daemon=True,
+                    args=(self.buffer, self.slot_size, self.jobs, self.results))
+        worker.start()
+        return worker
+
+    # returns False when the frame was skipped
+    def submit(self, frame_id, frame_products, region=None):
+        if len(self.free_slots) == 0:
+            return False
+
+        frame = frame_products.scaled(self.downscale)
+        if frame.nbytes > self.slot_size:
+            print(f"[ctrl] Frame of {frame.shape} does not fit the detection buffer, skipped it.")
+            return False
+
+        slot = self.free_slots.popleft()
+        start = slot * self.slot_size
+        self.frames[start:start + frame.nbytes].reshape(frame.shape)[...] = frame
+        submitted_at = time.monotonic()
+        self.taken_slots[slot] = (frame_id, submitted_at)
+        self.jobs.put((frame_id, frame_products.timestamp, submitted_at, slot, frame.shape, region))
+        return True
+
+    # returns the newest DetectionResult since the last call, or None
+    def latestResult(self):
+        latest = None
+        while True:
+            try:
+                slot, result = self.results.get_nowait()
+            except Empty:
+                break
+
+            if self.taken_slots.get(slot, (None,))[0] == result.frame_id: # not freed by a timeout before
+                del self.taken_slots[slot]
+                self.free_slots.append(slot)
+            if result.frame_id > self.latest_frame_id:
+                self.latest_frame_id = result.frame_id
+                latest = result
+
+        self.__restartDeadWorkers()
+        self.__freeTimedOutSlots()
+        return latest
+
+    def __restartDeadWorkers(self):
+        for i, worker in enumerate(self.workers):
+            if not worker.is_alive():
+                print(f"[ctrl] Detection worker {worker.name} died with exit code {worker.exitcode}, restarted it.")
+                self.workers[i] = self.__startWorker(i)
+
+    # the job queue is shared, so the slot a dead or hung worker held is only known by its missing result
+    def __freeTimedOutSlots(self):
+        now = time.monotonic()
+        for slot, (frame_id, submitted_at) in list(self.taken_slots.items()):
+            if now - submitted_at > self.slot_timeout:
+                print(f"[ctrl] Detection of frame {frame_id} timed out, freed its slot.")
+                del self.taken_slots[slot]
+                self.free_slots.append(slot)
+
+    def close(self):
+        for worker in self.workers:
+            self.jobs.put(None)
+        for worker in self.workers:
+            worker.join(timeout=1)
+            if worker.is_alive():
+                worker.terminate()
@@ -1,18 +1,23 @@
+from communication.protocol import createCommand
 from utils.commandtype_enum import CommandType
 
 class ExternalInputControlLoop():
-    def __init__(self, serial_communication, status_dict):
+    def __init__(self, serial_communication, status_dict, router):
         self.serial_comm = serial_communication
         self.status_dict = status_dict
+        self.commands = router.subscribe(CommandType.INPUT)
+        self.modes = { node.code : mode for mode, node in createCommand().root.children.items() }
 
-    def __processCommand(self):
-        pass
+    # mode changes also come from the API, keep current_mode in line with what is sent to Nova
+    def __processCommand(self, cmd):
+        if cmd.operation == "set_mode" and len(cmd.args) > 0 and str(cmd.args[0]) in self.modes:
+            self.status_dict["current_mode"] = self.modes[str(cmd.args[0])]
+
+        self.serial_comm.write(cmd.path, cmd.args)
 
-    def run(self, cmds):
-        for cmd in cmds:
-            if cmd[0] == CommandType.INPUT:
-                self.serial_comm.writeCommand(cmd[1:])
-                cmds.remove(cmd)
+    def run(self):
+        while self.commands.commandAvailable():
+            self.__processCommand(self.commands.readCommand())
 
     def cleanup(self):
         pass
@@ -0,0 +1,138 @@
+import cv2 as cv
+from concurrent.futures import ThreadPoolExecutor
+from config.config import NovaConfig
+
+# one of the bundled Haar cascades
+# - tier: hits of the lowest tier that found anything are used, higher tiers are fallbacks
+# - min_size: smallest hit in pixels of the captured frame
+# - mirror: also run on the mirrored frame, for cascades trained on one side only (profile faces);
+#   the mirrored pass has a classifier of its own, as detectMultiScale is not safe to run twice at once on one classifier
+# - head: hits are head and shoulders, the head is estimated from the top half
+class Cascade:
+    def __init__(self, path, tier=0, min_size=NovaConfig.FACE_DETECTION_MIN_SIZE, mirror=False, head=False):
+        self.classifier = cv.CascadeClassifier(path)
+        if self.classifier.empty():
+            print(f"[ctrl] Failed to load cascade {path}.")
+        self.mirror_classifier = cv.CascadeClassifier(path) if mirror else None
+        self.tier = tier
+        self.min_size = min_size
+        self.mirror = mirror
+        self.head = head
+
+    def detect(self, gray, scale, mirrored=False):
+        min_size = max(1, int(self.min_size * scale))
+        if mirrored:
+            width = gray.shape[1]
+            hits = [(width - x - w, y, w, h) for (x,y,w,h) in self.__detectMultiScale(self.mirror_classifier, cv.flip(gray, 1), min_size)]
+        else:
+            hits = [tuple(hit) for hit in self.__detectMultiScale(self.classifier, gray, min_size)]
+
+        if self.head:
+            hits = [(x + w//4, y, w//2, h//2) for (x,y,w,h) in hits]
+        return hits
+
+    def __detectMultiScale(self, classifier, gray, min_size):
+        if classifier.empty():
+            return []
+
+        return classifier.detectMultiScale(
+            gray,
+            scaleFactor=NovaConfig.FACE_DETECTION_SCALE_FACTOR,
+            minNeighbors=NovaConfig.FACE_DETECTION_MIN_NEIGHBORS,
+            minSize=(min_size, min_size),
+            flags=cv.CASCADE_SCALE_IMAGE
+        )
+
+# greedy non-maximum suppression; larger boxes win over the boxes they overlap by more than max_overlap (intersection over union)
+def suppressOverlaps(boxes, max_overlap):
+    kept = []
+    for box in sorted(boxes, key=lambda box: box[2] * box[3], reverse=True):
+        if all([overlap(box, other) <= max_overlap for other in kept]):
+            kept.append(box)
+    return kept
+
+def overlap(a, b):
+    width = min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0])
+    height = min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0
+
+    intersection = width * height
+    return intersection / (a[2] * a[3] + b[2] * b[3] - intersection)
+
+# runs the configured cascades on the grayscale frame downscaled by downscale, optionally restricted to a region
+# - cascades run in parallel on a thread pool, OpenCV releases the GIL while detecting
+# - fallback tiers keep the lock on a target that turns away; unless configured otherwise
+#   they only search a region around the target, not the full frame
+# - regions and found faces are (x, y, w, h) in full resolution coordinates
+# - holds no tracking state, so the same detector works inline and in detection worker processes
+class FaceDetector:
+    def __init__(self, cascades=NovaConfig.FACE_DETECTION_CASCADES, downscale=NovaConfig.FACE_DETECTION_DOWNSCALE):
+        self.cascades = [Cascade(**cascade) for cascade in cascades]
+        self.downscale = downscale
+
+        # one task per cascade, and one more for the mirrored frame
+        self.tasks = [(cascade, False) for cascade in self.cascades] + [(cascade, True) for cascade in self.cascades if cascade.mirror]
+        self.primary_tasks = [task for task in self.tasks if task[0].tier == min([cascade.tier for cascade in self.cascades])]
+        self.executor = ThreadPoolExecutor(max_workers=len(self.tasks), thread_name_prefix="nova-cascade") if len(self.tasks) > 1 else None
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def detect(self, frame_products, region=None):
+        return self.detectScaled(frame_products.scaled(self.downscale), region)
+
+    # gray is the frame already converted and downscaled
+    def detectScaled(self, gray, region=None):
+        scale = self.downscale
+        roi_x, roi_y = 0, 0
+        if region is not None:
+            roi_x, roi_y, roi_w, roi_h = [int(value * scale) for value in region]
+            gray = gray[roi_y:roi_y+roi_h, roi_x:roi_x+roi_w]
+
+        tasks = self.tasks if region is not None or NovaConfig.FACE_DETECTION_FALLBACK_FULL_FRAME else self.primary_tasks
+        if self.executor is None or len(tasks) == 1:
+            hits = [cascade.detect(gray, scale, mirrored) for cascade, mirrored in tasks]
+        else:
+            hits = list(self.executor.map(lambda task: task[0].detect(gray, scale, task[1]), tasks))
+
+        faces = self.__mergeHits(tasks, hits)
+        return [(int((x + roi_x) / scale), int((y + roi_y) / scale), int(w / scale), int(h / scale)) for (x,y,w,h) in faces]
+
+    def __mergeHits(self, tasks, hits):
+        found = [task[0].tier for task, task_hits in zip(tasks, hits) if len(task_hits) > 0]
+        if len(found) == 0:
+            return []
+
+        tier = min(found)
+        tier_hits = [hit for task, task_hits in zip(tasks, hits) if task[0].tier == tier for hit in task_hits]
+        return suppressOverlaps(tier_hits, NovaConfig.FACE_DETECTION_MAX_OVERLAP)
+
+# decides where to search next: the whole frame, or after a lock the last face plus a margin;
+# a full search is forced every few frames to pick up new faces
+class SearchRegion:
+    def __init__(self, margin=NovaConfig.FACE_DETECTION_ROI_MARGIN, reacquire_frames=NovaConfig.FACE_DETECTION_REACQUIRE_FRAMES):
+        self.margin = margin
+        self.reacquire_frames = reacquire_frames
+        self.last_face = None
+        self.frames_since_full_search = 0
+
+    # the face of the target that is sent to Nova; None drops the lock
+    def update(self, face):
+        self.last_face = face
+
+    # returns None for a full frame search
+    def next(self, frame_shape):
+        if self.last_face is None or self.frames_since_full_search >= self.reacquire_frames:
+            self.frames_since_full_search = 0
+            return None
+
+        self.frames_since_full_search += 1
+        height, width = frame_shape[:2]
+        x, y, w, h = self.last_face
+        margin_x = int(w * self.margin)
+        margin_y = int(h * self.margin)
+        x0, y0 = max(0, x - margin_x), max(0, y - margin_y)
+        x1, y1 = min(width, x + w + margin_x), min(height, y + h + margin_y)
+        return (x0, y0, x1 - x0, y1 - y0)
@@ -0,0 +1,60 @@
+import cv2 as cv
+from config.config import NovaConfig
+
+# follows a face between detections by matching the face patch from the last detection
+# in a window around its last position, on the downscaled grayscale frame
+# - faces are (x, y, w, h) in full resolution coordinates
+# - confidence is the normalised correlation of the best match; below min_confidence the target is lost
+class TemplateTracker:
+    def __init__(self, downscale=NovaConfig.FACE_DETECTION_DOWNSCALE, search_margin=NovaConfig.FACE_TRACKING_SEARCH_MARGIN,
+                    min_confidence=NovaConfig.FACE_TRACKING_MIN_CONFIDENCE):
+        self.downscale = downscale
+        self.search_margin = search_margin
+        self.min_confidence = min_confidence
+        self.template = None
+        self.position = None
+        self.confidence = 0
+
+    def isActive(self):
+        return self.template is not None
+
+    def start(self, frame_products, face):
+        gray = frame_products.scaled(self.downscale)
+        x, y, w, h = [int(value * self.downscale) for value in face]
+        if w == 0 or h == 0:
+            self.stop()
+            return
+
+        self.template = gray[y:y+h, x:x+w].copy()
+        self.position = (x, y, w, h)
+        self.confidence = 1
+
+    def stop(self):
+        self.template = None
+        self.position = None
+        self.confidence = 0
+
+    # returns the face in the frame, or None when the target is lost
+    def track(self, frame_products):
+        if not self.isActive():
+            return None
+
+        gray = frame_products.scaled(self.downscale)
+        height, width = gray.shape[:2]
+        x, y, w, h = self.position
+        margin_x = int(w * self.search_margin)
+        margin_y = int(h * self.search_margin)
+        x0, y0 = max(0, x - margin_x), max(0, y - margin_y)
+        x1, y1 = min(width, x + w + margin_x), min(height, y + h + margin_y)
+        if x1 - x0 < w or y1 - y0 < h:
+            self.stop()
+            return None
+
+        scores = cv.matchTemplate(gray[y0:y1, x0:x1], self.template, cv.TM_CCOEFF_NORMED)
+        _, self.confidence, _, (match_x, match_y) = cv.minMaxLoc(scores)
+        if self.confidence < self.min_confidence:
+            self.stop()
+            return None
+
+        self.position = (x0 + match_x, y0 + match_y, w, h)
+        return tuple([int(value / self.downscale) for value in self.position])
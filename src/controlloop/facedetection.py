@@ -1,83 +1,186 @@
+import statistics
+import time
 import cv2 as cv
 from config.config import NovaConfig
-from utils.commandtype_enum import CommandType
-from communication.protocol import createCommand, NovaProtocolCommandBuilder
+from controlloop.face_detector import FaceDetector, SearchRegion
+from controlloop.detection_pool import DetectionWorkerPool, DetectionResult
+from controlloop.face_tracker import TemplateTracker
+from controlloop.target_tracker import TargetTracker
+from controlloop.overlay import OverlayCompositor
+from utils.frequencytimer import FrequencyTimer
+from utils.latency_trace import LatencyTrace, TracedArgs
 
 class FaceDetectionControlLoop:
+    SET_COORDINATES = ("track_object", "module", "set_coordinates")
+
     def __init__(self, serial_communication, status_dict):
-        self.commands_send = 0
-        self.commands_acked = 0
         self.serial_comm = serial_communication
         self.status_dict = status_dict
-        self.face_cascade = self.__setupFaceRecognition()
-
-    def __setupFaceRecognition(self):
-        return cv.CascadeClassifier(NovaConfig.FACE_DETECTION_FACE_CASCADE_PATH)
-
-    def __detectFaces(self, frame, faceCascade):
-        gray = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
-
-        faces = faceCascade.detectMultiScale(
-            gray,
-            scaleFactor=1.1,
-            minNeighbors=5,
-            minSize=(30, 30),
-            flags=cv.CASCADE_SCALE_IMAGE
-        )
-        return faces
-
-    def __drawDetectedFaceHighlight(self, frame, face):
+        self.search_region = SearchRegion()
+        self.faces = [] # latest detection, drawn until a newer one arrives
+
+        # "inline" detects on the main loop, "process" hands frames to detection worker processes
+        if NovaConfig.FACE_DETECTION_BACKEND == "process":
+            self.detection_pool = DetectionWorkerPool()
+        else:
+            self.detector = FaceDetector()
+            self.detection_pool = None
+
+        # in "detect_track" mode the tracker follows the face between detections
+        self.tracker = TemplateTracker() if NovaConfig.FACE_DETECTION_MODE == "detect_track" else None
+        self.frames_since_detection = 0
+        self.detected_frames = 0
+        self.tracked_frames = 0
+        self.report_timer = FrequencyTimer(NovaConfig.FACE_DETECTION_REPORT_MS)
+
+        # one target is followed across frames and its position is filtered and predicted ahead
+        self.target_tracker = TargetTracker()
+        self.target_id = None
+        self.frame_seq = None
+        self.draw = not NovaConfig.NOVA_HEADLESS
+        self.trace_latency = NovaConfig.LATENCY_TRACE_ENABLED
+
+    # returns a DetectionResult with the faces and the frame they were found in, or None without new faces,
+    # and whether they come from a full detection
+    def __detectFaces(self, frame, frame_products, started_at):
+        if frame_products.seq == self.frame_seq:
+            return (None, False) # no new frame from the camera since the last tick
+        self.frame_seq = frame_products.seq
+        self.frames_since_detection += 1
+
+        if self.tracker is None or not self.tracker.isActive() or self.frames_since_detection >= NovaConfig.FACE_DETECTION_TRACK_FRAMES:
+            result = self.__runDetection(frame, frame_products, started_at)
+            if result is not None:
+                self.detected_frames += 1
+                self.frames_since_detection = 0
+                return (result, True)
+
+        if self.tracker is not None and self.tracker.isActive():
+            face = self.tracker.track(frame_products)
+            if face is None:
+                self.frames_since_detection = NovaConfig.FACE_DETECTION_TRACK_FRAMES # lost the face, detect again
+                return (DetectionResult(frame_products.seq, frame_products.timestamp, started_at, []), False)
+            self.tracked_frames += 1
+            return (DetectionResult(frame_products.seq, frame_products.timestamp, started_at, [face]), False)
+
+        return (None, False)
+
+    # returns the faces detected since the last call, or None; with worker processes they belong to an older frame
+    def __runDetection(self, frame, frame_products, started_at):
+        region = self.search_region.next(frame.shape)
+
+        if self.detection_pool is None:
+            return DetectionResult(frame_products.seq, frame_products.timestamp, started_at, self.detector.detect(frame_products, region))
+
+        self.detection_pool.submit(frame_products.seq, frame_products, region)
+        return self.detection_pool.latestResult()
+
+    def __drawDetectedFaceHighlight(self, shapes, face):
         x, y, w, h = face
-        cv.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-
-    def __detectAndProcessFaces(self, frame):
-        faces = self.__detectFaces(frame, self.face_cascade)
-
-        retX = -1
-        retY = -1
-        found = False
-
-        for (x,y,w,h) in faces:
-            centerX = x + w/2;
-            centerY = y + h/2;
-
-            self.__drawDetectedFaceHighlight(frame, (x,y,w,h))
-
-            # TODO what to do when multiple faces are detected; now only the last one is transmitted
-            found = True
-            retX = centerX
-            retY = centerY
-
-        return (found, retX, retY)
-
-    def __allCommandsAcknowledged(self):
-        return self.commands_send is self.commands_acked
-
-    def __writeCoordinates(self, center_x, center_y):
-        x = int(center_x * NovaConfig.FACE_DETECTION_COORDINATE_CORRECTION_X)
-        y = int(center_y * NovaConfig.FACE_DETECTION_COORDINATE_CORRECTION_Y)
-
-        cmd = createCommand().setModule("track_object").setOperation("set_coordinates").setArgs([x,y]).build()
-
-        self.serial_comm.writeCommand(cmd)
-        self.commands_send += 1
-
-    def __processResponses(self, cmds):
-        for cmd in cmds:
-            if cmd[0] == CommandType.NOVA:
-                module = cmd[1]
-                operation = cmd[3]
-                if module is "track_object" and operation is "ack_coordinates":
-                    self.commands_acked += 1
-                    cmds.remove(cmd)
-
-    def run(self, cmds):
-        self.__processResponses(cmds)
+        shapes.append(OverlayCompositor.rectangle((x, y), (x+w, y+h), (0, 255, 0), 2))
+
+    def __drawTarget(self, shapes, target, center):
+        x, y = int(center[0]), int(center[1])
+        shapes.append(OverlayCompositor.circle((x, y), 4, (0, 0, 255), -1))
+        shapes.append(OverlayCompositor.text(str(target.id), (x + 6, y - 6), (0, 0, 255)))
+
+    # faces and target are drawn on the overlay, the frame itself stays as captured;
+    # they stay on screen until the next run, as the window may be refreshed more often than faces are detected
+    def __detectAndProcessFaces(self, frame, frame_products, started_at):
+        result, detected = self.__detectFaces(frame, frame_products, started_at)
+        (found, target, center) = self.__selectTarget(frame_products, result, detected)
+
+        if self.draw:
+            shapes = []
+            for face in self.faces:
+                self.__drawDetectedFaceHighlight(shapes, face)
+            if found:
+                self.__drawTarget(shapes, target, center)
+            self.status_dict["overlay"].setShapes("faces", shapes)
+
+        if found:
+            return (True, center[0], center[1], result)
+
+        return (False, -1, -1, result)
+
+    # coordinates are only sent for a target seen in new faces, once per detection or tracked frame;
+    # the target is updated at the capture time of the frame the faces were found in
+    def __selectTarget(self, frame_products, result, detected):
+        if result is None:
+            return (False, None, None)
+
+        self.faces = result.faces
+        target = self.target_tracker.update(result.faces, result.timestamp)
+        target_face = target.face() if target is not None else None
+        self.search_region.update(target_face)
+
+        # with worker processes the detection belongs to an older frame, where the face may have been elsewhere;
+        # the template is only cut from the frame the face was found in, otherwise the next detection starts the tracker
+        if detected and self.tracker is not None:
+            if target_face is None:
+                self.tracker.stop()
+            elif result.frame_id == frame_products.seq:
+                self.tracker.start(frame_products, target_face)
+
+        if target is None or target.missed > 0:
+            return (False, target, None)
+
+        if target.id != self.target_id:
+            self.target_id = target.id
+            print(f"[ctrl] Following face {target.id}.")
+
+        return (True, target, self.target_tracker.predictCenter(self.__estimateLatency(result.timestamp)))
+
+    # time from capturing a frame until the servos act on it: the age of the frame,
+    # configured camera and servo latency and half the serial round trip
+    def __estimateLatency(self, captured_at):
+        latency_ms = (time.monotonic() - captured_at) * 1000 + NovaConfig.FACE_TARGET_LATENCY_MS
+        round_trip_times = self.serial_comm.roundTripTimes()
+        if len(round_trip_times) > 0:
+            latency_ms += statistics.median(round_trip_times) / 2
+        return latency_ms / 1000
+
+    # acks are matched by the serial communication, which allows a few coordinates in flight
+    def __canSendCoordinates(self):
+        return self.serial_comm.windowOpen("track_object", "set_coordinates")
+
+    # map full resolution pixels onto Nova's tracking range; the coordinates carry the latency trace of the frame
+    # the faces were found in, which the detection took up at result.submitted_at
+    def __writeCoordinates(self, center_x, center_y, frame_products, result):
+        height, width = frame_products.image.shape[:2]
+        x = min(max(int(center_x * NovaConfig.FACE_DETECTION_COORDINATE_RANGE_X / width), 0), NovaConfig.FACE_DETECTION_COORDINATE_RANGE_X)
+        y = min(max(int(center_y * NovaConfig.FACE_DETECTION_COORDINATE_RANGE_Y / height), 0), NovaConfig.FACE_DETECTION_COORDINATE_RANGE_Y)
+
+        args = [x,y]
+        if self.trace_latency:
+            trace = LatencyTrace(result.frame_id, result.timestamp)
+            trace.stamp("vision", result.submitted_at)
+            trace.stamp("coordinates")
+            args = TracedArgs(args, trace)
+
+        self.serial_comm.write(self.SET_COORDINATES, args)
+
+    def __reportDetectTrackRatio(self):
+        total = self.detected_frames + self.tracked_frames
+        if total > 0:
+            print(f"[ctrl] Faces detected in {self.detected_frames} and tracked in {self.tracked_frames} frames ({100 * self.tracked_frames / total:.0f}% tracked).")
+        self.detected_frames = 0
+        self.tracked_frames = 0
+
+    def run(self):
+        started_at = time.monotonic()
         frame = self.status_dict["frame"]
+        frame_products = self.status_dict["frame_products"]
+
+        (found, x,y, result) = self.__detectAndProcessFaces(frame, frame_products, started_at)
+        if found and self.__canSendCoordinates():
+            self.__writeCoordinates(x, y, frame_products, result)
 
-        (found, x,y) = self.__detectAndProcessFaces(frame)
-        if self.__allCommandsAcknowledged() and found:
-            self.__writeCoordinates(x, y)
+        if self.report_timer.frequencyElapsed():
+            self.__reportDetectTrackRatio()
 
     def cleanup(self):
-        pass
+        if self.detection_pool is not None:
+            self.detection_pool.close()
+        else:
+            self.detector.close()
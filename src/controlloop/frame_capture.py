@@ -0,0 +1,66 @@
+# grabs frames from a live frame source (camera or realtime replay) on a separate thread, so the main loop never waits for the camera
+# 1. frames are read into a small ring of preallocated buffers, which also keeps the driver from queueing up old frames
+# 2. every frame gets an increasing id and the time it was captured
+# 3. latest() returns the newest frame; its buffer is not written to until the next call to latest()
+# 4. once a read fails there is no newest frame until the source delivers again, so a lost camera is not hidden behind its last frame
+
+import threading
+import time
+import numpy as np
+from config.config import NovaConfig
+
+class ThreadedFrameCapture:
+    def __init__(self, frame_source, buffers=NovaConfig.NOVA_CAMERA_CAPTURE_BUFFERS):
+        self.frame_source = frame_source
+        shape = (NovaConfig.NOVA_CAMERA_CAPTURE_SIZE_Y, NovaConfig.NOVA_CAMERA_CAPTURE_SIZE_X, 3)
+        self.buffers = [np.empty(shape, np.uint8) for i in range(max(3, buffers))] # newest, in use and one to write to
+
+        self.lock = threading.Lock()
+        self.newest = None # (buffer index, frame id, timestamp)
+        self.in_use = None
+        self.frame_id = 0
+
+        self.running = threading.Event()
+        self.running.set()
+        self.thread = threading.Thread(target=self.__captureThread, name="nova-capture", daemon=True)
+        self.thread.start()
+
+    # returns (frame, frame id, timestamp) of the newest frame, or None before the first frame
+    def latest(self):
+        with self.lock:
+            if self.newest is None:
+                return None
+
+            index, frame_id, timestamp = self.newest
+            self.in_use = index
+            return (self.buffers[index], frame_id, timestamp)
+
+    # id of the newest frame without taking it, None before the first frame
+    def latestId(self):
+        newest = self.newest
+        return newest[1] if newest is not None else None
+
+    def stop(self):
+        self.running.clear()
+        self.thread.join()
+
+    def __captureThread(self):
+        while self.running.is_set():
+            index = self.__freeBuffer()
+            ret, frame = self.frame_source.read(self.buffers[index])
+            if not ret:
+                with self.lock:
+                    self.newest = None
+                time.sleep(NovaConfig.NOVA_CAMERA_RETRY_MS / 1000)
+                continue
+
+            timestamp = time.monotonic()
+            with self.lock:
+                self.buffers[index] = frame # the camera may deliver another size than requested
+                self.frame_id += 1
+                self.newest = (index, self.frame_id, timestamp)
+
+    def __freeBuffer(self):
+        with self.lock:
+            taken = [self.in_use, self.newest[0] if self.newest is not None else None]
+        return [index for index in range(len(self.buffers)) if index not in taken][0]
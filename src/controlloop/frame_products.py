@@ -0,0 +1,42 @@
+import cv2 as cv
+
+# images derived from one captured frame, computed on first use and shared by all control loops
+# - seq is the sequence number of the frame the products belong to, timestamp the time.monotonic() it was captured
+# - products are computed from the frame as it is at that moment; draw on the overlay, never on the frame
+class FrameProducts:
+    def __init__(self, seq, image, timestamp):
+        self.seq = seq
+        self.image = image
+        self.timestamp = timestamp
+        self.products = {}
+
+    def gray(self):
+        if "gray" not in self.products:
+            self.products["gray"] = cv.cvtColor(self.image, cv.COLOR_BGR2GRAY)
+        return self.products["gray"]
+
+    # the grayscale frame resized by factor
+    def scaled(self, factor):
+        if factor == 1:
+            return self.gray()
+
+        key = ("scaled", factor)
+        if key not in self.products:
+            self.products[key] = cv.resize(self.gray(), None, fx=factor, fy=factor, interpolation=cv.INTER_AREA)
+        return self.products[key]
+
+    def equalized(self, factor=1):
+        key = ("equalized", factor)
+        if key not in self.products:
+            self.products[key] = cv.equalizeHist(self.scaled(factor))
+        return self.products[key]
+
+    # the grayscale frame followed by levels - 1 images of half the size of the one before
+    def pyramid(self, levels):
+        key = ("pyramid", levels)
+        if key not in self.products:
+            pyramid = [self.gray()]
+            for level in range(1, levels):
+                pyramid.append(cv.pyrDown(pyramid[-1]))
+            self.products[key] = pyramid
+        return self.products[key]
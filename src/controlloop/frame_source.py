@@ -0,0 +1,140 @@
+# where frames come from: the camera, or a recording replayed from a video file or a directory of images
+# - all sources are read like a cv.VideoCapture: read(image) returns (ret, frame)
+# - replays deliver frames at the configured capture size, either at the recorded frame rate ("realtime")
+#   or as fast as they are read ("fast"), and start again at the end when looping
+# - frame_index is the index of the last frame in the recording, loops the number of times it started again
+
+import os
+import time
+import cv2 as cv
+from config.config import NovaConfig
+
+class CameraSource:
+    def __init__(self, index=0):
+        self.capture = cv.VideoCapture(index)
+        self.capture.set(cv.CAP_PROP_FRAME_WIDTH,NovaConfig.NOVA_CAMERA_CAPTURE_SIZE_X)
+        self.capture.set(cv.CAP_PROP_FRAME_HEIGHT,NovaConfig.NOVA_CAMERA_CAPTURE_SIZE_Y)
+        self.capture.set(cv.CAP_PROP_BUFFERSIZE, 1) # not supported by every backend
+
+    def isLive(self):
+        return True
+
+    def isFinished(self):
+        return False
+
+    def read(self, image=None):
+        return self.capture.read(image)
+
+    def release(self):
+        self.capture.release()
+
+class ReplaySource:
+    def __init__(self, name, fps, pace=NovaConfig.NOVA_FRAME_SOURCE_PACE, loop=NovaConfig.NOVA_FRAME_SOURCE_LOOP):
+        self.name = name
+        self.frame_time = 1 / fps if fps > 0 else 1 / NovaConfig.NOVA_FRAME_SOURCE_FPS
+        self.pace = pace
+        self.loop = loop
+        self.frame_index = -1
+        self.loops = 0
+        self.finished = False
+        self.next_frame_at = None
+
+    # live sources produce frames over time; fast replays are read once per tick instead
+    def isLive(self):
+        return self.pace == "realtime"
+
+    def isFinished(self):
+        return self.finished
+
+    def read(self, image=None):
+        if self.finished:
+            return (False, image)
+
+        frame = self.readNext()
+        if frame is None and self.loop and self.frame_index >= 0:
+            print(f"[ctrl] Replayed {self.frame_index + 1} frames from {self.name}, starting again.")
+            self.rewind()
+            self.frame_index = -1
+            self.loops += 1
+            frame = self.readNext()
+
+        if frame is None:
+            print(f"[ctrl] Replayed {self.frame_index + 1} frames from {self.name}, finished.")
+            self.finished = True
+            return (False, image)
+
+        self.frame_index += 1
+        self.__waitForFrameTime()
+        return (True, self.__fitFrame(frame, image))
+
+    # sleeps until the frame is due; a replay that fell behind by more than a second continues from now
+    def __waitForFrameTime(self):
+        if self.pace != "realtime":
+            return
+
+        now = time.monotonic()
+        if self.next_frame_at is None or now - self.next_frame_at > 1:
+            self.next_frame_at = now
+        elif self.next_frame_at > now:
+            time.sleep(self.next_frame_at - now)
+        self.next_frame_at += self.frame_time
+
+    def __fitFrame(self, frame, image):
+        size = (NovaConfig.NOVA_CAMERA_CAPTURE_SIZE_X, NovaConfig.NOVA_CAMERA_CAPTURE_SIZE_Y)
+        if (frame.shape[1], frame.shape[0]) != size:
+            frame = cv.resize(frame, size, interpolation=cv.INTER_AREA)
+        if image is not None and image.shape == frame.shape:
+            image[...] = frame
+            return image
+        return frame
+
+class VideoFileSource(ReplaySource):
+    def __init__(self, path, **kwargs):
+        self.path = path
+        self.capture = cv.VideoCapture(path)
+        if not self.capture.isOpened():
+            print(f"[ctrl] Failed to open video {path}.")
+        super().__init__(path, self.capture.get(cv.CAP_PROP_FPS), **kwargs)
+
+    def readNext(self):
+        ret, frame = self.capture.read()
+        return frame if ret else None
+
+    # reopening works for every container, seeking does not
+    def rewind(self):
+        self.capture.release()
+        self.capture = cv.VideoCapture(self.path)
+
+    def release(self):
+        self.capture.release()
+
+class ImageDirectorySource(ReplaySource):
+    EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+    def __init__(self, path, fps=NovaConfig.NOVA_FRAME_SOURCE_FPS, **kwargs):
+        self.files = sorted([os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(self.EXTENSIONS)])
+        self.next_file = 0
+        super().__init__(path, fps, **kwargs)
+
+    def readNext(self):
+        while self.next_file < len(self.files):
+            frame = cv.imread(self.files[self.next_file])
+            self.next_file += 1
+            if frame is not None:
+                return frame
+        return None
+
+    def rewind(self):
+        self.next_file = 0
+
+    def release(self):
+        pass
+
+# "camera", or the path of a video file or a directory of images
+def createFrameSource(source=NovaConfig.NOVA_FRAME_SOURCE):
+    if source == "camera":
+        return CameraSource()
+    elif os.path.isdir(source):
+        return ImageDirectorySource(source)
+    else:
+        return VideoFileSource(source)
@@ -3,7 +3,7 @@ from collections import deque
 from enum import Enum
 from decimal import Decimal
 from communication.protocol import mapPIDNodes
-from communication.protocol import createCommand
+from communication.protocol import NovaCommand, createCommand
 from config.config import NovaConfig
 from utils.commandtype_enum import CommandType
 from utils.frequencytimer import FrequencyTimer
@@ -122,12 +122,27 @@ class KeyboardMouseInputLoop:
         self.mouse_prev_y = 0
         cv.setMouseCallback(NovaConfig.NOVA_WINDOW_NAME, self.__onMouse)
         self.mouse_timer = FrequencyTimer(NovaConfig.EXTERNAL_INPUT_MOUSE_FREQUENCY_MS)
+        self.status_timer = FrequencyTimer(NovaConfig.INSTRUMENTATION_STATUS_MS)
 
+    # the text is rendered once into overlay layers, toggling only changes their visibility;
+    # the status view is rendered again at INSTRUMENTATION_STATUS_MS while it is shown
     def __setupFrameDecoration(self):
         self.show_controls = False
         self.help_text_keys = self.__buildHelpTextForKeys()
         self.show_status = False
 
+        overlay = self.status_dict["overlay"]
+        overlay.setText("controls", self.help_text_keys, origin=(5, 10), line_height=12, visible=self.show_controls)
+        overlay.setText("status", self.__buildStatusText(), origin=(330, 10), visible=self.show_status)
+
+    # current mode and the timings of the main loop, when it is instrumented
+    def __buildStatusText(self):
+        status_text = [f"mode : {self.status_dict['current_mode']}"]
+        instrumentation = self.status_dict.get("instrumentation")
+        if instrumentation is not None:
+            status_text += instrumentation.statusLines()
+        return status_text
+
     def __buildHelpTextForKeys(self):
         help_text_keys = []
         for id, items in self.actionDict.items():
@@ -163,7 +178,8 @@ class KeyboardMouseInputLoop:
     def __processModeSelectionCommand(self, operation):
         new_module = self.actionDict[operation][self.ACTION_OPERATION_ID_INDEX]
         if new_module != self.status_dict["current_mode"]:
-            cmd = [CommandType.INPUT] + createCommand().setModule("nova").setOperation("set_mode").setModeArg(new_module).build()
+            mode_code = createCommand().root.children[new_module].code
+            cmd = NovaCommand(CommandType.INPUT, "nova", "module", "set_mode", (mode_code,))
             self.move_commands.append(cmd)
             self.status_dict["current_mode"] = new_module
 
@@ -171,8 +187,8 @@ class KeyboardMouseInputLoop:
         degrees = NovaConfig.EXTERNAL_INPUT_STEPSIZE_DEGREES if positive_direction else -NovaConfig.EXTERNAL_INPUT_STEPSIZE_DEGREES
 
         asset = self.actionDict[move][self.ACTION_OPERATION_ID_INDEX]
-        args = [degrees]
-        cmd = [CommandType.INPUT] + createCommand().setModule("external_input").setAsset(asset).setOperation("set_degree_steps").setArgs(args).build()
+        args = (degrees,)
+        cmd = NovaCommand(CommandType.INPUT, "external_input", asset, "set_degree_steps", args)
         self.move_commands.append(cmd)
 
     def __processTunePIDCommand(self, move):
@@ -184,8 +200,8 @@ class KeyboardMouseInputLoop:
         else: # actual tuning of pid settings (up | down)
             asset = self.__determinePIDasset(module)
             pid_values = self.__determinePIDvalues(move, module, asset)
-            args = list( int( x * 1000 ) for x in pid_values ) # nova command protocol allows only to send 'int', not 'decimal'
-            cmd = [CommandType.INPUT] + createCommand().setModule(module).setAsset(asset).setOperation("set_tuning").setArgs(args).build()
+            args = tuple( int( x * 1000 ) for x in pid_values ) # nova command protocol allows only to send 'int', not 'decimal'
+            cmd = NovaCommand(CommandType.INPUT, module, asset, "set_tuning", args)
             self.move_commands.append(cmd)
 
     def __togglePIDcontrollerToTune(self, module):
@@ -203,7 +219,7 @@ class KeyboardMouseInputLoop:
         if module in self.pid_index:
             asset = self.__determinePIDasset(module)
             print(f"Toggled PID controller {asset} for module {module} auto/manual")
-            cmd = [CommandType.INPUT] + createCommand().setModule(module).setAsset(asset).setOperation("toggle_auto").build()
+            cmd = NovaCommand(CommandType.INPUT, module, asset, "toggle_auto", ())
             self.move_commands.append(cmd)
 
     def __determinePIDasset(self, module):
@@ -302,8 +318,8 @@ class KeyboardMouseInputLoop:
         move = self.mouse_index[mouse_event_id]
 
         asset = self.actionDict[move][self.ACTION_OPERATION_ID_INDEX]
-        args = [degrees]
-        cmd = [CommandType.INPUT] + createCommand().setModule("external_input").setAsset(asset).setOperation("set_degree_steps").setArgs(args).build()
+        args = (degrees,)
+        cmd = NovaCommand(CommandType.INPUT, "external_input", asset, "set_degree_steps", args)
         self.move_commands.append(cmd)
 
     def __calculateMouseWheelMove(self, flags):
@@ -315,27 +331,20 @@ class KeyboardMouseInputLoop:
         degrees = NovaConfig.EXTERNAL_INPUT_STEPSIZE_DEGREES if direction == 'PLUS' else -NovaConfig.EXTERNAL_INPUT_STEPSIZE_DEGREES
         move = self.mouse_index['MOUSE_SCROLL_' + direction]
         asset = self.actionDict[move][self.ACTION_OPERATION_ID_INDEX]
-        args = [degrees]
-        cmd = [CommandType.INPUT] + createCommand().setModule("external_input").setAsset(asset).setOperation("set_degree_steps").setArgs(args).build()
+        args = (degrees,)
+        cmd = NovaCommand(CommandType.INPUT, "external_input", asset, "set_degree_steps", args)
         self.move_commands.append(cmd)
 
-    # TODO lots of config items to put in NovaConfig here
-    def __decorateFrame(self, frame):
-        if self.show_controls:
-            index = 0
-            for line in self.help_text_keys:
-                x_coordinate = 5
-                y_coordinate = 10 + (12 * (index))
-                cv.putText(frame, line, (x_coordinate, y_coordinate), cv.FONT_HERSHEY_PLAIN, 0.75, (255,255,255), thickness = 1)
-                index += 1
-        if self.show_status:
-            # TODO placeholder text and position. Perhaps move this whole function to another class...
-            cv.putText(frame, "Here comes status stuff...", (200, 180), cv.FONT_HERSHEY_PLAIN, 0.75, (255,255,255), thickness = 1)
+    def __decorateFrame(self):
+        overlay = self.status_dict["overlay"]
+        overlay.show("controls", self.show_controls)
+        if self.show_status and self.status_timer.frequencyElapsed():
+            overlay.setText("status", self.__buildStatusText(), origin=(330, 10))
+        overlay.show("status", self.show_status)
 
     def run(self):
         self.__readKeyInput()
-        frame = self.status_dict["frame"]
-        self.__decorateFrame(frame)
+        self.__decorateFrame()
 
     def isRunning(self):
         return self.running
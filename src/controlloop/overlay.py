@@ -0,0 +1,106 @@
+# draws everything that is shown on top of the camera frame, without touching the frame itself
+# - text layers (help text, status) are rendered once into a BGRA image and only again when their text changes
+# - the visible layers are merged into one layer that is blended onto a copy of the frame with two vectorised
+#   bitwise operations, limited to the area that actually holds text; text is drawn without anti-aliasing,
+#   so every pixel of a layer is either opaque or transparent
+# - shapes that change with every detection (face rectangles) are drawn onto the copy; each control loop
+#   replaces its own group of shapes, which stays on screen until it is replaced
+
+import numpy as np
+import cv2 as cv
+from config.config import NovaConfig
+
+class TextLayer:
+    def __init__(self, key, image, visible):
+        self.key = key
+        self.image = image
+        self.visible = visible
+
+class OverlayCompositor:
+    def __init__(self, size=(NovaConfig.NOVA_CAMERA_CAPTURE_SIZE_X, NovaConfig.NOVA_CAMERA_CAPTURE_SIZE_Y)):
+        self.size = size
+        self.layers = {}
+        self.shapes = {} # name of the group -> shapes
+        self.blend = None # (x, y, mask of the pixels to keep, colours of the others) of the merged visible layers
+        self.dirty = False
+        self.renders = 0
+
+    # renders the layer only when the lines or their looks changed
+    def setText(self, name, lines, origin=(5, 10), line_height=12, font_scale=0.75, color=(255,255,255), visible=True):
+        key = (tuple(lines), origin, line_height, font_scale, color)
+        layer = self.layers.get(name)
+        if layer is not None and layer.key == key:
+            self.show(name, visible)
+            return
+
+        image = np.zeros((self.size[1], self.size[0], 4), np.uint8)
+        for index, line in enumerate(lines):
+            position = (origin[0], origin[1] + line_height * index)
+            cv.putText(image, line, position, cv.FONT_HERSHEY_PLAIN, font_scale, tuple(color) + (255,), thickness = 1)
+
+        self.layers[name] = TextLayer(key, image, visible)
+        self.renders += 1
+        self.dirty = True
+
+    def show(self, name, visible):
+        layer = self.layers[name]
+        if layer.visible != visible:
+            layer.visible = visible
+            self.dirty = True
+
+    # shapes are made with rectangle(), circle() and text()
+    def setShapes(self, name, shapes):
+        self.shapes[name] = shapes
+
+    @staticmethod
+    def rectangle(top_left, bottom_right, color, thickness=1):
+        return lambda image: cv.rectangle(image, top_left, bottom_right, color, thickness)
+
+    @staticmethod
+    def circle(center, radius, color, thickness=1):
+        return lambda image: cv.circle(image, center, radius, color, thickness)
+
+    @staticmethod
+    def text(text, position, color, font_scale=0.5):
+        return lambda image: cv.putText(image, text, position, cv.FONT_HERSHEY_SIMPLEX, font_scale, color, 1)
+
+    # returns a copy of the frame with the overlay on top
+    def compose(self, frame):
+        if self.dirty:
+            self.__mergeLayers()
+
+        image = frame.copy()
+        if self.blend is not None:
+            x, y, keep, colors = self.blend
+            height = min(keep.shape[0], image.shape[0] - y)
+            width = min(keep.shape[1], image.shape[1] - x)
+            if height > 0 and width > 0:
+                area = image[y:y+height, x:x+width]
+                cv.bitwise_and(area, keep[:height, :width], dst=area)
+                cv.bitwise_or(area, colors[:height, :width], dst=area)
+
+        for shapes in list(self.shapes.values()): # groups may be replaced from a detection thread
+            for shape in shapes:
+                shape(image)
+        return image
+
+    # later layers are drawn over earlier ones
+    def __mergeLayers(self):
+        self.dirty = False
+        merged = np.zeros((self.size[1], self.size[0], 4), np.uint8)
+        for layer in self.layers.values():
+            if layer.visible:
+                mask = layer.image[:, :, 3] > 0
+                merged[mask] = layer.image[mask]
+
+        points = cv.findNonZero(merged[:, :, 3])
+        if points is None:
+            self.blend = None
+            return
+
+        x, y, width, height = cv.boundingRect(points)
+        area = merged[y:y+height, x:x+width]
+        opaque = area[:, :, 3:4] > 0
+        keep = np.where(opaque, 0, 255).astype(np.uint8).repeat(3, axis=2)
+        colors = np.where(opaque, area[:, :, :3], 0).astype(np.uint8)
+        self.blend = (x, y, keep, colors)
@@ -0,0 +1,118 @@
+import time
+import numpy as np
+import cv2 as cv
+from config.config import NovaConfig
+
+# one person being followed; the centre is filtered with a constant velocity Kalman filter (state x, y, vx, vy)
+# - process_noise is the standard deviation of the acceleration in pixels/s², measurement_noise that of a detected centre in pixels
+# - the time between detections varies, so the model is rebuilt for every prediction
+class Target:
+    MAX_SPEED = 1000 # pixels/s, standard deviation of the unknown velocity of a new target
+
+    def __init__(self, target_id, face, process_noise, measurement_noise, timestamp):
+        self.id = target_id
+        self.size = tuple(face[2:4])
+        self.missed = 0 # detections in a row without a matching face
+        self.updated_at = timestamp
+        self.acceleration_variance = process_noise ** 2
+
+        self.kalman = cv.KalmanFilter(4, 2)
+        self.kalman.measurementMatrix = np.array([[1, 0, 0, 0], [0, 1, 0, 0]], np.float32)
+        self.kalman.measurementNoiseCov = np.eye(2, dtype=np.float32) * measurement_noise ** 2
+        self.kalman.errorCovPost = np.diag([measurement_noise ** 2, measurement_noise ** 2, self.MAX_SPEED ** 2, self.MAX_SPEED ** 2]).astype(np.float32)
+        center_x, center_y = Target.center(face)
+        self.kalman.statePost = np.array([[center_x], [center_y], [0], [0]], np.float32)
+
+    @staticmethod
+    def center(face):
+        x, y, w, h = face
+        return (x + w/2, y + h/2)
+
+    def position(self):
+        return (float(self.kalman.statePost[0][0]), float(self.kalman.statePost[1][0]))
+
+    def velocity(self):
+        return (float(self.kalman.statePost[2][0]), float(self.kalman.statePost[3][0]))
+
+    # the face around the filtered centre
+    def face(self):
+        center_x, center_y = self.position()
+        w, h = self.size
+        return (int(center_x - w/2), int(center_y - h/2), w, h)
+
+    def predict(self, timestamp):
+        dt = max(0, timestamp - self.updated_at)
+        self.kalman.transitionMatrix = np.array([[1, 0, dt, 0], [0, 1, 0, dt], [0, 0, 1, 0], [0, 0, 0, 1]], np.float32)
+        q = self.acceleration_variance
+        self.kalman.processNoiseCov = np.array([[q * dt**4 / 4, 0, q * dt**3 / 2, 0],
+                                                [0, q * dt**4 / 4, 0, q * dt**3 / 2],
+                                                [q * dt**3 / 2, 0, q * dt**2, 0],
+                                                [0, q * dt**3 / 2, 0, q * dt**2]], np.float32)
+        self.kalman.predict()
+        self.kalman.statePost = self.kalman.statePre.copy() # keeps the prediction when no face is matched
+        self.kalman.errorCovPost = self.kalman.errorCovPre.copy()
+        self.updated_at = timestamp
+
+    def correct(self, face):
+        center_x, center_y = Target.center(face)
+        self.kalman.correct(np.array([[center_x], [center_y]], np.float32))
+        self.size = tuple(face[2:4])
+        self.missed = 0
+
+# selects one target among the detected faces and keeps following it across frames
+# - a face is matched to the target when its centre is within gate target sizes of the predicted centre
+# - the target is kept for max_missed detections without a match, after that the largest face becomes a new target
+class TargetTracker:
+    def __init__(self, gate=NovaConfig.FACE_TARGET_GATE, max_missed=NovaConfig.FACE_TARGET_MAX_MISSED,
+                    process_noise=NovaConfig.FACE_TARGET_PROCESS_NOISE, measurement_noise=NovaConfig.FACE_TARGET_MEASUREMENT_NOISE,
+                    clock=time.monotonic):
+        self.gate = gate
+        self.max_missed = max_missed
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.clock = clock
+        self.target = None
+        self.next_id = 1
+
+    # returns the target after this detection, or None; a target with missed > 0 was not seen in this detection
+    def update(self, faces, timestamp=None):
+        timestamp = self.clock() if timestamp is None else timestamp
+
+        if self.target is not None:
+            self.target.predict(timestamp)
+            face = self.__closestFace(faces)
+            if face is not None:
+                self.target.correct(face)
+                return self.target
+
+            self.target.missed += 1
+            if self.target.missed <= self.max_missed:
+                return self.target
+            self.target = None
+
+        if len(faces) > 0:
+            largest = max(faces, key=lambda face: face[2] * face[3])
+            self.target = Target(self.next_id, largest, self.process_noise, self.measurement_noise, timestamp)
+            self.next_id += 1
+
+        return self.target
+
+    # where the target will be after latency seconds, to make up for the time it takes the servos to get there
+    def predictCenter(self, latency):
+        x, y = self.target.position()
+        vx, vy = self.target.velocity()
+        return (x + vx * latency, y + vy * latency)
+
+    def __closestFace(self, faces):
+        predicted_x, predicted_y = self.target.position()
+        closest = None
+        closest_distance = self.gate * max(self.target.size)
+
+        for face in faces:
+            center_x, center_y = Target.center(face)
+            distance = ((center_x - predicted_x) ** 2 + (center_y - predicted_y) ** 2) ** 0.5
+            if distance <= closest_distance:
+                closest = face
+                closest_distance = distance
+
+        return closest
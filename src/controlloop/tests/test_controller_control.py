@@ -0,0 +1,40 @@
+import signal
+import unittest
+
+from controller_control import *
+from command_router import CommandRouter
+from communication.protocol import NovaCommand
+
+class ControllerControlLoopTest(unittest.TestCase):
+    QUIT = NovaCommand(CommandType.CONTROLLER, "controller", "module", "quit", ())
+
+    def setUp(self):
+        self.handlers = { signal_number : signal.getsignal(signal_number) for signal_number in [signal.SIGINT, signal.SIGTERM] }
+        self.router = CommandRouter()
+        self.control = ControllerControlLoop({}, self.router)
+
+    def tearDown(self):
+        for signal_number, handler in self.handlers.items():
+            signal.signal(signal_number, handler)
+
+    def testQuitCommandStopsTheController(self):
+        self.router.publish(self.QUIT)
+        self.assertTrue(self.control.isRunning())
+
+        self.control.run()
+        self.assertFalse(self.control.isRunning())
+
+    def testOnlyControllerCommandsAreRoutedToIt(self):
+        self.router.publish(NovaCommand(CommandType.INPUT, "controller", "module", "quit", ()))
+        self.router.publish(NovaCommand(CommandType.CONTROLLER, "controller", "module", "restart", ()))
+        self.control.run()
+
+        self.assertTrue(self.control.isRunning())
+        self.assertEqual(self.router.unrouted, 1)
+
+    def testSignalStopsTheController(self):
+        signal.getsignal(signal.SIGTERM)(signal.SIGTERM, None)
+        self.assertFalse(self.control.isRunning())
+
+if __name__ == "__main__":
+    unittest.main()
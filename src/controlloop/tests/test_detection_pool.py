@@ -0,0 +1,35 @@
+import time
+import unittest
+import numpy as np
+
+from detection_pool import *
+from frame_products import FrameProducts
+
+class DetectionWorkerPoolTest(unittest.TestCase):
+    def createProducts(self, seq):
+        return FrameProducts(seq, np.zeros((48, 64, 3), np.uint8), 0)
+
+    def testSlotWithoutResultIsFreedAfterTimeout(self):
+        pool = DetectionWorkerPool(workers=0, slots=2, max_frame_size=(64, 48), slot_timeout_ms=50)
+        self.assertTrue(pool.submit(1, self.createProducts(1)))
+        self.assertTrue(pool.submit(2, self.createProducts(2)))
+        self.assertFalse(pool.submit(3, self.createProducts(3)))
+
+        time.sleep(0.1)
+        self.assertIsNone(pool.latestResult())
+        self.assertTrue(pool.submit(4, self.createProducts(4)))
+        pool.close()
+
+    def testDeadWorkerIsRestarted(self):
+        pool = DetectionWorkerPool(workers=1, slots=2, max_frame_size=(64, 48))
+        worker = pool.workers[0]
+        worker.terminate()
+        worker.join()
+
+        pool.latestResult()
+        self.assertIsNot(pool.workers[0], worker)
+        self.assertTrue(pool.workers[0].is_alive())
+        pool.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+from face_detector import *
+
+class SuppressOverlapsTest(unittest.TestCase):
+    def testOverlap(self):
+        self.assertEqual(overlap((0,0,10,10), (20,20,10,10)), 0)
+        self.assertEqual(overlap((0,0,10,10), (0,0,10,10)), 1)
+        self.assertAlmostEqual(overlap((0,0,10,10), (5,0,10,10)), 50 / 150)
+
+    def testLargestOfOverlappingBoxesIsKept(self):
+        boxes = [(10,10,40,40), (12,12,44,44), (200,200,30,30)]
+        self.assertListEqual(suppressOverlaps(boxes, 0.3), [(12,12,44,44), (200,200,30,30)])
+
+    def testSlightlyOverlappingBoxesAreKept(self):
+        boxes = [(0,0,10,10), (8,0,10,10)]
+        self.assertEqual(len(suppressOverlaps(boxes, 0.3)), 2)
+
+class CascadeTest(unittest.TestCase):
+    def testMirroredPassHasAClassifierOfItsOwn(self):
+        cascade = Cascade(NovaConfig.FACE_DETECTION_PROFILE_CASCADE_PATH, mirror=True)
+        self.assertIsNot(cascade.classifier, cascade.mirror_classifier)
+        self.assertIsNone(Cascade(NovaConfig.FACE_DETECTION_FACE_CASCADE_PATH).mirror_classifier)
+
+class SearchRegionTest(unittest.TestCase):
+    def testFullFrameWithoutLock(self):
+        self.assertIsNone(SearchRegion(1.0, 15).next((480,640,3)))
+
+    def testRegionAroundLockIsClipped(self):
+        region = SearchRegion(1.0, 15)
+        region.update((10,100,50,50))
+
+        self.assertEqual(region.next((480,640,3)), (0,50,110,150))
+
+    def testFullFrameIsSearchedPeriodically(self):
+        region = SearchRegion(1.0, 2)
+        region.update((100,100,50,50))
+
+        self.assertIsNotNone(region.next((480,640,3)))
+        self.assertIsNotNone(region.next((480,640,3)))
+        self.assertIsNone(region.next((480,640,3)))
+
+if __name__ == "__main__":
+    unittest.main()
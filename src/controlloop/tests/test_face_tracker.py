@@ -0,0 +1,46 @@
+import unittest
+import numpy as np
+
+from face_tracker import *
+from frame_products import FrameProducts
+
+class TemplateTrackerTest(unittest.TestCase):
+    SIZE = 40
+
+    def setUp(self):
+        self.random = np.random.RandomState(7)
+        self.patch = self.random.randint(0, 256, (self.SIZE, self.SIZE, 3)).astype(np.uint8)
+
+    # a textured patch on a plain background, at full resolution
+    def createFrame(self, seq, x, y, patch=None):
+        image = np.full((240, 320, 3), 128, np.uint8)
+        image[y:y+self.SIZE, x:x+self.SIZE] = self.patch if patch is None else patch
+        return FrameProducts(seq, image, 0)
+
+    def testFollowsShiftedPatch(self):
+        tracker = TemplateTracker(downscale=1.0, search_margin=0.5, min_confidence=0.6)
+        tracker.start(self.createFrame(1, 100, 80), (100, 80, self.SIZE, self.SIZE))
+
+        self.assertEqual(tracker.track(self.createFrame(2, 110, 86)), (110, 86, self.SIZE, self.SIZE))
+        self.assertEqual(tracker.track(self.createFrame(3, 104, 95)), (104, 95, self.SIZE, self.SIZE))
+        self.assertGreater(tracker.confidence, 0.99)
+        self.assertTrue(tracker.isActive())
+
+    def testStopsBelowMinConfidence(self):
+        tracker = TemplateTracker(downscale=1.0, search_margin=0.5, min_confidence=0.6)
+        tracker.start(self.createFrame(1, 100, 80), (100, 80, self.SIZE, self.SIZE))
+
+        other_patch = self.random.randint(0, 256, (self.SIZE, self.SIZE, 3)).astype(np.uint8)
+        self.assertIsNone(tracker.track(self.createFrame(2, 100, 80, other_patch)))
+        self.assertFalse(tracker.isActive())
+        self.assertIsNone(tracker.track(self.createFrame(3, 100, 80)))
+
+    def testStopsWhenSearchWindowIsSmallerThanTemplate(self):
+        tracker = TemplateTracker(downscale=1.0, search_margin=0, min_confidence=0.6)
+        tracker.start(self.createFrame(1, 280, 80), (300, 80, self.SIZE, self.SIZE)) # reaches past the right edge
+
+        self.assertIsNone(tracker.track(self.createFrame(2, 280, 80)))
+        self.assertFalse(tracker.isActive())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import threading
+import time
+import unittest
+import numpy as np
+
+from frame_capture import *
+
+class FakeVideoCapture:
+    def __init__(self):
+        self.frames = 0
+        self.reading = threading.Event()
+        self.failing = False
+
+    def read(self, image):
+        self.reading.wait()
+        time.sleep(0.001)
+        if self.failing:
+            return (False, None)
+        self.frames += 1
+        image[:] = self.frames
+        return (True, image)
+
+class ThreadedFrameCaptureTest(unittest.TestCase):
+    def waitForFrames(self, capture, count):
+        deadline = time.monotonic() + 2
+        while capture.frame_id < count and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+    def testNoFrameBeforeFirstCapture(self):
+        video_capture = FakeVideoCapture()
+        capture = ThreadedFrameCapture(video_capture, 3)
+
+        self.assertIsNone(capture.latest())
+        video_capture.reading.set()
+        capture.stop()
+
+    def testLatestIdDoesNotTakeTheFrame(self):
+        video_capture = FakeVideoCapture()
+        capture = ThreadedFrameCapture(video_capture, 3)
+        self.assertIsNone(capture.latestId())
+
+        video_capture.reading.set()
+        self.waitForFrames(capture, 2)
+        capture.stop()
+
+        self.assertEqual(capture.latestId(), capture.frame_id)
+        self.assertIsNone(capture.in_use)
+
+    def testLatestFrameWins(self):
+        video_capture = FakeVideoCapture()
+        capture = ThreadedFrameCapture(video_capture, 3)
+        video_capture.reading.set()
+        self.waitForFrames(capture, 5)
+
+        frame, frame_id, timestamp = capture.latest()
+        capture.stop()
+
+        self.assertGreaterEqual(frame_id, 5)
+        self.assertEqual(frame[0][0][0], frame_id % 256)
+        self.assertLessEqual(timestamp, time.monotonic())
+
+    def testFrameInUseIsNotOverwritten(self):
+        video_capture = FakeVideoCapture()
+        capture = ThreadedFrameCapture(video_capture, 3)
+        video_capture.reading.set()
+        self.waitForFrames(capture, 2)
+
+        frame, frame_id, _ = capture.latest()
+        self.waitForFrames(capture, frame_id + 10)
+        capture.stop()
+
+        self.assertTrue(np.all(frame == frame_id % 256))
+
+    def testNoFrameOnceReadsFail(self):
+        video_capture = FakeVideoCapture()
+        capture = ThreadedFrameCapture(video_capture, 3)
+        video_capture.reading.set()
+        self.waitForFrames(capture, 2)
+
+        video_capture.failing = True
+        deadline = time.monotonic() + 2
+        while capture.latest() is not None and time.monotonic() < deadline:
+            time.sleep(0.001)
+        capture.stop()
+
+        self.assertIsNone(capture.latest())
+        self.assertIsNone(capture.latestId())
+
+if __name__ == "__main__":
+    unittest.main()
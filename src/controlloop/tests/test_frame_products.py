@@ -0,0 +1,31 @@
+import unittest
+import numpy as np
+
+from frame_products import *
+
+class FrameProductsTest(unittest.TestCase):
+    def createProducts(self):
+        image = np.zeros((480, 640, 3), np.uint8)
+        image[100:200, 100:200] = (255, 255, 255)
+        return FrameProducts(7, image, 0)
+
+    def testProductsAreComputedOnce(self):
+        products = self.createProducts()
+
+        self.assertIs(products.gray(), products.gray())
+        self.assertIs(products.scaled(0.5), products.scaled(0.5))
+        self.assertIs(products.equalized(0.5), products.equalized(0.5))
+        self.assertIs(products.scaled(1), products.gray())
+
+    def testScaledSizes(self):
+        products = self.createProducts()
+
+        self.assertEqual(products.gray().shape, (480, 640))
+        self.assertEqual(products.scaled(0.5).shape, (240, 320))
+        self.assertEqual([level.shape for level in products.pyramid(3)], [(480, 640), (240, 320), (120, 160)])
+
+    def testSequenceNumber(self):
+        self.assertEqual(self.createProducts().seq, 7)
+
+if __name__ == "__main__":
+    unittest.main()
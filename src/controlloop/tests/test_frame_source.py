@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import numpy as np
+import cv2 as cv
+
+from frame_source import *
+
+class ImageDirectorySourceTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for i in range(3):
+            cv.imwrite(os.path.join(self.directory, f"frame{i}.png"), np.full((240, 320, 3), i * 50, np.uint8))
+        open(os.path.join(self.directory, "notes.txt"), "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def readAll(self, source, count):
+        return [source.read() for i in range(count)]
+
+    def testFramesAreReplayedInOrderAtCaptureSize(self):
+        source = ImageDirectorySource(self.directory, pace="fast", loop=False)
+        frames = [frame for ret, frame in self.readAll(source, 3)]
+
+        self.assertListEqual([frame[0][0][0] for frame in frames], [0, 50, 100])
+        self.assertEqual(frames[0].shape, (NovaConfig.NOVA_CAMERA_CAPTURE_SIZE_Y, NovaConfig.NOVA_CAMERA_CAPTURE_SIZE_X, 3))
+        self.assertEqual(source.frame_index, 2)
+
+    def testReplayFinishesWithoutLoop(self):
+        source = ImageDirectorySource(self.directory, pace="fast", loop=False)
+        results = self.readAll(source, 4)
+
+        self.assertFalse(results[3][0])
+        self.assertTrue(source.isFinished())
+
+    def testReplayLoops(self):
+        source = ImageDirectorySource(self.directory, pace="fast", loop=True)
+        results = self.readAll(source, 7)
+
+        self.assertTrue(all([ret for ret, frame in results]))
+        self.assertEqual(results[6][1][0][0][0], 0)
+        self.assertEqual(source.loops, 2)
+        self.assertEqual(source.frame_index, 0)
+
+    def testFramesAreCopiedIntoGivenImage(self):
+        source = ImageDirectorySource(self.directory, pace="fast")
+        image = np.empty((NovaConfig.NOVA_CAMERA_CAPTURE_SIZE_Y, NovaConfig.NOVA_CAMERA_CAPTURE_SIZE_X, 3), np.uint8)
+
+        ret, frame = source.read(image)
+        self.assertIs(frame, image)
+
+    def testRealtimePace(self):
+        source = ImageDirectorySource(self.directory, fps=50, pace="realtime")
+        start = time.monotonic()
+        self.readAll(source, 6)
+
+        self.assertGreaterEqual(time.monotonic() - start, 5 / 50)
+        self.assertTrue(source.isLive())
+
+    def testEmptyDirectoryFinishes(self):
+        empty = os.path.join(self.directory, "empty")
+        os.mkdir(empty)
+        source = ImageDirectorySource(empty, pace="fast")
+
+        self.assertFalse(source.read()[0])
+        self.assertTrue(source.isFinished())
+
+if __name__ == "__main__":
+    unittest.main()
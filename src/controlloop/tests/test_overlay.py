@@ -0,0 +1,65 @@
+import unittest
+import numpy as np
+
+from overlay import *
+
+class OverlayCompositorTest(unittest.TestCase):
+    def createFrame(self):
+        return np.zeros((240, 320, 3), np.uint8)
+
+    def testTextIsRenderedOnceUntilItChanges(self):
+        overlay = OverlayCompositor((320, 240))
+        overlay.setText("controls", ["q : Quit"])
+        overlay.setText("controls", ["q : Quit"])
+        self.assertEqual(overlay.renders, 1)
+
+        overlay.setText("controls", ["q : Quit the controller"])
+        self.assertEqual(overlay.renders, 2)
+
+    def testFrameIsNotModified(self):
+        overlay = OverlayCompositor((320, 240))
+        overlay.setText("controls", ["q : Quit"])
+        overlay.setShapes("faces", [OverlayCompositor.rectangle((10, 10), (50, 50), (0, 255, 0), 2)])
+        frame = self.createFrame()
+
+        image = overlay.compose(frame)
+        self.assertFalse(frame.any())
+        self.assertTrue(image.any())
+
+    def testTextIsBlendedOntoFrame(self):
+        overlay = OverlayCompositor((320, 240))
+        overlay.setText("status", ["status"], origin=(100, 100), color=(255, 255, 255))
+
+        image = overlay.compose(self.createFrame())
+        self.assertEqual(image.max(), 255)
+        self.assertFalse(image[:80].any())
+        self.assertTrue(image[85:105, 95:160].any())
+
+    def testHiddenLayersAreNotDrawn(self):
+        overlay = OverlayCompositor((320, 240))
+        overlay.setText("controls", ["q : Quit"], visible=False)
+        self.assertFalse(overlay.compose(self.createFrame()).any())
+
+        overlay.show("controls", True)
+        self.assertTrue(overlay.compose(self.createFrame()).any())
+        self.assertEqual(overlay.renders, 1)
+
+    def testShapesStayUntilReplaced(self):
+        overlay = OverlayCompositor((320, 240))
+        overlay.setShapes("faces", [OverlayCompositor.circle((20, 20), 4, (0, 0, 255), -1)])
+
+        self.assertTrue(overlay.compose(self.createFrame()).any())
+        self.assertTrue(overlay.compose(self.createFrame()).any())
+
+        overlay.setShapes("faces", [])
+        self.assertFalse(overlay.compose(self.createFrame()).any())
+
+    def testSmallerFrameIsClipped(self):
+        overlay = OverlayCompositor((320, 240))
+        overlay.setText("status", ["status"], origin=(100, 230))
+
+        image = overlay.compose(np.zeros((120, 160, 3), np.uint8))
+        self.assertEqual(image.shape, (120, 160, 3))
+
+if __name__ == "__main__":
+    unittest.main()
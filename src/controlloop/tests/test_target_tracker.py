@@ -0,0 +1,51 @@
+import unittest
+
+from target_tracker import *
+
+class TargetTrackerTest(unittest.TestCase):
+    def createTracker(self):
+        return TargetTracker(gate=1.0, max_missed=2, process_noise=400.0, measurement_noise=5.0)
+
+    def testLargestFaceBecomesTarget(self):
+        tracker = self.createTracker()
+        target = tracker.update([(0,0,40,40), (200,200,80,80), (400,100,60,60)], 0)
+
+        self.assertEqual(target.id, 1)
+        self.assertEqual(target.face(), (200,200,80,80))
+
+    def testTargetIsKeptWhenOtherFacesAppear(self):
+        tracker = self.createTracker()
+        tracker.update([(100,100,50,50)], 0)
+        target = tracker.update([(400,100,90,90), (105,100,50,50)], 0.1)
+
+        self.assertEqual(target.id, 1)
+        self.assertAlmostEqual(target.position()[0], 130, delta=1)
+
+    def testTargetIsDroppedAfterMaxMissed(self):
+        tracker = self.createTracker()
+        tracker.update([(100,100,50,50)], 0)
+        self.assertEqual(tracker.update([], 0.1).missed, 1)
+        self.assertEqual(tracker.update([(400,100,50,50)], 0.2).missed, 2)
+
+        target = tracker.update([(400,100,50,50)], 0.3)
+        self.assertEqual(target.id, 2)
+        self.assertEqual(target.missed, 0)
+
+    def testTargetIsLostWithoutFaces(self):
+        tracker = self.createTracker()
+        for timestamp in [0, 0.1, 0.2, 0.3]:
+            target = tracker.update([], timestamp)
+
+        self.assertIsNone(target)
+
+    def testPredictionLeadsMovingTarget(self):
+        tracker = self.createTracker()
+        for i in range(10):
+            tracker.update([(100 + 10*i, 100, 50, 50)], i * 0.1) # 100 pixels per second to the right
+
+        x, y = tracker.predictCenter(0.5)
+        self.assertAlmostEqual(x, 215 + 50, delta=5)
+        self.assertAlmostEqual(y, 125, delta=2)
+
+if __name__ == "__main__":
+    unittest.main()
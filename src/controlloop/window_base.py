@@ -1,41 +1,92 @@
 # class that maintains the window and processed frames
 # 1. capture a frame
-# 2. let controlloops apply appropriate processing (e.g., face detection)
-# 3. decorate frame with additional operations (e.g., display help text)
+# 2. let controlloops apply appropriate processing (e.g., face detection), sharing the preprocessed images of the frame
+# 3. decorate frame with additional operations (e.g., display help text) through the overlay, which leaves the frame itself untouched
 
+import time
 import cv2 as cv
 from config.config import NovaConfig
 from utils.commandtype_enum import CommandType
+from controlloop.frame_products import FrameProducts
+from controlloop.frame_capture import ThreadedFrameCapture
+from controlloop.frame_source import createFrameSource
+from controlloop.overlay import OverlayCompositor
 
+# in headless mode there is no window, frames are only captured
 class WindowBaseLoop:
-    def __init__(self):
-        self.__createWindow()
-        self.video_capture = self.__createVideoCapture()
+    def __init__(self, headless=NovaConfig.NOVA_HEADLESS, threaded_capture=NovaConfig.NOVA_CAMERA_THREADED):
+        self.headless = headless
+        if not self.headless:
+            self.__createWindow()
+        self.frame_source = createFrameSource()
+        # fast replays are read on the main loop, so every recorded frame is processed exactly once
+        self.frame_capture = ThreadedFrameCapture(self.frame_source) if threaded_capture and self.frame_source.isLive() else None
+        self.capture_id = None
         self.frame = None
+        self.frame_available = False
+        self.frame_seq = 0
+        self.frame_products = None
         self.no_video_available_image = self.__initNotAvailableImage()
+        self.overlay = OverlayCompositor()
 
     def __createWindow(self):
         cv.namedWindow(NovaConfig.NOVA_WINDOW_NAME, cv.WINDOW_NORMAL)
 
-    def __createVideoCapture(self):
-        cap = cv.VideoCapture(0) # capture from default camera
-        cap.set(cv.CAP_PROP_FRAME_WIDTH,NovaConfig.NOVA_CAMERA_CAPTURE_SIZE_X)
-        cap.set(cv.CAP_PROP_FRAME_HEIGHT,NovaConfig.NOVA_CAMERA_CAPTURE_SIZE_Y)
-        return cap
-
+    # the frame sequence number only changes with a new frame; the threaded capture hands out the newest frame
+    # again when the camera has not delivered a new one since the last tick
     def captureFrame(self):
-        ret, frame = self.video_capture.read()
-        if ret:
-            return frame
-        else:
-            return self.no_video_available_image
+        if self.frame_capture is not None:
+            latest = self.frame_capture.latest()
+            if latest is None:
+                if not self.frame_available and self.frame_products is not None:
+                    return self.frame_products.image # still no camera, not worth processing again
+                self.frame_available = False
+                return self.__newFrame(self.no_video_available_image, time.monotonic())
+            self.frame_available = True
+
+            frame, capture_id, timestamp = latest
+            if capture_id == self.capture_id:
+                return frame
+            self.capture_id = capture_id
+            return self.__newFrame(frame, timestamp)
+
+        ret, frame = self.frame_source.read()
+        self.frame_available = ret
+        if not ret:
+            frame = self.no_video_available_image
+        return self.__newFrame(frame, time.monotonic())
+
+    def __newFrame(self, frame, timestamp):
+        self.frame_seq += 1
+        self.frame_products = FrameProducts(self.frame_seq, frame, timestamp)
+        return frame
+
+    # whether the capture thread has a frame that captureFrame() has not handed out yet
+    def newFrameAvailable(self):
+        return self.frame_capture is not None and self.frame_capture.latestId() not in (None, self.capture_id)
+
+    # False while the source delivers no frames and the 'no image' frame is shown instead
+    def hasFrame(self):
+        return self.frame_available
+
+    # a replay that does not loop has shown all its frames
+    def sourceFinished(self):
+        return self.frame_source.isFinished()
+
+    # preprocessed images, sequence number and capture time of the last captured frame
+    def frameProducts(self):
+        return self.frame_products
 
     def finaliseFrame(self, frame):
-        cv.imshow(NovaConfig.NOVA_WINDOW_NAME, frame)
+        if not self.headless:
+            cv.imshow(NovaConfig.NOVA_WINDOW_NAME, self.overlay.compose(frame))
 
     def cleanup(self):
-        self.video_capture.release()
-        cv.destroyAllWindows()
+        if self.frame_capture is not None:
+            self.frame_capture.stop()
+        self.frame_source.release()
+        if not self.headless:
+            cv.destroyAllWindows()
 
     def __initNotAvailableImage(self):
         image = cv.imread(NovaConfig.NOVA_WINDOW_NOIMAGE_PATH)
@@ -0,0 +1,254 @@
+# emulates the Nova firmware on a pseudo-terminal, so the controller can be run and load-tested without the robot
+# 1. commands written by the controller are decoded with the same protocol tree and wire formats
+# 2. each command is handled after the configured latency plus the time it takes to cross the line at the baud rate
+# 3. responses (acks, tunings, servo degrees, distances) are throttled to the baud rate on the way back
+
+import heapq
+import math
+import os
+import select
+import time
+import tty
+from config.config import NovaConfig
+from communication.protocol import NovaProtocolCommandReader, createCommand, mapPIDNodes
+from communication.wire_format import AsciiWireFormat, WIRE_FORMATS
+
+class NovaEmulator:
+    SERVOS = ["servo1", "servo2", "servo3", "servo4", "servo5"]
+    BITS_PER_BYTE = 10 # start bit, 8 data bits, stop bit
+    WRITE_TIMEOUT = 0.1 # how long the rest of a partly written frame may wait for the controller to read
+
+    def __init__(self, latency_ms=NovaConfig.EMULATOR_LATENCY_MS, baudrate=NovaConfig.EMULATOR_BAUDRATE,
+                    status_interval_ms=NovaConfig.EMULATOR_STATUS_INTERVAL_MS, port_link=NovaConfig.EMULATOR_PORT_LINK, verbose=False):
+        self.latency = latency_ms / 1000
+        self.byte_time = self.BITS_PER_BYTE / baudrate if baudrate > 0 else 0
+        self.status_interval = status_interval_ms / 1000
+        self.verbose = verbose
+
+        self.__openPty(port_link)
+
+        self.protocolReader = NovaProtocolCommandReader()
+        self.ascii_format = AsciiWireFormat()
+        self.wire_format = self.ascii_format
+        self.receiveBuffer = bytearray()
+
+        self.scheduled = [] # heap of (due_time, seq, action)
+        self.seq = 0
+        self.inbound_free_at = 0
+        self.outbound_free_at = 0
+        self.started_at = time.monotonic()
+        self.next_status_at = self.started_at + self.status_interval
+
+        self.__initState()
+        self.__initHandlers()
+
+    def __openPty(self, port_link):
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        os.set_blocking(self.master_fd, False)
+        self.port_name = os.ttyname(self.slave_fd)
+
+        self.port_link = port_link
+        if self.port_link:
+            if os.path.lexists(self.port_link):
+                os.remove(self.port_link)
+            os.symlink(self.port_name, self.port_link)
+
+    def __initState(self):
+        self.mode = NovaConfig.STARTUP_MODE
+        self.degrees = { servo : 90 for servo in self.SERVOS }
+        self.tunings = {}
+        self.auto = {}
+        for module, pids in mapPIDNodes().items():
+            for pid in pids:
+                self.tunings[(module, pid)] = ['500', '0', '0']
+                self.auto[(module, pid)] = True
+
+    # handlers are looked up by (module, operation); servo and pid operations are shared between modules
+    def __initHandlers(self):
+        self.handlers = {
+            ("nova", "set_mode") : self.__handleSetMode,
+            ("nova", "set_wire_format") : self.__handleSetWireFormat,
+            ("track_object", "set_coordinates") : self.__handleSetCoordinates,
+            ("nova", "get_distance") : self.__handleGetDistance
+        }
+        for module in ["nova", "external_input"]:
+            self.handlers[(module, "get_degree")] = self.__handleGetDegree
+            self.handlers[(module, "set_degree")] = self.__handleSetDegree
+            self.handlers[(module, "set_degree_steps")] = self.__handleSetDegreeSteps
+        for module, pid in self.tunings:
+            self.handlers[(module, "set_tuning")] = self.__handleSetTuning
+            self.handlers[(module, "get_tuning")] = self.__handleGetTuning
+            self.handlers[(module, "toggle_auto")] = self.__handleToggleAuto
+
+    def close(self):
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+        if self.port_link and os.path.islink(self.port_link):
+            os.remove(self.port_link)
+
+    def run(self):
+        while True:
+            self.step()
+
+    # one pass: wait for input or the next due action, then do everything that is due
+    def step(self, max_wait=0.05):
+        now = time.monotonic()
+        wait = max_wait
+        if len(self.scheduled) > 0:
+            wait = min(wait, max(0, self.scheduled[0][0] - now))
+
+        readable, _, _ = select.select([self.master_fd], [], [], wait)
+        if readable:
+            self.__receive()
+
+        now = time.monotonic()
+        while len(self.scheduled) > 0 and self.scheduled[0][0] <= now:
+            _, _, action = heapq.heappop(self.scheduled)
+            action()
+
+        if self.status_interval > 0 and now >= self.next_status_at:
+            self.__reportStatus()
+            self.next_status_at = now + self.status_interval
+
+    def __schedule(self, due, action):
+        self.seq += 1
+        heapq.heappush(self.scheduled, (due, self.seq, action))
+
+    def __receive(self):
+        try:
+            data = os.read(self.master_fd, 4096)
+        except BlockingIOError:
+            return
+
+        now = time.monotonic()
+        self.inbound_free_at = max(now, self.inbound_free_at) + len(data) * self.byte_time
+        self.receiveBuffer += data
+
+        pos = 0
+        while True:
+            cmd_fields, pos = self.wire_format.nextFrame(self.receiveBuffer, pos)
+            if cmd_fields is None:
+                break
+            self.__schedule(self.inbound_free_at + self.latency, lambda fields=cmd_fields: self.__handle(fields))
+
+        del self.receiveBuffer[:pos]
+
+    def __handle(self, cmd_fields):
+        try:
+            cmd = self.protocolReader.readCommand(cmd_fields)
+        except (KeyError, IndexError, ValueError):
+            print(f"[emu] Ignored unknown command: {cmd_fields}")
+            return
+
+        if self.verbose:
+            print(f"[emu] <- {':'.join([cmd.module, cmd.asset, cmd.operation] + list(cmd.args))}")
+
+        handler = self.handlers.get((cmd.module, cmd.operation))
+        if handler is not None:
+            handler(cmd.module, cmd.asset, cmd.args)
+
+    def __send(self, cmd_list_codes, wire_format=None):
+        wire_format = self.wire_format if wire_format is None else wire_format
+        frame = wire_format.encode(cmd_list_codes)
+
+        now = time.monotonic()
+        self.outbound_free_at = max(now, self.outbound_free_at) + len(frame) * self.byte_time
+        self.__schedule(self.outbound_free_at, lambda: self.__write(frame))
+
+        if self.verbose:
+            print(f"[emu] -> {':'.join([str(i) for i in cmd_list_codes])}")
+
+    # the pty may take only part of a frame; the rest is written as soon as the controller reads
+    def __write(self, frame):
+        remaining = memoryview(frame)
+        deadline = time.monotonic() + self.WRITE_TIMEOUT
+        while len(remaining) > 0:
+            try:
+                remaining = remaining[os.write(self.master_fd, remaining):]
+            except BlockingIOError:
+                if len(remaining) == len(frame):
+                    print("[emu] Controller is not reading, dropped a response.")
+                    return
+                wait = deadline - time.monotonic()
+                if wait <= 0:
+                    print("[emu] Controller stopped reading, cut off a response.")
+                    return
+                select.select([], [self.master_fd], [], wait)
+
+    def __handleSetMode(self, module, asset, args):
+        for mode, node in createCommand().root.children.items():
+            if len(args) > 0 and node.code == args[0]:
+                self.mode = mode
+
+    # the echo still goes out in ascii, everything after it in the new format
+    def __handleSetWireFormat(self, module, asset, args):
+        requested = [wire_format for wire_format in WIRE_FORMATS.values() if len(args) > 0 and wire_format.code == args[0]]
+        if len(requested) > 0:
+            cmd = createCommand().setModule("nova").setOperation("set_wire_format").setArgs([args[0]]).build()
+            self.__send(cmd, self.ascii_format)
+            self.wire_format = requested[0]()
+
+    def __handleSetCoordinates(self, module, asset, args):
+        self.__send(createCommand().setModule("track_object").setOperation("ack_coordinates").build())
+
+    def __handleGetDistance(self, module, asset, args):
+        self.__reportDistance()
+
+    def __handleGetDegree(self, module, asset, args):
+        self.__reportDegree(asset)
+
+    def __handleSetDegree(self, module, asset, args):
+        degree = self.__intArg(args)
+        if degree is not None:
+            self.__moveServo(asset, degree)
+
+    def __handleSetDegreeSteps(self, module, asset, args):
+        steps = self.__intArg(args)
+        if steps is not None:
+            self.__moveServo(asset, self.degrees[asset] + steps)
+
+    def __intArg(self, args):
+        if len(args) > 0:
+            try:
+                return int(args[0])
+            except ValueError:
+                pass
+        print(f"[emu] Ignored servo command without a number: {list(args)}")
+        return None
+
+    def __handleSetTuning(self, module, asset, args):
+        if (module, asset) in self.tunings and len(args) == 3:
+            self.tunings[(module, asset)] = list(args)
+
+    def __handleGetTuning(self, module, asset, args):
+        if (module, asset) in self.tunings:
+            self.__reportTuning(module, asset)
+
+    def __handleToggleAuto(self, module, asset, args):
+        if (module, asset) in self.auto:
+            self.auto[(module, asset)] = not self.auto[(module, asset)]
+
+    def __moveServo(self, servo, degree):
+        self.degrees[servo] = min(180, max(0, degree))
+        self.__reportDegree(servo)
+
+    def __reportDegree(self, servo):
+        cmd = createCommand().setModule("nova").setAsset(servo).setOperation("get_degree").setArgs([self.degrees[servo]]).build()
+        self.__send(cmd)
+
+    # a person slowly walking back and forth in front of the sensor
+    def __reportDistance(self):
+        elapsed = time.monotonic() - self.started_at
+        distance = int(100 + 50 * math.sin(elapsed / 5))
+        cmd = createCommand().setModule("nova").setAsset("ultrasound").setOperation("get_distance").setArgs([distance]).build()
+        self.__send(cmd)
+
+    def __reportTuning(self, module, pid):
+        cmd = createCommand().setModule(module).setAsset(pid).setOperation("get_tuning").setArgs(list(self.tunings[(module, pid)])).build()
+        self.__send(cmd)
+
+    def __reportStatus(self):
+        for servo in self.SERVOS:
+            self.__reportDegree(servo)
+        self.__reportDistance()
@@ -0,0 +1,62 @@
+import os
+import time
+import unittest
+
+from nova_emulator import *
+from communication.wire_format import AsciiWireFormat, BinaryWireFormat
+
+class NovaEmulatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.emulator = NovaEmulator(latency_ms=0, baudrate=0, status_interval_ms=0, port_link='')
+        self.port = os.open(self.emulator.port_name, os.O_RDWR | os.O_NOCTTY)
+        os.set_blocking(self.port, False)
+
+    def tearDown(self):
+        os.close(self.port)
+        self.emulator.close()
+
+    def __exchange(self, frame, wire_format=AsciiWireFormat()):
+        os.write(self.port, frame)
+        received = bytearray()
+        deadline = time.monotonic() + 1
+        while time.monotonic() < deadline:
+            self.emulator.step(0.01)
+            try:
+                received += os.read(self.port, 4096)
+            except BlockingIOError:
+                pass
+
+            fields, _ = wire_format.nextFrame(received, 0)
+            if fields is not None:
+                return fields
+
+        self.fail()
+
+    def testAckCoordinates(self):
+        fields = self.__exchange(b'>5:0:1:2:90:90<')
+        self.assertListEqual(fields, ['5','0','2','0'])
+
+    def testStepsAreReportedAsDegree(self):
+        fields = self.__exchange(b'>3:5:3:1:-10<')
+        self.assertListEqual(fields, ['0','5','1','1','80'])
+
+    def testServoCommandsWithoutNumberAreIgnored(self):
+        fields = self.__exchange(b'>3:5:3:0<>3:5:2:1:x<>3:5:3:1:-10<')
+        self.assertListEqual(fields, ['0','5','1','1','80'])
+
+    def testTuningIsRemembered(self):
+        self.__exchange(b'>4:1:3:3:600:10:1<>4:1:4:0<')
+        fields = self.__exchange(b'>4:1:4:0<')
+        self.assertListEqual(fields, ['4','1','4','3','600','10','1'])
+
+    def testSwitchToBinary(self):
+        fields = self.__exchange(b'>0:0:2:1:1<')
+        self.assertListEqual(fields, ['0','0','2','1','1'])
+
+        binary = BinaryWireFormat()
+        fields = self.__exchange(binary.encode(['5','0','1','2',90,90]), binary)
+        self.assertListEqual(fields, ['5','0','2','0'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,16 @@
+from emulator.nova_emulator import NovaEmulator
+from config.config import NovaConfig
+
+def main():
+    emulator = NovaEmulator(verbose=True)
+    print(f"[emu] Nova emulator listening on {emulator.port_name} (linked from {NovaConfig.EMULATOR_PORT_LINK})")
+
+    try:
+        emulator.run()
+    except KeyboardInterrupt:
+        print("[emu] Closing Nova emulator... Bye")
+    finally:
+        emulator.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+from collections import deque
+
+# a subscriber's own queue, read the same way as an input loop
+class Subscription:
+    def __init__(self, maxlen=None):
+        self.commands = deque(maxlen=maxlen)
+
+    def commandAvailable(self):
+        return len(self.commands) > 0
+
+    def readCommand(self):
+        return self.commands.popleft()
+
+# delivers each command only to the subscriptions whose (type, module, operation) pattern matches it
+# - None in a pattern matches anything
+# - patterns are indexed by which fields they leave open, so publishing costs one dict lookup
+#   per kind of pattern in use, however many loops are subscribed
+class CommandRouter:
+    def __init__(self):
+        self.index = {}
+        self.masks = []
+        self.unrouted = 0
+
+    def subscribe(self, type=None, module=None, operation=None, subscription=None):
+        if subscription is None:
+            subscription = Subscription()
+
+        mask = (type is not None, module is not None, operation is not None)
+        if mask not in self.masks:
+            self.masks.append(mask)
+
+        subscribers = self.index.setdefault((type, module, operation), [])
+        if subscription not in subscribers:
+            subscribers.append(subscription)
+
+        return subscription
+
+    def publish(self, cmd):
+        fields = (cmd.type, cmd.module, cmd.operation)
+        delivered = []
+
+        for use_type, use_module, use_operation in self.masks:
+            key = (fields[0] if use_type else None,
+                    fields[1] if use_module else None,
+                    fields[2] if use_operation else None)
+            for subscription in self.index.get(key, ()):
+                if subscription not in delivered: # one copy for a subscription that matches on several patterns
+                    subscription.commands.append(cmd)
+                    delivered.append(subscription)
+
+        if len(delivered) == 0:
+            self.unrouted += 1
@@ -3,3 +3,4 @@ from enum import Enum
 class CommandType(Enum):
     NOVA = 1 # commands that relate to things originating on Nova
     INPUT = 2 # commands that relate to things originating at the controller or web interface
+    CONTROLLER = 3 # commands for the controller itself (e.g., quit), never sent to Nova
@@ -1,19 +1,22 @@
 import time
 
+# elapses every task_frequency_millisec on a monotonic clock; the next deadline is the previous one plus the
+# period, so it does not drift, unless it fell a whole period behind
 class FrequencyTimer:
-    def __init__(self, task_frequency_millisec=500):
+    def __init__(self, task_frequency_millisec=500, clock=time.monotonic):
         self.frequency_ms = task_frequency_millisec # default to 500 ms
-        self.now = lambda: int(round(time.time() * 1000))
-        self.last_time_ms = self.now()
+        self.now = clock
+        self.last_time = self.now()
 
     def frequencyElapsed(self):
-        current_time_ms = self.now()
-        time_diff_ms = current_time_ms - self.last_time_ms
-        if time_diff_ms >= self.frequency_ms:
-            self.__setLastTime()
+        current_time = self.now()
+        if (current_time - self.last_time) * 1000 >= self.frequency_ms:
+            self.__setLastTime(current_time)
             return True
         else:
             return False
 
-    def __setLastTime(self):
-        self.last_time_ms = self.now()
+    def __setLastTime(self, current_time):
+        self.last_time += self.frequency_ms / 1000
+        if (current_time - self.last_time) * 1000 >= self.frequency_ms:
+            self.last_time = current_time
@@ -0,0 +1,122 @@
+# measures where the time of the main loop goes, cheap enough to stay on in production
+# - every stage (capture, each input and control loop, finalising the frame) keeps its last durations in a
+#   fixed-size ring; recording is one clock read and a list store, percentiles are only computed when asked for
+# - counters give the commands per second coming in from the input loops and going out to Nova
+# - the figures are available through summary(), as text lines for the status view and as a periodic log line
+
+import math
+import time
+from config.config import NovaConfig
+
+# the smallest of the sorted values with at least p percent of the values at or below it
+def nearestRank(sorted_values, p):
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+# the last `size` samples; older samples are overwritten
+class RollingHistogram:
+    def __init__(self, size=NovaConfig.INSTRUMENTATION_SAMPLES):
+        self.samples = [0.0] * size
+        self.size = size
+        self.count = 0 # samples ever added
+
+    def add(self, value):
+        self.samples[self.count % self.size] = value
+        self.count += 1
+
+    # percentile of the samples in the ring, None while it is empty
+    def percentile(self, p):
+        values = sorted(self.__values())
+        return nearestRank(values, p) if len(values) > 0 else None
+
+    def summary(self):
+        values = sorted(self.__values())
+        if len(values) == 0:
+            return { "p50" : None, "p95" : None, "p99" : None, "max" : None, "count" : 0 }
+
+        return { "p50" : nearestRank(values, 50), "p95" : nearestRank(values, 95), "p99" : nearestRank(values, 99),
+                    "max" : values[-1], "count" : self.count }
+
+    def __values(self):
+        return self.samples[:min(self.count, self.size)]
+
+# events per second, averaged from one reading to the next but over at least `window` seconds
+class RateCounter:
+    def __init__(self, window=1.0, clock=time.monotonic):
+        self.window = window
+        self.clock = clock
+        self.count = 0
+        self.total = 0
+        self.window_start = clock()
+        self.last_rate = 0.0
+
+    def add(self, n=1):
+        self.count += n
+        self.total += n
+
+    def rate(self):
+        now = self.clock()
+        elapsed = now - self.window_start
+        if elapsed >= self.window:
+            self.last_rate = self.count / elapsed
+            self.count = 0
+            self.window_start = now
+        return self.last_rate
+
+class Instrumentation:
+    def __init__(self, enabled=NovaConfig.INSTRUMENTATION_ENABLED, samples=NovaConfig.INSTRUMENTATION_SAMPLES,
+                    clock=time.perf_counter, rate_clock=time.monotonic):
+        self.enabled = enabled
+        self.samples = samples
+        self.clock = clock
+        self.rate_clock = rate_clock
+        self.stages = {}
+        self.counters = {}
+
+    def stage(self, name):
+        if name not in self.stages:
+            self.stages[name] = RollingHistogram(self.samples)
+        return self.stages[name]
+
+    def counter(self, name):
+        if name not in self.counters:
+            self.counters[name] = RateCounter(clock=self.rate_clock)
+        return self.counters[name]
+
+    # returns action wrapped to record its duration in ms under the stage name; disabled, the action itself
+    def timed(self, name, action):
+        if not self.enabled:
+            return action
+
+        histogram = self.stage(name)
+        clock = self.clock
+
+        def run(*args):
+            start = clock()
+            result = action(*args)
+            histogram.add((clock() - start) * 1000)
+            return result
+
+        return run
+
+    # { "stages" : { name : { "p50", "p95", "p99", "max" (ms), "count" } }, "rates" : { name : per second } }
+    def summary(self):
+        return {
+            "stages" : { name : histogram.summary() for name, histogram in self.stages.items() },
+            "rates" : { name : counter.rate() for name, counter in self.counters.items() }
+        }
+
+    def statusLines(self):
+        summary = self.summary()
+        lines = ["stage (ms)      p50    p95    p99    max"]
+        for name, stats in summary["stages"].items():
+            if stats["count"] > 0:
+                lines.append(f"{name:<14}" + "".join([f"{stats[key]:7.2f}" for key in ["p50", "p95", "p99", "max"]]))
+        lines.append("commands/s  " + "  ".join([f"{name} {rate:.1f}" for name, rate in summary["rates"].items()]))
+        return lines
+
+    def report(self):
+        summary = self.summary()
+        stages = [f"{name} {stats['p50']:.2f}/{stats['p95']:.2f}/{stats['p99']:.2f}/{stats['max']:.2f}"
+                    for name, stats in summary["stages"].items() if stats["count"] > 0]
+        rates = [f"{name} {rate:.1f}/s" for name, rate in summary["rates"].items()]
+        print("[ctrl] Timing in ms (p50/p95/p99/max): " + ", ".join(stages) + "; commands " + ", ".join(rates))
@@ -0,0 +1,115 @@
+# follows a camera frame until Nova acknowledges the servo target computed from it
+# 1. the face detection starts a trace with the frame's sequence number and capture time, stamps when it
+#    takes the frame up and when it writes the coordinates, and passes the trace along with the command's args
+# 2. the serial communication stamps the trace when the command goes out and when Nova's ack arrives,
+#    then hands it to the tracer
+# 3. the tracer records the time between the stamps in rolling histograms and keeps the last traces,
+#    which can be exported as a Chrome trace (chrome://tracing, https://ui.perfetto.dev)
+
+import json
+import threading
+import time
+from collections import deque
+from config.config import NovaConfig
+from utils.instrumentation import RollingHistogram
+
+# stamps in the order they happen; each interval is named after the stamp that ends it
+STAMPS = ["capture", "vision", "coordinates", "write", "ack"]
+INTERVALS = {
+    "vision" : "frame_wait", # captured until the face detection took the frame up
+    "coordinates" : "detection", # detecting or tracking the face and predicting the target
+    "write" : "queue", # waiting for the serial port
+    "ack" : "nova" # the line to Nova and back, and Nova's processing
+}
+
+class LatencyTrace:
+    def __init__(self, frame_id, capture_time, clock=time.monotonic):
+        self.frame_id = frame_id
+        self.clock = clock
+        self.stamps = { "capture" : capture_time }
+
+    # only the first stamp counts, a command that is sent again keeps its first write
+    def stamp(self, name, at=None):
+        if name not in self.stamps:
+            self.stamps[name] = at if at is not None else self.clock()
+
+    def intervals(self):
+        intervals = {}
+        for previous, name in zip(STAMPS, STAMPS[1:]):
+            if previous in self.stamps and name in self.stamps:
+                intervals[INTERVALS[name]] = (self.stamps[name] - self.stamps[previous]) * 1000
+        if "ack" in self.stamps:
+            intervals["total"] = (self.stamps["ack"] - self.stamps["capture"]) * 1000
+        return intervals
+
+# args of a command that carry the trace along through coalescing, the ack window and the wire formats;
+# anything with a stamp(name, at=None) method can ride along, like the tickets of API requests
+class TracedArgs(list):
+    def __init__(self, args, trace):
+        super().__init__(args)
+        self.trace = trace
+
+def traceOf(args):
+    return getattr(args, "trace", None)
+
+class LatencyTracer:
+    def __init__(self, max_traces=NovaConfig.LATENCY_TRACE_MAX_TRACES, samples=NovaConfig.INSTRUMENTATION_SAMPLES,
+                    clock=time.monotonic):
+        self.traces = deque(maxlen=max_traces)
+        self.histograms = { name : RollingHistogram(samples) for name in list(INTERVALS.values()) + ["total"] }
+        self.started_at = clock()
+        self.lock = threading.Lock() # acks arrive on the reader thread in threaded mode
+
+    def finish(self, trace):
+        with self.lock:
+            for name, ms in trace.intervals().items():
+                self.histograms[name].add(ms)
+            self.traces.append(trace)
+
+    # { interval : { "p50", "p95", "p99", "max" (ms), "count" } }
+    def summary(self):
+        with self.lock:
+            return { name : histogram.summary() for name, histogram in self.histograms.items() }
+
+    # the interval with the highest median, where the latency is best cut
+    def dominantInterval(self):
+        medians = { name : stats["p50"] for name, stats in self.summary().items() if name != "total" and stats["count"] > 0 }
+        if len(medians) == 0:
+            return None
+        return max(medians, key=medians.get)
+
+    def report(self):
+        summary = self.summary()
+        if summary["total"]["count"] == 0:
+            return
+
+        intervals = [f"{name} {stats['p50']:.1f}/{stats['p95']:.1f}/{stats['p99']:.1f}/{stats['max']:.1f}"
+                        for name, stats in summary.items() if stats["count"] > 0]
+        print(f"[ctrl] Latency from frame to ack in ms (p50/p95/p99/max): {', '.join(intervals)}; mostly {self.dominantInterval()}")
+
+    # every interval of a trace is an async slice of its own, as the traces of consecutive frames overlap
+    def chromeTrace(self):
+        with self.lock:
+            traces = list(self.traces)
+
+        events = []
+        for trace in traces:
+            for previous, name in zip(STAMPS, STAMPS[1:]):
+                if previous in trace.stamps and name in trace.stamps:
+                    events += self.__slice(INTERVALS[name], trace, trace.stamps[previous], trace.stamps[name])
+            if "ack" in trace.stamps:
+                events += self.__slice("total", trace, trace.stamps["capture"], trace.stamps["ack"])
+
+        return { "traceEvents" : events, "displayTimeUnit" : "ms" }
+
+    def __slice(self, name, trace, begin, end):
+        event = { "name" : name, "cat" : "latency", "id" : trace.frame_id, "pid" : 1, "tid" : 1, "args" : { "frame" : trace.frame_id } }
+        return [dict(event, ph="b", ts=self.__micros(begin)), dict(event, ph="e", ts=self.__micros(end))]
+
+    def __micros(self, timestamp):
+        return round((timestamp - self.started_at) * 1000000)
+
+    def export(self, path):
+        with open(path, "w") as file:
+            json.dump(self.chromeTrace(), file)
+        print(f"[ctrl] Wrote {len(self.traces)} latency traces to {path}.")
@@ -0,0 +1,83 @@
+import time
+
+class ScheduledTask:
+    def __init__(self, name, action, period, priority, order, due):
+        self.name = name
+        self.action = action
+        self.period = period
+        self.priority = priority
+        self.order = order
+        self.due = due
+        self.runs = 0
+        self.missed = 0 # periods skipped because the task could not run in time
+        self.max_lateness = 0
+        self.busy = 0 # time spent in the action
+
+# runs each task at its own period on a monotonic clock
+# - due tasks run in order of priority (lower first), then registration order, so a pass is deterministic
+# - the next deadline is the previous deadline plus the period, so the rate does not drift;
+#   a task that falls a whole period behind skips the periods it missed instead of running in a burst
+# - between passes the scheduler sleeps until the next task is due
+class Scheduler:
+    def __init__(self, clock=time.monotonic, sleep=time.sleep, max_sleep_ms=10):
+        self.clock = clock
+        self.sleep = sleep
+        self.max_sleep = max_sleep_ms / 1000
+        self.tasks = []
+        self.started_at = clock()
+
+    # a period of 0 runs the task on every pass
+    def add(self, name, action, period_ms, priority=0):
+        task = ScheduledTask(name, action, period_ms / 1000, priority, len(self.tasks), self.clock())
+        self.tasks.append(task)
+        self.tasks.sort(key=lambda task: (task.priority, task.order))
+        return task
+
+    # runs every task that is due, returns how many ran
+    def runOnce(self):
+        ran = 0
+        for task in self.tasks:
+            now = self.clock()
+            if task.due > now:
+                continue
+
+            task.max_lateness = max(task.max_lateness, now - task.due)
+            task.action()
+            finished = self.clock()
+            task.busy += finished - now
+            task.runs += 1
+            ran += 1
+
+            task.due += task.period
+            if task.period > 0 and task.due <= finished:
+                skipped = int((finished - task.due) / task.period) + 1
+                task.missed += skipped
+                task.due += skipped * task.period
+
+        return ran
+
+    def timeUntilNext(self):
+        if len(self.tasks) == 0:
+            return self.max_sleep
+        return max(0, min([task.due for task in self.tasks]) - self.clock())
+
+    def run(self, keep_running):
+        while keep_running():
+            self.runOnce()
+            wait = min(self.timeUntilNext(), self.max_sleep)
+            if wait > 0:
+                self.sleep(wait)
+
+    # runs, rate, missed deadlines, worst lateness and load per task since the last report
+    def report(self):
+        elapsed = max(self.clock() - self.started_at, 1e-9)
+        lines = []
+        for task in self.tasks:
+            lines.append(f"{task.name} {task.runs / elapsed:.0f}/s missed {task.missed} late {task.max_lateness * 1000:.1f} ms busy {100 * task.busy / elapsed:.0f}%")
+            task.runs = 0
+            task.missed = 0
+            task.max_lateness = 0
+            task.busy = 0
+
+        self.started_at = self.clock()
+        print("[ctrl] Scheduler: " + ", ".join(lines))
@@ -0,0 +1,60 @@
+import unittest
+
+from command_router import *
+from protocol import NovaCommand
+from utils.commandtype_enum import CommandType
+
+class CommandRouterTest(unittest.TestCase):
+    ACK = NovaCommand(CommandType.NOVA, "track_object", "module", "ack_coordinates", ())
+    DEGREE = NovaCommand(CommandType.NOVA, "nova", "servo1", "get_degree", ("90",))
+    MOVE = NovaCommand(CommandType.INPUT, "external_input", "servo5", "set_degree_steps", (3,))
+
+    def readAll(self, subscription):
+        commands = []
+        while subscription.commandAvailable():
+            commands.append(subscription.readCommand())
+        return commands
+
+    def testExactPattern(self):
+        router = CommandRouter()
+        acks = router.subscribe(CommandType.NOVA, "track_object", "ack_coordinates")
+
+        for cmd in [self.ACK, self.DEGREE, self.MOVE]:
+            router.publish(cmd)
+
+        self.assertListEqual(self.readAll(acks), [self.ACK])
+        self.assertEqual(router.unrouted, 2)
+
+    def testWildcardPatterns(self):
+        router = CommandRouter()
+        inputs = router.subscribe(CommandType.INPUT)
+        nova = router.subscribe(CommandType.NOVA, "nova")
+        everything = router.subscribe()
+
+        for cmd in [self.ACK, self.DEGREE, self.MOVE]:
+            router.publish(cmd)
+
+        self.assertListEqual(self.readAll(inputs), [self.MOVE])
+        self.assertListEqual(self.readAll(nova), [self.DEGREE])
+        self.assertListEqual(self.readAll(everything), [self.ACK, self.DEGREE, self.MOVE])
+
+    def testOverlappingPatternsDeliverOnce(self):
+        router = CommandRouter()
+        subscription = router.subscribe(CommandType.NOVA)
+        router.subscribe(CommandType.NOVA, "track_object", subscription=subscription)
+
+        router.publish(self.ACK)
+
+        self.assertListEqual(self.readAll(subscription), [self.ACK])
+
+    def testBurstIsNotDropped(self):
+        router = CommandRouter()
+        inputs = router.subscribe(CommandType.INPUT)
+
+        for i in range(1000):
+            router.publish(self.MOVE)
+
+        self.assertEqual(len(self.readAll(inputs)), 1000)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+
+from instrumentation import *
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class RollingHistogramTest(unittest.TestCase):
+    def testPercentiles(self):
+        histogram = RollingHistogram(100)
+        for value in range(1, 101):
+            histogram.add(value)
+
+        summary = histogram.summary()
+        self.assertEqual(summary["p50"], 50)
+        self.assertEqual(summary["p95"], 95)
+        self.assertEqual(summary["p99"], 99)
+        self.assertEqual(summary["max"], 100)
+        self.assertEqual(summary["count"], 100)
+
+    def testOldSamplesAreOverwritten(self):
+        histogram = RollingHistogram(4)
+        for value in [100, 1, 2, 3, 4]:
+            histogram.add(value)
+
+        self.assertEqual(histogram.summary()["max"], 4)
+        self.assertEqual(histogram.percentile(50), 2)
+        self.assertEqual(histogram.count, 5)
+
+    def testEmptyHistogram(self):
+        histogram = RollingHistogram(4)
+        self.assertIsNone(histogram.percentile(50))
+        self.assertEqual(histogram.summary()["count"], 0)
+
+class RateCounterTest(unittest.TestCase):
+    def testRateOverWindow(self):
+        clock = FakeClock()
+        counter = RateCounter(window=1.0, clock=clock)
+        counter.add(5)
+        clock.now = 0.5
+        self.assertEqual(counter.rate(), 0)
+
+        counter.add(5)
+        clock.now = 2.0
+        self.assertAlmostEqual(counter.rate(), 5)
+        self.assertAlmostEqual(counter.rate(), 5)
+        self.assertEqual(counter.total, 10)
+
+class InstrumentationTest(unittest.TestCase):
+    def testTimedActionRecordsDuration(self):
+        clock = FakeClock()
+        instrumentation = Instrumentation(enabled=True, samples=8, clock=clock)
+
+        def action(value):
+            clock.now += 0.002
+            return value
+
+        timed = instrumentation.timed("stage", action)
+        self.assertEqual(timed(42), 42)
+        self.assertAlmostEqual(instrumentation.summary()["stages"]["stage"]["max"], 2)
+
+    def testDisabledInstrumentationReturnsTheAction(self):
+        instrumentation = Instrumentation(enabled=False)
+        action = lambda: None
+        self.assertIs(instrumentation.timed("stage", action), action)
+
+    def testStatusLinesListStagesAndRates(self):
+        instrumentation = Instrumentation(enabled=True, samples=8)
+        instrumentation.timed("capture", lambda: None)()
+        instrumentation.timed("idle", lambda: None) # never ran, not listed
+        instrumentation.counter("in").add()
+
+        lines = instrumentation.statusLines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].startswith("capture"))
+        self.assertIn("in", lines[2])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import json
+import os
+import tempfile
+import unittest
+
+from latency_trace import *
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+# frame 7, captured at 1 s and acked 30 ms later
+def createTrace():
+    clock = FakeClock()
+    trace = LatencyTrace(7, 1.0, clock=clock)
+    for name, at in [("vision", 1.010), ("coordinates", 1.015), ("write", 1.017), ("ack", 1.030)]:
+        clock.now = at
+        trace.stamp(name)
+    return trace
+
+class LatencyTraceTest(unittest.TestCase):
+    def testIntervalsBetweenStamps(self):
+        intervals = createTrace().intervals()
+        self.assertAlmostEqual(intervals["frame_wait"], 10)
+        self.assertAlmostEqual(intervals["detection"], 5)
+        self.assertAlmostEqual(intervals["queue"], 2)
+        self.assertAlmostEqual(intervals["nova"], 13)
+        self.assertAlmostEqual(intervals["total"], 30)
+
+    def testFirstStampCounts(self):
+        trace = LatencyTrace(1, 0.0)
+        trace.stamp("write", 0.5)
+        trace.stamp("write", 0.9)
+        self.assertEqual(trace.stamps["write"], 0.5)
+
+    def testTracedArgsAreArgs(self):
+        trace = LatencyTrace(1, 0.0)
+        args = TracedArgs([90, 45], trace)
+        self.assertListEqual(args, [90, 45])
+        self.assertEqual([str(arg) for arg in args], ["90", "45"])
+        self.assertIs(traceOf(args), trace)
+        self.assertIsNone(traceOf([90, 45]))
+
+class LatencyTracerTest(unittest.TestCase):
+    def testFinishedTracesAreRecorded(self):
+        tracer = LatencyTracer(max_traces=10, samples=10)
+        tracer.finish(createTrace())
+
+        summary = tracer.summary()
+        self.assertEqual(summary["total"]["count"], 1)
+        self.assertAlmostEqual(summary["nova"]["max"], 13)
+        self.assertEqual(tracer.dominantInterval(), "nova")
+
+    def testUnackedTraceHasNoTotal(self):
+        tracer = LatencyTracer(max_traces=10, samples=10)
+        trace = LatencyTrace(1, 0.0)
+        trace.stamp("vision", 0.01)
+        tracer.finish(trace)
+        self.assertEqual(tracer.summary()["total"]["count"], 0)
+
+    def testChromeTraceExport(self):
+        tracer = LatencyTracer(max_traces=10, samples=10, clock=lambda: 1.0)
+        tracer.finish(createTrace())
+
+        path = os.path.join(tempfile.mkdtemp(), "trace.json")
+        tracer.export(path)
+        with open(path) as file:
+            events = json.load(file)["traceEvents"]
+        os.remove(path)
+
+        self.assertEqual(len(events), 10) # begin and end of four intervals and the total
+        total = [event for event in events if event["name"] == "total"]
+        self.assertListEqual([event["ph"] for event in total], ["b", "e"])
+        self.assertListEqual([event["ts"] for event in total], [0, 30000])
+        self.assertTrue(all(event["id"] == 7 for event in events))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+
+from scheduler import *
+from frequencytimer import FrequencyTimer
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+class SchedulerTest(unittest.TestCase):
+    def createScheduler(self):
+        clock = FakeClock()
+        return clock, Scheduler(clock=clock, sleep=clock.sleep)
+
+    def testTasksRunAtTheirPeriod(self):
+        clock, scheduler = self.createScheduler()
+        fast = scheduler.add("fast", lambda: None, 10)
+        slow = scheduler.add("slow", lambda: None, 50)
+
+        scheduler.run(lambda: clock.now < 0.995)
+        self.assertEqual(fast.runs, 100)
+        self.assertEqual(slow.runs, 20)
+        self.assertEqual(fast.missed, 0)
+
+    def testDueTasksRunByPriorityThenRegistration(self):
+        clock, scheduler = self.createScheduler()
+        order = []
+        scheduler.add("display", lambda: order.append("display"), 10, priority=3)
+        scheduler.add("serial", lambda: order.append("serial"), 10, priority=0)
+        scheduler.add("api", lambda: order.append("api"), 10, priority=3)
+
+        scheduler.runOnce()
+        self.assertListEqual(order, ["serial", "display", "api"])
+
+    def testRateDoesNotDrift(self):
+        clock, scheduler = self.createScheduler()
+        task = scheduler.add("task", lambda: None, 10)
+
+        for i in range(100):
+            clock.now = i * 0.010 + 0.004 # always 4 ms late
+            scheduler.runOnce()
+
+        self.assertEqual(task.runs, 100)
+        self.assertAlmostEqual(task.due, 1.0)
+
+    def testMissedDeadlinesAreSkippedAndCounted(self):
+        clock, scheduler = self.createScheduler()
+        slow_action = lambda: clock.sleep(0.035)
+        task = scheduler.add("task", slow_action, 10)
+
+        scheduler.runOnce()
+        self.assertEqual(task.missed, 3)
+        self.assertAlmostEqual(task.due, 0.040)
+        self.assertEqual(scheduler.runOnce(), 0)
+
+    def testSleepsUntilNextTask(self):
+        clock, scheduler = self.createScheduler()
+        scheduler.add("task", lambda: None, 5)
+        scheduler.runOnce()
+
+        self.assertAlmostEqual(scheduler.timeUntilNext(), 0.005)
+
+class FrequencyTimerTest(unittest.TestCase):
+    def testElapsesWithoutDrift(self):
+        clock = FakeClock()
+        timer = FrequencyTimer(100, clock=clock)
+
+        elapsed = 0
+        for i in range(1, 1001):
+            clock.now = i * 0.0013
+            if timer.frequencyElapsed():
+                elapsed += 1
+
+        self.assertEqual(elapsed, 13)
+
+    def testFallingBehindDoesNotBurst(self):
+        clock = FakeClock()
+        timer = FrequencyTimer(100, clock=clock)
+        clock.now = 1.0
+
+        self.assertTrue(timer.frequencyElapsed())
+        self.assertFalse(timer.frequencyElapsed())
+
+if __name__ == "__main__":
+    unittest.main()